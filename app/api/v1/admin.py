@@ -1,21 +1,33 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.database import get_db
 from app.auth import verify_credentials
 from app.services.sms_service import SmsService
-from app.services.template_service import TemplateService
+from app.services.template_service import TemplateService, template_cache
+from app.services.export_service import ExportService, EXPORT_MEDIA_TYPES
+from app.services.app_service import AppService
+from app.utils.sql_stats import sql_stats
 
 from app.services.scheduler_service import scheduler
+from app.services.log_buffer import log_buffer
 from app.schemas.sms import DefaultSmsRequest, TemplateRequest, TaskStatusInfo
 from app.schemas.admin import (
     ZombieTaskRecoveryResponse,
     TaskStatisticsResponse,
+    LogBufferStatsResponse,
+    TemplateCacheStatsResponse,
+    AppStatusResponse,
+    SqlStatsResponse,
     TemplateResponse,
     DefaultSmsResponse
 )
 from app.schemas.response import ApiResponse
+from app.utils.enums import TaskStatus, ExportFormat, ExportLogType
 
 router = APIRouter()
 
@@ -86,6 +98,9 @@ async def recover_zombie_tasks(
 
         response_data = ZombieTaskRecoveryResponse(
             recovered_count=result["recovered_count"],
+            retried_count=result["retried_count"],
+            failed_count=result["failed_count"],
+            chunk_counts=result["chunk_counts"],
             message=result["message"]
         )
 
@@ -109,13 +124,71 @@ async def get_task_statistics(
         raise HTTPException(status_code=500, detail=f"获取统计信息失败: {str(e)}")
 
 
+@router.get("/log-buffer-stats", response_model=ApiResponse[LogBufferStatsResponse])
+async def get_log_buffer_stats(
+    _: str = Depends(verify_credentials)
+):
+    """获取日志写缓冲统计信息"""
+    response_data = LogBufferStatsResponse(**log_buffer.stats())
+
+    return ApiResponse(data=response_data, message="获取日志缓冲统计成功")
+
+
+@router.get("/template-cache-stats", response_model=ApiResponse[TemplateCacheStatsResponse])
+async def get_template_cache_stats(
+    _: str = Depends(verify_credentials)
+):
+    """获取模板缓存统计信息"""
+    response_data = TemplateCacheStatsResponse(**template_cache.stats())
+
+    return ApiResponse(data=response_data, message="获取模板缓存统计成功")
+
+
+@router.get("/apps", response_model=ApiResponse[List[AppStatusResponse]])
+async def get_apps(
+    db: AsyncSession = Depends(get_db),
+    _: str = Depends(verify_credentials)
+):
+    """获取已登记APP的处理能力、处理中任务数和汇报延迟"""
+    apps = await AppService(db).list_apps()
+    response_data = [AppStatusResponse(**app) for app in apps]
+
+    return ApiResponse(data=response_data, message="获取APP状态成功")
+
+
+@router.get("/sql-stats", response_model=ApiResponse[SqlStatsResponse])
+async def get_sql_stats(
+    limit: int = Query(20, ge=1, le=1000, description="返回的语句指纹数量"),
+    _: str = Depends(verify_credentials)
+):
+    """获取启动以来按总耗时排序的SQL语句统计"""
+    response_data = SqlStatsResponse(
+        started_at=datetime.fromtimestamp(sql_stats.started_at, timezone.utc),
+        slow_query_threshold_ms=settings.slow_query_threshold_ms,
+        slow_query_count=sql_stats.slow_query_count,
+        untracked_count=sql_stats.untracked_count,
+        failed_count=sql_stats.failed_count,
+        fingerprints=sql_stats.top(limit)
+    )
+
+    return ApiResponse(data=response_data, message="获取SQL统计成功")
+
+
+@router.post("/sql-stats/reset", response_model=ApiResponse[None])
+async def reset_sql_stats(
+    _: str = Depends(verify_credentials)
+):
+    """清空SQL语句统计"""
+    sql_stats.reset()
+
+    return ApiResponse(message="SQL统计已清空")
+
+
 @router.get("/task-status-info", response_model=ApiResponse[List[TaskStatusInfo]])
 async def get_task_status_info(
     _: str = Depends(verify_credentials)
 ):
     """获取任务状态信息"""
-    from app.utils.enums import TaskStatus
-
     status_info = [
         TaskStatusInfo(
             status_code=TaskStatus.PENDING,
@@ -136,7 +209,96 @@ async def get_task_status_info(
             status_code=TaskStatus.FAILED,
             status_name="FAILED",
             description=TaskStatus.get_description(TaskStatus.FAILED)
+        ),
+        TaskStatusInfo(
+            status_code=TaskStatus.SCHEDULED,
+            status_name="SCHEDULED",
+            description=TaskStatus.get_description(TaskStatus.SCHEDULED)
+        ),
+        TaskStatusInfo(
+            status_code=TaskStatus.CANCELLED,
+            status_name="CANCELLED",
+            description=TaskStatus.get_description(TaskStatus.CANCELLED)
         )
     ]
 
     return ApiResponse(data=status_info, message="获取任务状态信息成功")
+
+
+def _export_response(export_service: ExportService, query, name: str) -> StreamingResponse:
+    """导出查询的流式响应（不设置Content-Length，按分块传输编码逐批发送）"""
+    filename = f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_service.export_format.value}"
+    return StreamingResponse(
+        export_service.stream(query),
+        media_type=EXPORT_MEDIA_TYPES[export_service.export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+def _check_created_range(
+    created_from: Optional[datetime],
+    created_to: Optional[datetime]
+) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """
+    校验导出时间范围
+
+    未带时区的时间按UTC处理（与数据库驱动绑定参数的方式一致），返回统一为带时区的时间范围。
+    """
+    created_from, created_to = (
+        value.replace(tzinfo=timezone.utc) if value is not None and value.tzinfo is None else value
+        for value in (created_from, created_to)
+    )
+    if created_from and created_to and created_from >= created_to:
+        raise HTTPException(status_code=400, detail="created_from必须早于created_to")
+    return created_from, created_to
+
+
+@router.get("/export/tasks")
+async def export_tasks(
+    export_format: ExportFormat = Query(ExportFormat.CSV, alias="format", description="导出格式: csv/jsonl"),
+    created_from: Optional[datetime] = Query(None, description="创建时间起（包含）"),
+    created_to: Optional[datetime] = Query(None, description="创建时间止（不包含）"),
+    source: Optional[str] = Query(None, description="来源标识"),
+    status: Optional[TaskStatus] = Query(None, description="任务状态"),
+    processing_app_id: Optional[str] = Query(None, description="处理任务的APP ID"),
+    _: str = Depends(verify_credentials)
+):
+    """流式导出任务"""
+    created_from, created_to = _check_created_range(created_from, created_to)
+
+    export_service = ExportService(export_format)
+    query = export_service.build_task_query(
+        created_from=created_from,
+        created_to=created_to,
+        source=source,
+        status=status,
+        processing_app_id=processing_app_id
+    )
+    return _export_response(export_service, query, "sms_tasks")
+
+
+@router.get("/export/logs/{log_type}")
+async def export_logs(
+    log_type: ExportLogType,
+    export_format: ExportFormat = Query(ExportFormat.CSV, alias="format", description="导出格式: csv/jsonl"),
+    created_from: Optional[datetime] = Query(None, description="创建时间起（包含）"),
+    created_to: Optional[datetime] = Query(None, description="创建时间止（不包含）"),
+    app_id: Optional[str] = Query(None, description="APP标识（发送、汇报日志）"),
+    status: Optional[TaskStatus] = Query(None, description="汇报状态（汇报日志）"),
+    _: str = Depends(verify_credentials)
+):
+    """流式导出接收/发送/汇报日志"""
+    created_from, created_to = _check_created_range(created_from, created_to)
+
+    export_service = ExportService(export_format)
+    try:
+        query = export_service.build_log_query(
+            log_type,
+            created_from=created_from,
+            created_to=created_to,
+            app_id=app_id,
+            status=status
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _export_response(export_service, query, f"{log_type.value}_logs")
@@ -1,17 +1,25 @@
+import asyncio
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, Request, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.database import get_db
 from app.auth import verify_credentials
 from app.services.sms_service import SmsService
 from app.services.log_service import LogService
+from app.services.schedule_service import ScheduleService
+from app.services.app_service import AppService
+from app.services.notify_service import notify_service
 from app.schemas.sms import (
     SmsRequest, SmsResponse, TaskQueryResponse,
-    PendingTaskResponse, ReportRequest, PendingTasksResponse
+    PendingTaskResponse, ReportRequest, PendingTasksResponse,
+    SmsBatchRequest, SmsBatchItemResult, SmsBatchResponse,
+    ReportBatchRequest, ReportBatchItemResult, ReportBatchResponse,
+    AppRegisterRequest, AppResponse
 )
 from app.schemas.response import ApiResponse
-from app.utils.enums import TaskStatus
+from app.utils.enums import TaskStatus, ReportOutcome
 from app.utils.helpers import generate_request_id
 
 router = APIRouter()
@@ -35,7 +43,9 @@ async def send_sms(
             phone_number=sms_request.phone_number,
             content=sms_request.content,
             use_template=sms_request.use_template,
-            source=sms_request.source
+            source=sms_request.source,
+            priority=sms_request.priority,
+            send_at=sms_request.send_at
         )
         
         response_data = SmsResponse(
@@ -51,7 +61,7 @@ async def send_sms(
             use_template=sms_request.use_template,
             source_ip=request.client.host if request.client else "",
             user_agent=request.headers.get("user-agent", ""),
-            request_data=sms_request.model_dump(),
+            request_data=sms_request.model_dump(mode="json"),
             response_data=response_data.model_dump(),
             status_code=200
         )
@@ -67,13 +77,72 @@ async def send_sms(
             use_template=sms_request.use_template,
             source_ip=request.client.host if request.client else "",
             user_agent=request.headers.get("user-agent", ""),
-            request_data=sms_request.model_dump(),
+            request_data=sms_request.model_dump(mode="json"),
             response_data={"error": str(e)},
             status_code=400
         )
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post("/send/batch", response_model=ApiResponse[SmsBatchResponse])
+async def send_sms_batch(
+    request: Request,
+    batch_request: SmsBatchRequest,
+    db: AsyncSession = Depends(get_db),
+    username: str = Depends(verify_credentials)
+):
+    """批量提交短信发送任务（任务和接收日志在同一事务中写入）"""
+    if len(batch_request.items) > settings.batch_max_size:
+        raise HTTPException(status_code=400, detail=f"单次最多提交{settings.batch_max_size}条任务")
+
+    request_id = generate_request_id()
+    sms_service = SmsService(db)
+    log_service = LogService(db)
+
+    outcomes = await sms_service.create_tasks_batch(batch_request.items)
+
+    source_ip = request.client.host if request.client else ""
+    user_agent = request.headers.get("user-agent", "")
+    results = []
+    receive_logs = []
+    for index, (sms_request, (task_id, status, error, warning)) in enumerate(zip(batch_request.items, outcomes)):
+        if error:
+            results.append(SmsBatchItemResult(index=index, error=error, warning=warning))
+            response_data = {"error": error}
+            status_code = 400
+        else:
+            results.append(SmsBatchItemResult(index=index, task_id=task_id, status=status, warning=warning))
+            response_data = SmsResponse(task_id=task_id, status=status).model_dump()
+            status_code = 200
+        if warning:
+            response_data["warning"] = warning
+
+        receive_logs.append({
+            "request_id": request_id,
+            "phone_number": sms_request.phone_number,
+            "content": sms_request.content,
+            "use_template": sms_request.use_template,
+            "source_ip": source_ip,
+            "user_agent": user_agent,
+            "request_data": sms_request.model_dump(mode="json"),
+            "response_data": response_data,
+            "status_code": status_code
+        })
+
+    # 记录接收日志并提交整个批次
+    await log_service.log_receive_batch(receive_logs)
+
+    success_count = sum(1 for result in results if result.task_id)
+    response_data = SmsBatchResponse(
+        total_count=len(results),
+        success_count=success_count,
+        failed_count=len(results) - success_count,
+        results=results
+    )
+
+    return ApiResponse(data=response_data)
+
+
 @router.get("/task/{task_id}", response_model=ApiResponse[TaskQueryResponse])
 async def get_task(
     task_id: str,
@@ -93,24 +162,87 @@ async def get_task(
         content=task.content,
         status=task.status,
         created_at=task.created_at,
+        send_at=task.send_at,
         sent_at=task.sent_at
     )
     
     return ApiResponse(data=response_data)
 
 
+@router.post("/task/{task_id}/cancel", response_model=ApiResponse[TaskQueryResponse])
+async def cancel_scheduled_task(
+    task_id: str,
+    db: AsyncSession = Depends(get_db),
+    username: str = Depends(verify_credentials)
+):
+    """取消尚未释放的定时任务"""
+    row = await ScheduleService(db).cancel_task(task_id)
+    if row is None:
+        task = await SmsService(db).get_task_by_id(task_id)
+        if not task:
+            raise HTTPException(status_code=404, detail="任务不存在")
+        raise HTTPException(status_code=409, detail="只能取消尚未释放的定时任务")
+
+    response_data = TaskQueryResponse(
+        task_id=row.task_id,
+        phone_number=row.phone_number,
+        content=row.content,
+        status=row.status,
+        created_at=row.created_at,
+        send_at=row.send_at,
+        sent_at=row.sent_at
+    )
+
+    return ApiResponse(data=response_data, message="定时任务已取消")
+
+
+@router.put("/apps/{app_id}", response_model=ApiResponse[AppResponse])
+async def register_app(
+    app_id: str,
+    register_request: AppRegisterRequest,
+    db: AsyncSession = Depends(get_db),
+    username: str = Depends(verify_credentials)
+):
+    """登记或更新APP的处理能力（领取任务时按此限制处理中的任务数）"""
+    if len(app_id) > 50:
+        raise HTTPException(status_code=400, detail="APP标识不能超过50个字符")
+
+    profile = await AppService(db).register(
+        app_id=app_id,
+        max_in_flight=register_request.max_in_flight,
+        send_rate_per_second=register_request.send_rate_per_second
+    )
+
+    return ApiResponse(data=AppResponse(**profile._asdict()), message="登记成功")
+
+
 @router.get("/tasks/pending", response_model=ApiResponse[PendingTasksResponse])
 async def get_pending_tasks(
     app_id: str = Query(..., description="APP标识"),
     limit: int = Query(10, ge=1, le=100, description="获取数量限制"),
+    wait_seconds: int = Query(
+        0, ge=0, le=settings.long_poll_max_wait_seconds,
+        description="没有任务时最长等待秒数（长轮询），0表示立即返回"
+    ),
     db: AsyncSession = Depends(get_db),
     username: str = Depends(verify_credentials)
 ):
-    """获取待发送任务（并发安全）"""
+    """获取待发送任务（并发安全，支持长轮询）"""
     sms_service = SmsService(db)
     log_service = LogService(db)
 
-    tasks = await sms_service.get_pending_tasks_safely(app_id, limit)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait_seconds
+    while True:
+        # 先取事件再查询，查询期间到达的新任务通知不会丢失
+        new_task_event = notify_service.new_task_event()
+        tasks = await sms_service.get_pending_tasks_safely(app_id, limit)
+
+        remaining = deadline - loop.time()
+        if tasks or remaining <= 0:
+            break
+        # 等待期间事务已结束，不占用数据库连接
+        await notify_service.wait_for_new_tasks(new_task_event, remaining)
 
     task_list = [
         PendingTaskResponse(
@@ -127,16 +259,19 @@ async def get_pending_tasks(
         tasks=task_list
     )
 
-    # 记录发送日志
-    for task in tasks:
-        await log_service.log_send(
-            task_id=task.task_id,
-            app_id=app_id,
-            phone_number=task.phone_number,
-            content=task.content,
-            request_data={"app_id": app_id, "limit": limit},
-            response_data={"task_count": len(tasks)}
-        )
+    # 记录发送日志（领取到的任务一次写入）
+    if tasks:
+        await log_service.log_send_batch([
+            {
+                "task_id": task.task_id,
+                "app_id": app_id,
+                "phone_number": task.phone_number,
+                "content": task.content,
+                "request_data": {"app_id": app_id, "limit": limit},
+                "response_data": {"task_count": len(tasks)}
+            }
+            for task in tasks
+        ])
 
     return ApiResponse(data=response_data)
 
@@ -158,16 +293,20 @@ async def report_result(
     # 构建结果信息
     result_message = "发送成功" if report_request.status == TaskStatus.SUCCESS else report_request.error_message
 
-    # 更新任务状态（由APP判断是否重试）
-    success = await sms_service.update_task_status(
+    # 更新任务状态（由APP判断是否重试），只处理由该APP领取、仍在处理中的任务
+    outcome = await sms_service.report_task(
         task_id=report_request.task_id,
+        app_id=report_request.app_id,
         status=TaskStatus(report_request.status),
         result_message=result_message,
-        should_retry=report_request.should_retry
+        should_retry=report_request.should_retry,
+        error_class=report_request.error_class
     )
-    
-    if not success:
-        raise HTTPException(status_code=404, detail="任务不存在或更新失败")
+
+    if outcome == ReportOutcome.NOT_FOUND:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    if outcome == ReportOutcome.STALE:
+        raise HTTPException(status_code=409, detail="任务不在该APP处理中（已汇报、已超时恢复或已被其他APP领取）")
     
     # 记录汇报日志
     await log_service.log_report(
@@ -179,3 +318,78 @@ async def report_result(
     )
     
     return ApiResponse(message="汇报成功")
+
+
+@router.post("/report/batch", response_model=ApiResponse[ReportBatchResponse])
+async def report_result_batch(
+    batch_request: ReportBatchRequest,
+    db: AsyncSession = Depends(get_db),
+    username: str = Depends(verify_credentials)
+):
+    """批量汇报发送结果（状态更新和汇报日志在同一事务中写入）"""
+    if len(batch_request.items) > settings.batch_max_size:
+        raise HTTPException(status_code=400, detail=f"单次最多汇报{settings.batch_max_size}条结果")
+
+    sms_service = SmsService(db)
+    log_service = LogService(db)
+
+    # 同一任务重复汇报时以最后一条为准
+    last_index = {item.task_id: index for index, item in enumerate(batch_request.items)}
+    valid_statuses = (TaskStatus.SUCCESS, TaskStatus.FAILED)
+
+    reports = []
+    for index, item in enumerate(batch_request.items):
+        if last_index[item.task_id] != index or item.status not in valid_statuses:
+            continue
+        result_message = "发送成功" if item.status == TaskStatus.SUCCESS else item.error_message
+        reports.append((
+            item.task_id, TaskStatus(item.status), result_message, item.should_retry, item.error_class, item.app_id
+        ))
+
+    updated = await sms_service.update_task_status_batch(reports)
+    # 未更新的任务区分不存在和不在该APP处理中
+    existing = await sms_service.get_existing_task_ids(
+        [task_id for task_id, *_ in reports if task_id not in updated]
+    )
+
+    results = []
+    report_logs = []
+    for index, item in enumerate(batch_request.items):
+        if last_index[item.task_id] != index:
+            results.append(ReportBatchItemResult(task_id=item.task_id, outcome=ReportOutcome.DUPLICATE))
+            continue
+        if item.status not in valid_statuses:
+            results.append(ReportBatchItemResult(task_id=item.task_id, outcome=ReportOutcome.INVALID))
+            continue
+
+        row = updated.get(item.task_id)
+        if row is None:
+            outcome = ReportOutcome.STALE if item.task_id in existing else ReportOutcome.NOT_FOUND
+            results.append(ReportBatchItemResult(task_id=item.task_id, outcome=outcome))
+            continue
+
+        results.append(ReportBatchItemResult(
+            task_id=item.task_id,
+            outcome=sms_service.report_outcome(row),
+            status=row.status,
+            retry_count=row.retry_count
+        ))
+
+        report_logs.append({
+            "task_id": item.task_id,
+            "app_id": item.app_id,
+            "status": item.status,
+            "error_message": item.error_message,
+            "request_data": item.model_dump()
+        })
+
+    # 记录汇报日志并提交整个批次
+    await log_service.log_report_batch(report_logs)
+
+    response_data = ReportBatchResponse(
+        total_count=len(results),
+        updated_count=len(updated),
+        results=results
+    )
+
+    return ApiResponse(data=response_data, message="汇报成功")
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional
 
 
 class Settings(BaseSettings):
@@ -26,8 +26,73 @@ class Settings(BaseSettings):
 
     # 重试配置
     max_retry_count: int = 3
-    retry_delay_minutes: int = 5
+    retry_delay_minutes: int = 5  # 第一次重试的延迟，之后每次重试翻倍
+    retry_backoff_max_minutes: int = 60  # 重试延迟上限
+    retry_backoff_jitter: float = 0.2  # 重试延迟随机浮动比例（0.2表示±20%）
+    retry_delay_minutes_by_error_class: Dict[str, float] = {}  # 按错误类别的第一次重试延迟，如 {"rate_limited": 1}
     processing_timeout_minutes: int = 30
+    zombie_recovery_chunk_size: int = 1000
+
+    # 任务表分区配置
+    task_partition_premake_months: int = 3
+    task_queue_lookback_days: int = 0  # 领取任务和僵尸恢复只访问该天数内创建的任务，0表示不限制（超出范围的未完成任务不再处理）
+
+    # 优先级通道配置
+    task_priority_mode: str = "strict"  # strict/weighted
+    task_priority_weights: Dict[str, float] = {"high": 8, "normal": 3, "low": 1}  # weighted模式下各通道优先领取的权重
+
+    # 来源公平调度配置
+    task_source_scheduling: str = "fifo"  # fifo/fair
+    task_source_weights: Dict[str, float] = {}  # fair模式下各来源的权重，未配置的来源为1，无来源的任务键为""
+
+    # 定时发送配置
+    scheduled_send_max_days: int = 7  # send_at最多可指定的天数，设置了TASK_QUEUE_LOOKBACK_DAYS时需小于该值
+    scheduled_release_rate_per_second: int = 200  # 每个实例每秒最多释放的到期定时任务数
+    scheduled_release_interval_seconds: float = 1.0
+
+    # APP处理能力配置
+    app_target_report_seconds: float = 60  # 领取到汇报的目标耗时，汇报延迟超过时按比例减少每次领取数量，低于时按比例增加
+    app_claim_limit_max: int = 100  # 已登记APP汇报延迟低于目标时每次最多领取的任务数，不超过请求数量时不增加
+    app_report_latency_ewma_alpha: float = 0.2  # 汇报延迟滑动平均的平滑系数
+    app_cache_ttl_seconds: int = 60  # APP登记信息的进程内缓存时间
+
+    # 任务计数配置
+    task_counter_shards: int = 16
+    task_counter_reconcile_interval_seconds: int = 3600
+
+    # 日志表分区配置
+    log_partition_interval: str = "day"  # day/week
+    log_partition_premake: int = 7
+    log_retention_days: int = 30  # 0表示不删除
+
+    # 任务归档配置
+    archive_after_days: int = 0  # 归档创建超过该天数的终态任务，0表示不归档
+    archive_dir: str = "archive"
+    archive_chunk_size: int = 5000
+    archive_interval_seconds: int = 3600
+
+    # SQL统计配置
+    slow_query_threshold_ms: int = 500  # 耗时超过该值的语句写入慢查询日志，0表示不记录
+
+    # 数据导出配置
+    export_batch_size: int = 1000  # 服务端游标每次读取的行数
+
+    # 批量接口配置
+    batch_max_size: int = 5000
+
+    # 长轮询配置
+    long_poll_max_wait_seconds: int = 30
+
+    # 模板缓存配置
+    template_cache_ttl_seconds: int = 300
+
+    # 日志写缓冲配置
+    log_buffer_enabled: bool = True
+    log_buffer_max_size: int = 10000
+    log_buffer_flush_size: int = 500
+    log_buffer_flush_interval_seconds: float = 1.0
+    log_buffer_overflow_policy: str = "drop_oldest"  # drop_oldest/drop_newest/block
+    log_buffer_lag_warning_seconds: float = 5.0
 
     # 文档配置
     enable_docs: bool = True
@@ -37,6 +102,11 @@ class Settings(BaseSettings):
         """动态构建数据库连接URL"""
         return f"postgresql+asyncpg://{self.postgres_user}:{self.postgres_password}@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
 
+    @property
+    def asyncpg_dsn(self) -> str:
+        """asyncpg原生连接URL（用于LISTEN/NOTIFY等独立连接）"""
+        return f"postgresql://{self.postgres_user}:{self.postgres_password}@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
+
     class Config:
         env_file = ".env"
         case_sensitive = False
@@ -1,6 +1,22 @@
+import time
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.config import settings
+from app.utils.metrics import metrics, DB_POOL_WAIT
+from app.utils.sql_stats import sql_stats
+
+
+class MeteredQueuePool(AsyncAdaptedQueuePool):
+    """记录获取连接耗时的连接池（连接池耗尽时即为请求排队等待连接的时间）"""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - start)
+
 
 # 创建异步数据库引擎
 engine = create_async_engine(
@@ -8,6 +24,7 @@ engine = create_async_engine(
     echo=settings.debug,
     pool_pre_ping=True,
     pool_recycle=300,
+    poolclass=MeteredQueuePool,
 )
 
 # 创建异步会话工厂
@@ -17,6 +34,15 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False
 )
 
+# SQL语句耗时统计和慢查询日志
+sql_stats.install(engine)
+
+# 连接池指标（输出指标时读取）
+metrics.gauge("lksms_db_pool_size", "连接池常驻连接数", callback=engine.pool.size)
+metrics.gauge("lksms_db_pool_checked_in", "连接池中空闲的连接数", callback=engine.pool.checkedin)
+metrics.gauge("lksms_db_pool_checked_out", "已借出的连接数", callback=engine.pool.checkedout)
+metrics.gauge("lksms_db_pool_overflow", "超出常驻连接数的溢出连接数", callback=lambda: max(engine.pool.overflow(), 0))
+
 # 创建基础模型类
 Base = declarative_base()
 
@@ -0,0 +1,547 @@
+"""
+端到端压测工具
+
+模拟第三方系统按泊松到达提交短信（/send或/send/batch），同时模拟发送APP循环领取任务（/tasks/pending）、
+模拟发送耗时后按失败比例和重试概率汇报结果（/report或/report/batch），统计：
+
+- 提交->领取、领取->汇报、提交->汇报的延迟分位数（提交->领取另按优先级通道和来源统计）
+- 提交、领取、汇报吞吐量和各接口请求耗时
+- 重复派发次数（任务在汇报前被再次领取）
+- 数据库连接池等待时间和最大占用（读取/metrics）
+
+用法:
+    python -m app.loadtest                                 # 在进程内启动应用（使用.env中的数据库）
+    python -m app.loadtest --url http://localhost:8000     # 压测已启动的服务
+    python -m app.loadtest --producers 20 --producer-rate 50 --apps 10 --duration 120 --output result.json
+    python -m app.loadtest --high-priority-ratio 0.05 --send-batch-size 100   # 营销批量短信中混入5%验证码
+    python -m app.loadtest --noisy-producer-rate 500 --send-batch-size 50     # 一个来源大量提交，检查其他来源的等待时间
+    python -m app.loadtest --app-max-in-flight 20 --send-delay-ms 500         # 登记APP处理能力，检查处理中任务数不超过上限
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import sys
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import httpx
+
+from app.config import settings
+
+SEND_PATH = "/api/v1/sms/send"
+SEND_BATCH_PATH = "/api/v1/sms/send/batch"
+PENDING_PATH = "/api/v1/sms/tasks/pending"
+REPORT_PATH = "/api/v1/sms/report"
+REPORT_BATCH_PATH = "/api/v1/sms/report/batch"
+APP_PATH = "/api/v1/sms/apps/{app_id}"
+METRICS_PATH = "/metrics"
+
+# 优先级 -> 通道名称（与TaskPriority一致）
+PRIORITY_LANES = {0: "high", 1: "normal", 2: "low"}
+
+METRIC_SAMPLE_PATTERN = re.compile(r'^(\w+)(?:\{([^}]*)\})? (\S+)$')
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """延迟分位数（毫秒）"""
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def at(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1000, 2)
+
+    return {
+        "count": len(ordered),
+        "p50_ms": at(0.50),
+        "p90_ms": at(0.90),
+        "p95_ms": at(0.95),
+        "p99_ms": at(0.99),
+        "max_ms": round(ordered[-1] * 1000, 2)
+    }
+
+
+def parse_metrics(text: str) -> Dict[Tuple[str, str], float]:
+    """解析Prometheus文本格式：(指标名, 标签) -> 值"""
+    samples = {}
+    for line in text.splitlines():
+        match = METRIC_SAMPLE_PATTERN.match(line)
+        if match:
+            samples[(match.group(1), match.group(2) or "")] = float(match.group(3))
+    return samples
+
+
+def histogram_delta(before: Dict[Tuple[str, str], float], after: Dict[Tuple[str, str], float], name: str) -> Dict[str, Any]:
+    """两次采样之间直方图的增量：次数、平均值和按分桶上界估计的分位数（毫秒）"""
+    count = after.get((f"{name}_count", ""), 0) - before.get((f"{name}_count", ""), 0)
+    total = after.get((f"{name}_sum", ""), 0) - before.get((f"{name}_sum", ""), 0)
+    if count <= 0:
+        return {"count": 0}
+
+    buckets = []
+    for (metric, labels), value in after.items():
+        if metric == f"{name}_bucket":
+            bound = labels.split('le="')[1].rstrip('"')
+            buckets.append((float(bound), value - before.get((metric, labels), 0)))
+    buckets.sort()
+
+    def upper_bound(p: float) -> Optional[float]:
+        for bound, cumulative in buckets:
+            if cumulative >= count * p:
+                return None if bound == float("inf") else round(bound * 1000, 2)
+        return None
+
+    return {
+        "count": int(count),
+        "mean_ms": round(total / count * 1000, 3),
+        "p50_le_ms": upper_bound(0.50),
+        "p95_le_ms": upper_bound(0.95),
+        "p99_le_ms": upper_bound(0.99)
+    }
+
+
+class LoadTestStats:
+    """压测过程中的统计（所有协程在同一事件循环中运行，无需加锁）"""
+
+    def __init__(self):
+        self.sent_at: Dict[str, float] = {}       # 任务ID -> 提交请求发出时间
+        self.claimed_at: Dict[str, float] = {}    # 任务ID -> 最近一次领取时间
+        self.in_flight: Set[str] = set()          # 已领取未汇报的任务
+        self.finished: Dict[str, float] = {}      # 已进入终态的任务 -> 汇报时间
+        self.retrying: Set[str] = set()           # 被要求重试、等待重新领取的任务
+        self.priorities: Dict[str, str] = {}      # 任务ID -> 优先级通道
+        self.sources: Dict[str, str] = {}         # 任务ID -> 来源标识
+        self.send_to_claim: List[float] = []
+        self.send_to_claim_by_priority: Dict[str, List[float]] = {}
+        self.send_to_claim_by_source: Dict[str, List[float]] = {}
+        self.claim_to_report: List[float] = []
+        self.send_to_report: List[float] = []
+        self.request_latency: Dict[str, List[float]] = {}
+        self.errors: Counter = Counter()
+        self.outcomes: Counter = Counter()
+        self.claimed_count = 0
+        self.empty_claims = 0
+        self.double_dispatch_count = 0
+        self.max_pool_checked_out = 0
+        self.max_pool_overflow = 0
+
+    def on_sent(self, task_id: str, sent_at: float, priority: str, source: str) -> None:
+        """记录提交；长轮询的APP可能在提交响应返回前就领取甚至汇报了任务"""
+        self.sent_at[task_id] = sent_at
+        self.priorities[task_id] = priority
+        self.sources[task_id] = source
+        if task_id in self.claimed_at:
+            self._record_send_to_claim(task_id, self.claimed_at[task_id] - sent_at)
+        if task_id in self.finished:
+            self.send_to_report.append(self.finished[task_id] - sent_at)
+
+    def on_claimed(self, task_id: str, now: float) -> None:
+        self.claimed_count += 1
+        if task_id in self.in_flight:
+            self.double_dispatch_count += 1
+        self.in_flight.add(task_id)
+
+        # 提交->领取只统计首次领取
+        sent_at = self.sent_at.get(task_id)
+        if sent_at is not None and task_id not in self.claimed_at:
+            self._record_send_to_claim(task_id, now - sent_at)
+        self.claimed_at[task_id] = now
+
+    def _record_send_to_claim(self, task_id: str, latency: float) -> None:
+        self.send_to_claim.append(latency)
+        self.send_to_claim_by_priority.setdefault(self.priorities[task_id], []).append(latency)
+        self.send_to_claim_by_source.setdefault(self.sources[task_id], []).append(latency)
+
+    def on_reported(self, task_id: str, outcome: str, now: float) -> None:
+        self.outcomes[outcome] += 1
+        self.in_flight.discard(task_id)
+        claimed_at = self.claimed_at.get(task_id)
+        if claimed_at is not None:
+            self.claim_to_report.append(now - claimed_at)
+        if outcome == "retry":
+            self.retrying.add(task_id)
+        elif outcome in ("success", "failed"):
+            self.retrying.discard(task_id)
+            self.finished[task_id] = now
+            sent_at = self.sent_at.get(task_id)
+            if sent_at is not None:
+                self.send_to_report.append(now - sent_at)
+
+    def unfinished_count(self) -> int:
+        """本次提交、尚未进入终态且未被要求重试的任务数"""
+        return sum(1 for task_id in self.sent_at if task_id not in self.finished and task_id not in self.retrying)
+
+    def foreign_task_count(self) -> int:
+        """领取到的非本次压测提交的任务数（压测前的积压任务）"""
+        return sum(1 for task_id in self.claimed_at if task_id not in self.sent_at)
+
+
+class LoadTest:
+    """端到端压测"""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.random = random.Random(args.seed)
+        self.stats = LoadTestStats()
+        self.producers_running = True
+        self.apps_running = True
+
+    async def run(self, client: httpx.AsyncClient) -> Dict[str, Any]:
+        """运行压测并返回结果"""
+        args = self.args
+        before = await self._read_metrics(client)
+
+        app_ids = [f"loadtest_app_{i}" for i in range(args.apps)]
+        if args.app_max_in_flight > 0:
+            for app_id in app_ids:
+                await self._request(
+                    client, "register_app", "PUT", APP_PATH.format(app_id=app_id),
+                    json={"max_in_flight": args.app_max_in_flight}
+                )
+
+        producers = [asyncio.create_task(self._produce(client, i)) for i in range(args.producers)]
+        apps = [asyncio.create_task(self._send_app(client, app_id)) for app_id in app_ids]
+        monitor = asyncio.create_task(self._monitor_pool(client))
+
+        started = time.monotonic()
+        await asyncio.sleep(args.duration)
+        self.producers_running = False
+        await asyncio.gather(*producers)
+        produced_seconds = time.monotonic() - started
+
+        # 停止提交后继续领取和汇报，直到本次提交的任务全部汇报或超过排空时间
+        drain_deadline = time.monotonic() + args.drain_seconds
+        while time.monotonic() < drain_deadline and self.stats.unfinished_count() > 0:
+            await asyncio.sleep(0.2)
+        self.apps_running = False
+        await asyncio.gather(*apps)
+        monitor.cancel()
+        elapsed = time.monotonic() - started
+
+        after = await self._read_metrics(client)
+        return self._summary(produced_seconds, elapsed, before, after)
+
+    async def _produce(self, client: httpx.AsyncClient, index: int) -> None:
+        """模拟第三方系统：按泊松过程提交短信，每个系统使用各自的来源标识（指定--noisy-producer-rate时第0个系统按该速率提交）"""
+        args = self.args
+        rate = args.noisy_producer_rate if index == 0 and args.noisy_producer_rate > 0 else args.producer_rate
+        interval = args.send_batch_size / rate
+        source = f"loadtest_{index}"
+        sequence = 0
+        while self.producers_running:
+            await asyncio.sleep(self.random.expovariate(1 / interval))
+            if not self.producers_running:
+                break
+
+            items = []
+            for _ in range(args.send_batch_size):
+                sequence += 1
+                items.append({
+                    "phone_number": f"139{index:04d}{sequence % 10000:04d}",
+                    "content": f"压测短信 {index}-{sequence}",
+                    "source": source,
+                    "priority": self._choose_priority()
+                })
+
+            sent_at = time.monotonic()
+            if args.send_batch_size == 1:
+                data = await self._request(client, "send", "POST", SEND_PATH, json=items[0])
+                task_ids = [data["task_id"]] if data else []
+            else:
+                data = await self._request(client, "send_batch", "POST", SEND_BATCH_PATH, json={"items": items})
+                task_ids = [item["task_id"] for item in data["results"] if item.get("task_id")] if data else []
+
+            if args.send_batch_size == 1:
+                priorities = [items[0]["priority"]] if data else []
+            else:
+                priorities = [item["priority"] for item, result in zip(items, data["results"]) if result.get("task_id")] if data else []
+            for task_id, priority in zip(task_ids, priorities):
+                self.stats.on_sent(task_id, sent_at, PRIORITY_LANES[priority], source)
+
+    def _choose_priority(self) -> int:
+        """按--high-priority-ratio混入高优先级短信，其余为低优先级（模拟营销批量短信）；比例为0时均为普通"""
+        ratio = self.args.high_priority_ratio
+        if ratio <= 0:
+            return 1
+        return 0 if self.random.random() < ratio else 2
+
+    async def _send_app(self, client: httpx.AsyncClient, app_id: str) -> None:
+        """模拟发送APP：领取任务，模拟发送耗时后汇报结果"""
+        args = self.args
+        while self.apps_running:
+            data = await self._request(
+                client, "pending", "GET", PENDING_PATH,
+                params={"app_id": app_id, "limit": args.claim_limit, "wait_seconds": args.wait_seconds}
+            )
+            if data is None:
+                await asyncio.sleep(1)
+                continue
+
+            tasks = data["tasks"]
+            if not tasks:
+                self.stats.empty_claims += 1
+                continue
+
+            now = time.monotonic()
+            for task in tasks:
+                self.stats.on_claimed(task["task_id"], now)
+
+            # 同一批任务并发发送，全部完成后汇报
+            reports = await asyncio.gather(*(self._simulate_send(app_id, task) for task in tasks))
+            if args.report_batch:
+                await self._report_batch(client, reports)
+            else:
+                await asyncio.gather(*(self._report(client, report) for report in reports))
+
+    async def _simulate_send(self, app_id: str, task: Dict[str, Any]) -> Dict[str, Any]:
+        """模拟发送耗时和结果"""
+        args = self.args
+        if args.send_delay_ms > 0:
+            await asyncio.sleep(self.random.expovariate(1000 / args.send_delay_ms))
+
+        failed = self.random.random() < args.failure_ratio
+        return {
+            "task_id": task["task_id"],
+            "app_id": app_id,
+            "status": 3 if failed else 2,
+            "error_message": "模拟发送失败" if failed else None,
+            "should_retry": failed and self.random.random() < args.retry_probability
+        }
+
+    async def _report(self, client: httpx.AsyncClient, report: Dict[str, Any]) -> None:
+        """单条汇报"""
+        response = await self._request(client, "report", "POST", REPORT_PATH, json=report, with_data=False)
+        if response is not None:
+            if report["status"] == 2:
+                outcome = "success"
+            else:
+                outcome = "retry" if report["should_retry"] else "failed"
+            self.stats.on_reported(report["task_id"], outcome, time.monotonic())
+
+    async def _report_batch(self, client: httpx.AsyncClient, reports: List[Dict[str, Any]]) -> None:
+        """批量汇报"""
+        data = await self._request(client, "report_batch", "POST", REPORT_BATCH_PATH, json={"items": reports})
+        if data is not None:
+            now = time.monotonic()
+            for item in data["results"]:
+                self.stats.on_reported(item["task_id"], item["outcome"], now)
+
+    async def _request(
+        self,
+        client: httpx.AsyncClient,
+        name: str,
+        method: str,
+        path: str,
+        with_data: bool = True,
+        **kwargs
+    ) -> Optional[Any]:
+        """发送请求并记录耗时，失败时返回None"""
+        start = time.monotonic()
+        try:
+            response = await client.request(method, path, **kwargs)
+        except httpx.HTTPError as e:
+            self.stats.errors[f"{name}: {type(e).__name__}"] += 1
+            return None
+        finally:
+            self.stats.request_latency.setdefault(name, []).append(time.monotonic() - start)
+
+        if response.status_code != 200:
+            self.stats.errors[f"{name}: HTTP {response.status_code}"] += 1
+            return None
+        return response.json()["data"] if with_data else True
+
+    async def _monitor_pool(self, client: httpx.AsyncClient) -> None:
+        """每秒采样一次连接池占用"""
+        while True:
+            samples = await self._read_metrics(client)
+            self.stats.max_pool_checked_out = max(
+                self.stats.max_pool_checked_out, int(samples.get(("lksms_db_pool_checked_out", ""), 0))
+            )
+            self.stats.max_pool_overflow = max(
+                self.stats.max_pool_overflow, int(samples.get(("lksms_db_pool_overflow", ""), 0))
+            )
+            await asyncio.sleep(1)
+
+    @staticmethod
+    async def _read_metrics(client: httpx.AsyncClient) -> Dict[Tuple[str, str], float]:
+        try:
+            response = await client.get(METRICS_PATH)
+            response.raise_for_status()
+        except httpx.HTTPError:
+            return {}
+        return parse_metrics(response.text)
+
+    def _summary(
+        self,
+        produced_seconds: float,
+        elapsed: float,
+        before: Dict[Tuple[str, str], float],
+        after: Dict[Tuple[str, str], float]
+    ) -> Dict[str, Any]:
+        stats = self.stats
+        reported = sum(stats.outcomes.values())
+        return {
+            "config": vars(self.args),
+            "duration_seconds": round(elapsed, 2),
+            "throughput": {
+                "sent_per_second": round(len(stats.sent_at) / produced_seconds, 2),
+                "claimed_per_second": round(stats.claimed_count / elapsed, 2),
+                "reported_per_second": round(reported / elapsed, 2)
+            },
+            "counts": {
+                "sent": len(stats.sent_at),
+                "claimed": stats.claimed_count,
+                "reported": reported,
+                "outcomes": dict(stats.outcomes),
+                "unfinished": stats.unfinished_count(),
+                "empty_claims": stats.empty_claims,
+                "double_dispatch": stats.double_dispatch_count,
+                "foreign_tasks": stats.foreign_task_count()
+            },
+            "latency": {
+                "send_to_claim": percentiles(stats.send_to_claim),
+                "claim_to_report": percentiles(stats.claim_to_report),
+                "send_to_report": percentiles(stats.send_to_report)
+            },
+            "send_to_claim_by_priority": {
+                lane: percentiles(values) for lane, values in sorted(stats.send_to_claim_by_priority.items())
+            },
+            "send_to_claim_by_source": {
+                source: percentiles(values) for source, values in sorted(stats.send_to_claim_by_source.items())
+            },
+            "requests": {name: percentiles(values) for name, values in stats.request_latency.items()},
+            "errors": dict(stats.errors),
+            "db_pool": {
+                "wait": histogram_delta(before, after, "lksms_db_pool_wait_seconds"),
+                "max_checked_out": stats.max_pool_checked_out,
+                "max_overflow": stats.max_pool_overflow
+            }
+        }
+
+
+@asynccontextmanager
+async def create_client(
+    url: Optional[str],
+    auth: Tuple[str, str],
+    timeout: float,
+    max_connections: int
+):
+    """创建HTTP客户端：指定url时访问已启动的服务，否则在进程内启动应用"""
+    timeout = httpx.Timeout(timeout)
+    if url:
+        limits = httpx.Limits(max_connections=max_connections)
+        async with httpx.AsyncClient(base_url=url, auth=auth, timeout=timeout, limits=limits) as client:
+            yield client
+        return
+
+    from app.main import app
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", auth=auth, timeout=timeout) as client:
+            yield client
+
+
+def print_summary(result: Dict[str, Any]) -> None:
+    """输出压测结果"""
+    print("\n" + "="*60)
+    print("📊 压测结果")
+    print("="*60)
+    throughput = result["throughput"]
+    counts = result["counts"]
+    print(f"耗时: {result['duration_seconds']} 秒")
+    print(f"吞吐: 提交 {throughput['sent_per_second']}/s，领取 {throughput['claimed_per_second']}/s，"
+          f"汇报 {throughput['reported_per_second']}/s")
+    print(f"数量: 提交 {counts['sent']}，领取 {counts['claimed']}，汇报 {counts['reported']} {counts['outcomes']}，"
+          f"未完成 {counts['unfinished']}，空领取 {counts['empty_claims']}")
+    print(f"重复派发: {counts['double_dispatch']}" + ("" if counts["double_dispatch"] == 0 else " ❌"))
+
+    print("\n延迟（毫秒）:")
+    by_priority = result["send_to_claim_by_priority"]
+    by_source = result["send_to_claim_by_source"]
+    latency = {
+        **result["latency"],
+        **({f"send_to_claim[{k}]": v for k, v in by_priority.items()} if len(by_priority) > 1 else {}),
+        **({f"send_to_claim[{k}]": v for k, v in by_source.items()} if len(by_source) > 1 else {}),
+        **{f"请求 {k}": v for k, v in result["requests"].items()}
+    }
+    for name, value in latency.items():
+        if value["count"]:
+            print(f"   {name:<28} n={value['count']:<8} p50={value['p50_ms']:<9} p95={value['p95_ms']:<9} "
+                  f"p99={value['p99_ms']:<9} max={value['max_ms']}")
+
+    pool = result["db_pool"]
+    wait = pool["wait"]
+    print(f"\n连接池: 最大占用 {pool['max_checked_out']}，最大溢出 {pool['max_overflow']}", end="")
+    if wait["count"]:
+        print(f"，获取连接 {wait['count']} 次，平均 {wait['mean_ms']}ms，p95 ≤ {wait['p95_le_ms']}ms，p99 ≤ {wait['p99_le_ms']}ms")
+    else:
+        print()
+
+    if result["errors"]:
+        print(f"\n⚠️  错误: {result['errors']}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="端到端压测工具")
+    parser.add_argument("--url", help="服务地址，不指定时在进程内启动应用")
+    parser.add_argument("--username", default=settings.basic_auth_username, help="Basic Auth用户名")
+    parser.add_argument("--password", default=settings.basic_auth_password, help="Basic Auth密码")
+    parser.add_argument("--duration", type=float, default=60, help="提交持续时间（秒）")
+    parser.add_argument("--drain-seconds", type=float, default=30, help="停止提交后等待任务汇报完成的最长时间（秒）")
+    parser.add_argument("--producers", type=int, default=5, help="模拟第三方系统数")
+    parser.add_argument("--producer-rate", type=float, default=20, help="每个第三方系统每秒提交的短信数")
+    parser.add_argument("--send-batch-size", type=int, default=1, help="每次提交的短信数，大于1时使用批量接口")
+    parser.add_argument("--apps", type=int, default=3, help="模拟发送APP数")
+    parser.add_argument("--claim-limit", type=int, default=10, help="每次领取的任务数")
+    parser.add_argument("--wait-seconds", type=int, default=2, help="领取任务的长轮询等待时间（秒）")
+    parser.add_argument("--send-delay-ms", type=float, default=50, help="模拟发送耗时的平均值（毫秒，指数分布）")
+    parser.add_argument("--failure-ratio", type=float, default=0.05, help="发送失败比例")
+    parser.add_argument("--retry-probability", type=float, default=0.5, help="发送失败时要求重试的概率")
+    parser.add_argument("--report-batch", action="store_true", help="使用批量汇报接口")
+    parser.add_argument("--high-priority-ratio", type=float, default=0,
+                        help="高优先级短信的比例，其余为低优先级；为0时均为普通优先级")
+    parser.add_argument("--noisy-producer-rate", type=float, default=0,
+                        help="第0个第三方系统每秒提交的短信数（模拟单个来源大量提交），为0时与其他系统相同")
+    parser.add_argument("--app-max-in-flight", type=int, default=0,
+                        help="压测前为每个模拟APP登记的最多处理中任务数，为0时不登记")
+    parser.add_argument("--seed", type=int, help="随机数种子")
+    parser.add_argument("--output", help="结果保存为JSON文件")
+    return parser.parse_args(argv)
+
+
+async def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    print("🚀 开始压测")
+    print(f"   目标: {args.url or '进程内应用'}")
+    print(f"   提交: {args.producers} × {args.producer_rate}/s，持续 {args.duration} 秒")
+    if args.noisy_producer_rate > 0:
+        scheduling = "" if args.url else f"，来源调度: {settings.task_source_scheduling}"
+        print(f"   其中 loadtest_0 提交 {args.noisy_producer_rate}/s{scheduling}")
+    print(f"   发送APP: {args.apps} 个，每次领取 {args.claim_limit} 个，失败比例 {args.failure_ratio}")
+    if args.app_max_in_flight > 0:
+        print(f"   每个APP最多处理中 {args.app_max_in_flight} 个任务")
+
+    async with create_client(
+        args.url,
+        (args.username, args.password),
+        timeout=args.wait_seconds + 30,
+        max_connections=args.producers + args.apps + 10
+    ) as client:
+        result = await LoadTest(args).run(client)
+
+    print_summary(result)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 结果已保存: {args.output}")
+
+    return 1 if result["counts"]["double_dispatch"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -1,12 +1,22 @@
 import asyncio
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
 
 from app.config import settings
-from app.database import init_db
+from app.database import init_db, AsyncSessionLocal
+from app.auth import verify_credentials
 from app.api.v1 import sms, admin
 from app.services.scheduler_service import scheduler
+from app.services.notify_service import notify_service
+from app.services.log_buffer import log_buffer
+from app.services.counter_service import CounterService, lane_counter_key
+from app.utils.metrics import (
+    metrics, MetricsMiddleware, HTTP_REQUEST_DURATION, TASKS_BY_STATUS, PENDING_TASKS_BY_PRIORITY
+)
+from app.utils.enums import TaskPriority
+from app.utils.sql_stats import sql_stats, QueryStatsMiddleware
 
 
 @asynccontextmanager
@@ -15,13 +25,26 @@ async def lifespan(app: FastAPI):
     # 启动时初始化数据库
     await init_db()
 
-    # 启动僵尸任务恢复定时器
-    asyncio.create_task(scheduler.start_zombie_task_recovery())
+    # 创建当前及后续的表分区
+    await scheduler.maintain_partitions()
+
+    # 启动日志写缓冲
+    await log_buffer.start()
+
+    # 启动定时任务（僵尸任务恢复、任务计数校准、表分区维护、任务归档）
+    asyncio.create_task(scheduler.start())
+
+    # 启动数据库通知监听（长轮询唤醒）
+    asyncio.create_task(notify_service.start())
 
     yield
 
     # 关闭时停止定时器
-    await scheduler.stop_zombie_task_recovery()
+    await scheduler.stop()
+    await notify_service.stop()
+
+    # 写入缓冲区中剩余的日志
+    await log_buffer.stop()
 
 
 # 创建FastAPI应用
@@ -45,6 +68,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 请求耗时指标
+app.add_middleware(MetricsMiddleware, histogram=HTTP_REQUEST_DURATION)
+
+# 请求级SQL统计（X-DB-Query-Count、X-DB-Time-Ms响应头）
+app.add_middleware(QueryStatsMiddleware, collector=sql_stats)
+
 # 注册路由
 app.include_router(sms.router, prefix="/api/v1/sms", tags=["短信服务"])
 app.include_router(admin.router, prefix="/api/v1/admin", tags=["管理接口"])
@@ -62,6 +91,22 @@ async def health_check():
     return {"status": "healthy", "service": "lksms-service"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(_: str = Depends(verify_credentials)):
+    """Prometheus指标（文本格式）"""
+    # 各状态任务数读取计数表，只需对少量计数行求和
+    async with AsyncSessionLocal() as db:
+        counts = await CounterService(db).get_counts()
+    lane_keys = {lane_counter_key(priority): priority.lane for priority in TaskPriority}
+    for key, count in counts.items():
+        if key in lane_keys:
+            PENDING_TASKS_BY_PRIORITY.set(count, priority=lane_keys[key])
+        else:
+            TASKS_BY_STATUS.set(count, status=key)
+
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
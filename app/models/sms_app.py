@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, Float, String, DateTime, func
+from app.database import Base
+
+
+class SmsApp(Base):
+    """发送APP表（登记APP的处理能力，领取任务时按此限制）"""
+    __tablename__ = "sms_apps"
+
+    app_id = Column(String(50), primary_key=True, comment="APP标识")
+    max_in_flight = Column(Integer, nullable=False, comment="最多同时持有的处理中任务数（已领取未汇报）")
+    send_rate_per_second = Column(Float, comment="每秒最多发送的短信数，为空表示不限制")
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="创建时间")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), comment="更新时间")
+
+    def __repr__(self):
+        return f"<SmsApp(app_id='{self.app_id}', max_in_flight={self.max_in_flight})>"
@@ -1,24 +1,61 @@
-from sqlalchemy import Column, Integer, String, DateTime, func
+from sqlalchemy import Column, Integer, String, DateTime, Index, UniqueConstraint, func, text
 from app.database import Base
+from app.utils.enums import TaskPriority
 
 
 class SmsTask(Base):
-    """发送任务表"""
+    """发送任务表（按created_at按月分区，主键和唯一约束需包含分区键）"""
     __tablename__ = "sms_tasks"
     
-    id = Column(Integer, primary_key=True, index=True)
-    task_id = Column(String(50), unique=True, nullable=False, comment="任务ID")
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
+    task_id = Column(String(50), nullable=False, comment="任务ID")
     phone_number = Column(String(20), nullable=False, index=True, comment="手机号码")
     content = Column(String(200), nullable=False, comment="发送内容")
-    status = Column(Integer, default=0, index=True, comment="任务状态: 0=PENDING, 1=PROCESSING, 2=SUCCESS, 3=FAILED")
+    status = Column(Integer, default=0, comment="任务状态: 0=PENDING, 1=PROCESSING, 2=SUCCESS, 3=FAILED, 4=SCHEDULED, 5=CANCELLED")
     source = Column(String(50), comment="来源标识")
     retry_count = Column(Integer, default=0, comment="重试次数")
+    priority = Column(Integer, nullable=False, default=int(TaskPriority.NORMAL), server_default=text("1"),
+                      comment="优先级通道: 0=高, 1=普通, 2=低")
     processing_app_id = Column(String(50), index=True, comment="处理中的APP ID")
     result = Column(String(500), comment="最后一次发送汇报结果，失败时记录失败原因")
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True, comment="创建时间")
+    created_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now(), index=True, comment="创建时间（分区键）")
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), comment="更新时间")
     sent_at = Column(DateTime(timezone=True), comment="发送时间")
     reported_at = Column(DateTime(timezone=True), comment="汇报时间")
+    next_attempt_at = Column(DateTime(timezone=True), comment="下次可重试时间（待重试任务）")
+    error_class = Column(String(50), comment="最后一次失败的错误类别")
+    send_at = Column(DateTime(timezone=True), comment="定时发送时间（为空表示立即发送）")
+
+    # 队列查询索引，与 migrations/002_queue_indexes.sql、006_retry_backoff.sql、007_priority_lanes.sql、
+    # 008_scheduled_sends.sql、009_source_fair_share.sql、010_app_capacity.sql 保持一致
+    # 分区定义与 migrations/004_partition_sms_tasks.sql 保持一致，分区由PartitionService创建
+    __table_args__ = (
+        UniqueConstraint("task_id", "created_at", name="sms_tasks_task_id_created_at_key"),
+        # 按优先级通道领取新任务（每个通道一个部分索引）
+        *(
+            Index(f"idx_sms_tasks_pending_new_{priority.lane}", "created_at",
+                  postgresql_where=text(f"status = 0 AND retry_count = 0 AND priority = {int(priority)}"))
+            for priority in TaskPriority
+        ),
+        # fair模式下按来源领取新任务（跳跃扫描来源，再按来源读取最早的任务）
+        Index("idx_sms_tasks_pending_new_source", "priority", text("coalesce(source, '')"), "created_at",
+              postgresql_where=text("status = 0 AND retry_count = 0")),
+        # 领取到期的重试任务
+        Index("idx_sms_tasks_pending_retry", "next_attempt_at",
+              postgresql_where=text("status = 0 AND retry_count > 0")),
+        # 释放到期的定时任务
+        Index("idx_sms_tasks_scheduled", "send_at",
+              postgresql_where=text("status = 4")),
+        # 僵尸任务恢复
+        Index("idx_sms_tasks_processing_updated", "updated_at",
+              postgresql_where=text("status = 1")),
+        # 领取任务时统计APP的处理中任务数
+        Index("idx_sms_tasks_processing_app_active", "processing_app_id",
+              postgresql_where=text("status = 1")),
+        # 任务统计
+        Index("idx_sms_tasks_status_retry", "status", "retry_count"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
     
     def __repr__(self):
         return f"<SmsTask(id={self.id}, task_id='{self.task_id}', status={self.status})>"
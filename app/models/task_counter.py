@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, func
+from app.database import Base
+
+
+class SmsTaskCounter(Base):
+    """任务计数表（按分片增量维护，统计时按counter_key求和）"""
+    __tablename__ = "sms_task_counters"
+
+    counter_key = Column(String(50), primary_key=True, comment="计数键: pending_new/pending_retry/processing/success/failed/retried")
+    shard = Column(Integer, primary_key=True, comment="分片号，分散同一计数键的并发更新")
+    count = Column(BigInteger, nullable=False, default=0, comment="计数（各分片之和为实际数量）")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), comment="更新时间")
+
+    def __repr__(self):
+        return f"<SmsTaskCounter(key='{self.counter_key}', shard={self.shard}, count={self.count})>"
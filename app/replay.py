@@ -0,0 +1,273 @@
+"""
+流量回放工具
+
+按created_at读取一段时间内的receive_logs，保持原始请求间隔（1倍速、N倍速或不等待）
+把/send请求回放到本地服务，对比回放与原始请求的状态码分布，并统计回放延迟和调度滞后。
+同一request_id的多条接收日志来自一次批量提交，回放为一次/send/batch请求。
+
+只回放到本地或测试环境：请求中的手机号和内容会原样提交。
+
+用法:
+    python -m app.replay --from 2024-01-01T09:00:00+08:00 --to 2024-01-01T10:00:00+08:00
+    python -m app.replay --from ... --to ... --speed 10 --url http://localhost:8000
+    python -m app.replay --from ... --to ... --speed 0 --concurrency 50 --output replay.json
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional
+
+import httpx
+from sqlalchemy import select
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.logs import ReceiveLog
+from app.loadtest import SEND_PATH, SEND_BATCH_PATH, create_client, percentiles
+
+# 服务端游标每次读取的日志条数
+REPLAY_FETCH_SIZE = 1000
+
+
+class ReplayRequest(NamedTuple):
+    """一次原始提交请求（批量提交包含多条）"""
+    request_id: Optional[str]
+    created_at: datetime
+    items: List[Dict[str, Any]]    # 每条的request_data
+    status_codes: List[int]        # 每条的原始状态码
+
+
+class ReplayStats:
+    """回放统计"""
+
+    def __init__(self):
+        self.request_count = 0
+        self.item_count = 0
+        self.original_status: Counter = Counter()
+        self.replay_status: Counter = Counter()
+        self.mismatches: Counter = Counter()     # "原始状态码->回放状态码" -> 次数
+        self.latency: Dict[str, List[float]] = {}
+        self.schedule_lag: List[float] = []      # 实际发出时间晚于计划时间的秒数
+        self.errors: Counter = Counter()
+        self.original_per_second: Counter = Counter()
+        self.replay_per_second: Counter = Counter()
+
+
+class TrafficReplay:
+    """receive_logs流量回放"""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.stats = ReplayStats()
+        self._semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def run(self, client: httpx.AsyncClient) -> Dict[str, Any]:
+        """按原始间隔回放，返回统计结果"""
+        speed = self.args.speed
+        pending = set()
+        first_created_at = None
+        offset = 0.0
+        started = time.monotonic()
+
+        async for request in self._iter_requests():
+            if first_created_at is None:
+                first_created_at = request.created_at
+            offset = (request.created_at - first_created_at).total_seconds()
+
+            # 按原始间隔等待到计划时间；speed为0时不等待
+            if speed > 0:
+                delay = started + offset / speed - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            await self._semaphore.acquire()
+            if speed > 0:
+                self.stats.schedule_lag.append(max(time.monotonic() - (started + offset / speed), 0))
+
+            task = asyncio.create_task(self._replay(client, request, offset, started))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+
+        if pending:
+            await asyncio.gather(*pending)
+        return self._summary(time.monotonic() - started, offset)
+
+    async def _iter_requests(self) -> AsyncIterator[ReplayRequest]:
+        """通过服务端游标按时间顺序读取接收日志，相邻的同一request_id合并为一次请求"""
+        args = self.args
+        query = select(
+            ReceiveLog.request_id,
+            ReceiveLog.created_at,
+            ReceiveLog.request_data,
+            ReceiveLog.status_code
+        ).where(
+            ReceiveLog.created_at >= args.created_from,
+            ReceiveLog.created_at < args.created_to
+        ).order_by(ReceiveLog.created_at, ReceiveLog.id)
+        if args.limit:
+            query = query.limit(args.limit)
+
+        current: Optional[ReplayRequest] = None
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(query.execution_options(yield_per=REPLAY_FETCH_SIZE))
+            async for row in result:
+                if not row.request_data:
+                    continue
+                if current is not None and row.request_id and row.request_id == current.request_id:
+                    current.items.append(row.request_data)
+                    current.status_codes.append(row.status_code)
+                    continue
+                if current is not None:
+                    yield current
+                current = ReplayRequest(row.request_id, row.created_at, [row.request_data], [row.status_code])
+        if current is not None:
+            yield current
+
+    async def _replay(self, client: httpx.AsyncClient, request: ReplayRequest, offset: float, started: float) -> None:
+        """回放一次请求，按条记录状态码"""
+        stats = self.stats
+        stats.request_count += 1
+        stats.item_count += len(request.items)
+        stats.original_per_second[int(offset)] += len(request.items)
+        stats.original_status.update(request.status_codes)
+
+        is_batch = len(request.items) > 1
+        name = "send_batch" if is_batch else "send"
+        start = time.monotonic()
+        stats.replay_per_second[int(start - started)] += len(request.items)
+        try:
+            if is_batch:
+                response = await client.post(SEND_BATCH_PATH, json={"items": request.items})
+            else:
+                response = await client.post(SEND_PATH, json=request.items[0])
+        except httpx.HTTPError as e:
+            stats.errors[f"{name}: {type(e).__name__}"] += 1
+            codes = [0] * len(request.items)
+        else:
+            stats.latency.setdefault(name, []).append(time.monotonic() - start)
+            codes = self._item_status_codes(response, len(request.items))
+        finally:
+            self._semaphore.release()
+
+        stats.replay_status.update(codes)
+        for original, replayed in zip(request.status_codes, codes):
+            if original != replayed:
+                stats.mismatches[f"{original}->{replayed}"] += 1
+
+    @staticmethod
+    def _item_status_codes(response: httpx.Response, count: int) -> List[int]:
+        """每条的回放状态码：批量提交按逐条结果换算（与接收日志记录方式一致）"""
+        if count == 1 or response.status_code != 200:
+            return [response.status_code] * count
+        results = response.json()["data"]["results"]
+        return [200 if item.get("task_id") else 400 for item in results]
+
+    def _summary(self, elapsed: float, original_span: float) -> Dict[str, Any]:
+        """original_span为第一条到最后一条接收日志的时间跨度（秒）"""
+        stats = self.stats
+        return {
+            "config": {
+                **vars(self.args),
+                "created_from": self.args.created_from.isoformat(),
+                "created_to": self.args.created_to.isoformat()
+            },
+            "duration_seconds": round(elapsed, 2),
+            "requests": stats.request_count,
+            "items": stats.item_count,
+            "rate": {
+                "original_avg_per_second": round(stats.item_count / original_span, 2) if original_span > 0 else None,
+                "original_peak_per_second": max(stats.original_per_second.values(), default=0),
+                "replay_avg_per_second": round(stats.item_count / elapsed, 2) if elapsed else None,
+                "replay_peak_per_second": max(stats.replay_per_second.values(), default=0)
+            },
+            "status_codes": {
+                "original": {str(code): count for code, count in sorted(stats.original_status.items())},
+                "replay": {str(code): count for code, count in sorted(stats.replay_status.items())},
+                "mismatches": dict(stats.mismatches)
+            },
+            "latency": {name: percentiles(values) for name, values in stats.latency.items()},
+            "schedule_lag": percentiles(stats.schedule_lag),
+            "errors": dict(stats.errors)
+        }
+
+
+def print_summary(result: Dict[str, Any]) -> None:
+    """输出回放结果"""
+    print("\n" + "="*60)
+    print("📊 回放结果")
+    print("="*60)
+    rate = result["rate"]
+    print(f"回放 {result['requests']} 次请求（{result['items']} 条短信），耗时 {result['duration_seconds']} 秒")
+    print(f"速率: 原始 平均 {rate['original_avg_per_second']}/s 峰值 {rate['original_peak_per_second']}/s，"
+          f"回放 平均 {rate['replay_avg_per_second']}/s 峰值 {rate['replay_peak_per_second']}/s")
+
+    codes = result["status_codes"]
+    print(f"\n状态码: 原始 {codes['original']}，回放 {codes['replay']}")
+    if codes["mismatches"]:
+        print(f"⚠️  状态码不一致（原始->回放）: {codes['mismatches']}")
+    else:
+        print("✅ 状态码分布与原始请求一致")
+
+    print("\n延迟（毫秒）:")
+    for name, value in {**result["latency"], "调度滞后": result["schedule_lag"]}.items():
+        if value["count"]:
+            print(f"   {name:<12} n={value['count']:<8} p50={value['p50_ms']:<9} p95={value['p95_ms']:<9} "
+                  f"p99={value['p99_ms']:<9} max={value['max_ms']}")
+
+    if result["errors"]:
+        print(f"\n⚠️  错误: {result['errors']}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="receive_logs流量回放工具")
+    parser.add_argument("--from", dest="created_from", type=datetime.fromisoformat, required=True,
+                        help="回放的接收日志起始时间（包含，ISO格式）")
+    parser.add_argument("--to", dest="created_to", type=datetime.fromisoformat, required=True,
+                        help="回放的接收日志结束时间（不包含，ISO格式）")
+    parser.add_argument("--speed", type=float, default=1.0, help="回放倍速，0表示不等待尽快回放")
+    parser.add_argument("--concurrency", type=int, default=200, help="最大并发请求数")
+    parser.add_argument("--limit", type=int, help="最多读取的接收日志条数")
+    parser.add_argument("--url", help="服务地址，不指定时在进程内启动应用")
+    parser.add_argument("--username", default=settings.basic_auth_username, help="Basic Auth用户名")
+    parser.add_argument("--password", default=settings.basic_auth_password, help="Basic Auth密码")
+    parser.add_argument("--output", help="结果保存为JSON文件")
+    args = parser.parse_args(argv)
+
+    if args.created_from >= args.created_to:
+        parser.error("--from必须早于--to")
+    if args.speed < 0 or args.concurrency < 1:
+        parser.error("--speed不能为负数，--concurrency至少为1")
+    return args
+
+
+async def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    speed = f"{args.speed}倍速" if args.speed > 0 else "不等待"
+    print("🚀 开始流量回放")
+    print(f"   接收日志: {args.created_from.isoformat()} - {args.created_to.isoformat()}")
+    print(f"   目标: {args.url or '进程内应用'}，{speed}，最大并发 {args.concurrency}")
+
+    async with create_client(
+        args.url,
+        (args.username, args.password),
+        timeout=60,
+        max_connections=args.concurrency
+    ) as client:
+        result = await TrafficReplay(args).run(client)
+
+    print_summary(result)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 结果已保存: {args.output}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -1,4 +1,5 @@
-from typing import List
+from datetime import datetime
+from typing import Dict, List, Optional
 from pydantic import BaseModel, Field
 
 
@@ -13,6 +14,9 @@ class RecoveredTaskInfo(BaseModel):
 class ZombieTaskRecoveryResponse(BaseModel):
     """僵尸任务恢复响应"""
     recovered_count: int = Field(..., description="恢复的任务数量")
+    retried_count: int = Field(0, description="重置为待重试的任务数量")
+    failed_count: int = Field(0, description="标记为最终失败的任务数量")
+    chunk_counts: List[int] = Field(default_factory=list, description="每个批次处理的任务数量")
     message: str = Field(..., description="恢复结果消息")
 
 
@@ -23,6 +27,69 @@ class TaskStatisticsResponse(BaseModel):
     processing_tasks: int = Field(..., description="正在处理任务数量")
     success_tasks: int = Field(..., description="成功任务数量")
     failed_tasks: int = Field(..., description="失败任务数量")
+    scheduled_tasks: int = Field(0, description="定时待释放任务数量")
+    cancelled_tasks: int = Field(0, description="已取消任务数量")
+    pending_tasks_by_priority: Dict[str, int] = Field(
+        default_factory=dict, description="各优先级通道的待处理任务数量（high/normal/low，含重试任务）"
+    )
+
+
+class LogBufferStatsResponse(BaseModel):
+    """日志写缓冲统计响应"""
+    enabled: bool = Field(..., description="是否启用写缓冲")
+    depth: int = Field(..., description="当前缓冲的日志条数")
+    max_size: int = Field(..., description="缓冲区容量")
+    overflow_policy: str = Field(..., description="溢出策略")
+    enqueued_count: int = Field(..., description="累计进入缓冲区的日志条数")
+    flushed_count: int = Field(..., description="累计写入数据库的日志条数")
+    dropped_count: int = Field(..., description="累计因缓冲区满被丢弃的日志条数")
+    failed_count: int = Field(..., description="累计写入失败的日志条数")
+    lagging_count: int = Field(..., description="累计写入延迟超过告警阈值的日志条数")
+    last_flush_lag_seconds: float = Field(..., description="最近一批日志的最大等待时间（秒）")
+
+
+class AppStatusResponse(BaseModel):
+    """APP处理能力和当前状态"""
+    app_id: str = Field(..., description="APP标识")
+    max_in_flight: int = Field(..., description="登记的最多处理中任务数")
+    send_rate_per_second: Optional[float] = Field(None, description="登记的每秒最多发送短信数")
+    in_flight: int = Field(..., description="当前处理中的任务数")
+    in_flight_cap: int = Field(..., description="领取时使用的处理中任务上限（按发送速率折算后）")
+    report_latency_seconds: Optional[float] = Field(
+        None, description="本进程统计的最近汇报延迟（领取到汇报，滑动平均，秒）"
+    )
+
+
+class TemplateCacheStatsResponse(BaseModel):
+    """模板缓存统计响应"""
+    cached: bool = Field(..., description="缓存当前是否有效")
+    template_count: int = Field(..., description="缓存的可用模板数量")
+    ttl_seconds: int = Field(..., description="缓存有效期（秒）")
+    hit_count: int = Field(..., description="累计命中次数")
+    miss_count: int = Field(..., description="累计未命中（从数据库加载）次数")
+    invalidation_count: int = Field(..., description="累计失效次数")
+    hit_rate: float = Field(..., description="命中率")
+
+
+class SqlFingerprintStats(BaseModel):
+    """语句指纹统计"""
+    fingerprint: str = Field(..., description="语句指纹（常量和参数替换为?）")
+    calls: int = Field(..., description="执行次数")
+    total_time_ms: float = Field(..., description="总耗时（毫秒）")
+    avg_time_ms: float = Field(..., description="平均耗时（毫秒）")
+    max_time_ms: float = Field(..., description="最大耗时（毫秒）")
+    rows: int = Field(..., description="累计返回或影响的行数")
+    errors: int = Field(..., description="执行失败次数")
+
+
+class SqlStatsResponse(BaseModel):
+    """SQL语句统计响应"""
+    started_at: datetime = Field(..., description="统计开始时间")
+    slow_query_threshold_ms: int = Field(..., description="慢查询阈值（毫秒），0表示不记录")
+    slow_query_count: int = Field(..., description="累计慢查询次数")
+    untracked_count: int = Field(..., description="超出指纹数量上限未单独统计的执行次数")
+    failed_count: int = Field(..., description="累计执行失败的语句数")
+    fingerprints: List[SqlFingerprintStats] = Field(..., description="按总耗时排序的语句指纹")
 
 
 class TemplateResponse(BaseModel):
@@ -1,6 +1,7 @@
 from typing import List, Optional
 from datetime import datetime
-from pydantic import BaseModel, Field
+from pydantic import AwareDatetime, BaseModel, Field
+from app.utils.enums import TaskPriority
 
 
 class SmsRequest(BaseModel):
@@ -9,6 +10,12 @@ class SmsRequest(BaseModel):
     content: Optional[str] = Field(None, description="发送内容或模板参数", max_length=200)
     use_template: bool = Field(False, description="是否使用模板")
     source: Optional[str] = Field(None, description="来源标识", max_length=50)
+    priority: TaskPriority = Field(
+        TaskPriority.NORMAL, description="优先级通道: 0=高（验证码等）, 1=普通, 2=低（营销等批量短信）"
+    )
+    send_at: Optional[AwareDatetime] = Field(
+        None, description="定时发送时间（需带时区），为空或已过去时立即发送，释放前可取消"
+    )
 
 
 class SmsResponse(BaseModel):
@@ -17,6 +24,28 @@ class SmsResponse(BaseModel):
     status: int = Field(..., description="任务状态")
 
 
+class SmsBatchRequest(BaseModel):
+    """批量短信发送请求"""
+    items: List[SmsRequest] = Field(..., description="短信发送请求列表", min_length=1)
+
+
+class SmsBatchItemResult(BaseModel):
+    """批量发送单条结果"""
+    index: int = Field(..., description="请求列表中的序号（从0开始）")
+    task_id: Optional[str] = Field(None, description="任务ID（成功时）")
+    status: Optional[int] = Field(None, description="任务状态（成功时）")
+    error: Optional[str] = Field(None, description="错误信息（失败时）")
+    warning: Optional[str] = Field(None, description="提示信息（如未使用的模板参数）")
+
+
+class SmsBatchResponse(BaseModel):
+    """批量短信发送响应"""
+    total_count: int = Field(..., description="提交的任务总数")
+    success_count: int = Field(..., description="创建成功的任务数")
+    failed_count: int = Field(..., description="创建失败的任务数")
+    results: List[SmsBatchItemResult] = Field(..., description="逐条处理结果，与请求顺序一致")
+
+
 class TaskQueryResponse(BaseModel):
     """任务查询响应"""
     task_id: str = Field(..., description="任务ID")
@@ -24,6 +53,7 @@ class TaskQueryResponse(BaseModel):
     content: str = Field(..., description="发送内容")
     status: int = Field(..., description="任务状态")
     created_at: datetime = Field(..., description="创建时间")
+    send_at: Optional[datetime] = Field(None, description="定时发送时间")
     sent_at: Optional[datetime] = Field(None, description="发送时间")
 
 
@@ -41,6 +71,42 @@ class ReportRequest(BaseModel):
     status: int = Field(..., description="发送状态: 2=SUCCESS, 3=FAILED")
     error_message: Optional[str] = Field(None, description="错误信息（失败时）", max_length=500)
     should_retry: bool = Field(False, description="是否应该重试（由APP判断）")
+    error_class: Optional[str] = Field(
+        None, description="错误类别（失败时，按类别选择重试延迟，如 rate_limited、carrier_outage）", max_length=50
+    )
+
+
+class ReportBatchRequest(BaseModel):
+    """批量发送结果汇报请求"""
+    items: List[ReportRequest] = Field(..., description="汇报列表", min_length=1)
+
+
+class ReportBatchItemResult(BaseModel):
+    """批量汇报单条结果"""
+    task_id: str = Field(..., description="任务ID")
+    outcome: str = Field(..., description="处理结果: success/retry/failed/not_found/stale/invalid/duplicate")
+    status: Optional[int] = Field(None, description="更新后的任务状态")
+    retry_count: Optional[int] = Field(None, description="更新后的重试次数")
+
+
+class ReportBatchResponse(BaseModel):
+    """批量发送结果汇报响应"""
+    total_count: int = Field(..., description="汇报总数")
+    updated_count: int = Field(..., description="实际更新的任务数")
+    results: List[ReportBatchItemResult] = Field(..., description="逐条处理结果，与请求顺序一致")
+
+
+class AppRegisterRequest(BaseModel):
+    """APP处理能力登记请求"""
+    max_in_flight: int = Field(..., description="最多同时持有的处理中任务数（已领取未汇报）", ge=1)
+    send_rate_per_second: Optional[float] = Field(None, description="每秒最多发送的短信数，为空表示不限制", gt=0)
+
+
+class AppResponse(BaseModel):
+    """APP处理能力登记响应"""
+    app_id: str = Field(..., description="APP标识")
+    max_in_flight: int = Field(..., description="最多同时持有的处理中任务数")
+    send_rate_per_second: Optional[float] = Field(None, description="每秒最多发送的短信数")
 
 
 class DefaultSmsRequest(BaseModel):
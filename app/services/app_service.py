@@ -0,0 +1,208 @@
+import asyncio
+import math
+import time
+from typing import Dict, List, NamedTuple, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.config import settings
+from app.models.sms_app import SmsApp
+from app.models.sms_task import SmsTask
+from app.utils.enums import TaskStatus
+from app.utils.helpers import sql_constant
+from app.utils.metrics import TASK_REPORT_LATENCY
+from app.services.notify_service import notify_service, APP_CHANGED_CHANNEL
+
+
+class AppProfile(NamedTuple):
+    """APP登记的处理能力"""
+    app_id: str
+    max_in_flight: int                      # 最多同时持有的处理中任务数
+    send_rate_per_second: Optional[float]   # 每秒最多发送的短信数，None表示不限制
+
+
+class AppRegistry:
+    """
+    进程内APP登记缓存和汇报延迟统计
+
+    登记信息整表缓存（TTL过期 + 显式失效），领取任务时不需要额外查询；
+    汇报延迟（领取到汇报的耗时）按APP做指数滑动平均，多进程部署时各进程按各自收到的汇报估算。
+    """
+
+    def __init__(self):
+        self.ttl_seconds = settings.app_cache_ttl_seconds
+        self.target_seconds = max(settings.app_target_report_seconds, 0.001)
+        self.alpha = min(max(settings.app_report_latency_ewma_alpha, 0.0), 1.0)
+        self.claim_limit_max = settings.app_claim_limit_max
+        self._apps: Optional[Dict[str, AppProfile]] = None
+        self._loaded_at = 0.0
+        self._version = 0
+        self._lock = asyncio.Lock()
+        self._report_latency: Dict[str, float] = {}
+
+    async def get(self, db: AsyncSession, app_id: str) -> Optional[AppProfile]:
+        """获取APP登记的处理能力，未登记时为None"""
+        if not self._is_fresh():
+            async with self._lock:
+                # 等锁期间其他请求可能已经加载完成
+                if not self._is_fresh():
+                    version = self._version
+                    apps = await self._load(db)
+                    # 加载期间发生失效时不写入缓存，下次重新加载
+                    if version == self._version:
+                        self._apps = apps
+                        self._loaded_at = time.monotonic()
+                    return apps.get(app_id)
+        return self._apps.get(app_id)
+
+    def invalidate(self) -> None:
+        """使缓存失效"""
+        self._version += 1
+        self._apps = None
+
+    def observe_report_latency(self, app_id: str, seconds: float) -> None:
+        """记录一次领取到汇报的耗时"""
+        TASK_REPORT_LATENCY.observe(seconds, app_id=app_id)
+        previous = self._report_latency.get(app_id)
+        if previous is None:
+            self._report_latency[app_id] = seconds
+        else:
+            self._report_latency[app_id] = previous + self.alpha * (seconds - previous)
+
+    def report_latency(self, app_id: str) -> Optional[float]:
+        """APP最近的汇报延迟（滑动平均，秒），还没有汇报时为None"""
+        return self._report_latency.get(app_id)
+
+    def claim_limit(self, app_id: str, limit: int, registered: bool = False) -> int:
+        """
+        按汇报延迟调整本次领取数量
+
+        按 目标耗时 / 汇报延迟 的比例调整请求的数量：汇报延迟超过APP_TARGET_REPORT_SECONDS时减少，至少领取1个，
+        发送慢的APP每次领取的任务变少，汇报延迟随之下降后领取数量逐步恢复；低于目标耗时时，已登记处理能力的APP
+        按比例增加，不超过APP_CLAIM_LIMIT_MAX（处理中任务数仍受登记的上限限制），未登记的APP不增加。
+        还没有汇报记录时按请求的数量领取。
+        """
+        latency = self._report_latency.get(app_id)
+        if latency is None:
+            return limit
+        if latency > self.target_seconds:
+            return max(int(limit * self.target_seconds / latency), 1)
+        if not registered or limit >= self.claim_limit_max:
+            return limit
+        if latency <= 0:
+            return self.claim_limit_max
+        return min(int(limit * self.target_seconds / latency), self.claim_limit_max)
+
+    def in_flight_cap(self, profile: AppProfile) -> int:
+        """APP最多同时持有的处理中任务数：登记的上限，登记了发送速率时不超过目标耗时内能发送的数量"""
+        cap = profile.max_in_flight
+        if profile.send_rate_per_second:
+            cap = min(cap, max(math.ceil(profile.send_rate_per_second * self.target_seconds), 1))
+        return cap
+
+    def _is_fresh(self) -> bool:
+        """缓存是否有效"""
+        return (
+            self._apps is not None
+            and self.ttl_seconds > 0
+            and time.monotonic() - self._loaded_at < self.ttl_seconds
+        )
+
+    @staticmethod
+    async def _load(db: AsyncSession) -> Dict[str, AppProfile]:
+        """从数据库加载全部APP登记信息"""
+        result = await db.execute(select(
+            SmsApp.app_id,
+            SmsApp.max_in_flight,
+            SmsApp.send_rate_per_second
+        ))
+        return {row.app_id: AppProfile(*row) for row in result}
+
+
+# 全局APP登记缓存实例
+app_registry = AppRegistry()
+
+# 其他进程修改APP登记时通过数据库通知使本进程缓存失效
+notify_service.add_handler(APP_CHANGED_CHANNEL, lambda payload: app_registry.invalidate())
+
+
+class AppService:
+    """APP登记服务"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def register(
+        self,
+        app_id: str,
+        max_in_flight: int,
+        send_rate_per_second: Optional[float] = None
+    ) -> AppProfile:
+        """
+        登记或更新APP的处理能力
+
+        Args:
+            app_id: APP标识
+            max_in_flight: 最多同时持有的处理中任务数
+            send_rate_per_second: 每秒最多发送的短信数，None表示不限制
+
+        Returns:
+            AppProfile: 登记后的处理能力
+        """
+        statement = pg_insert(SmsApp).values(
+            app_id=app_id,
+            max_in_flight=max_in_flight,
+            send_rate_per_second=send_rate_per_second
+        )
+        await self.db.execute(statement.on_conflict_do_update(
+            index_elements=[SmsApp.app_id],
+            set_={
+                "max_in_flight": statement.excluded.max_in_flight,
+                "send_rate_per_second": statement.excluded.send_rate_per_second,
+                "updated_at": func.now()
+            }
+        ))
+        # 提交时通知所有进程（包括本进程）使缓存失效
+        await self.db.execute(select(func.pg_notify(APP_CHANGED_CHANNEL, app_id)))
+        await self.db.commit()
+        app_registry.invalidate()
+
+        return AppProfile(app_id, max_in_flight, send_rate_per_second)
+
+    async def list_apps(self) -> List[dict]:
+        """
+        获取已登记APP的处理能力和当前状态
+
+        Returns:
+            List[dict]: 每个APP的登记信息、处理中任务数、汇报延迟和处理中任务上限
+        """
+        result = await self.db.execute(select(SmsApp).order_by(SmsApp.app_id))
+        apps = result.scalars().all()
+        in_flight = await self.count_in_flight([app.app_id for app in apps])
+
+        return [
+            {
+                "app_id": app.app_id,
+                "max_in_flight": app.max_in_flight,
+                "send_rate_per_second": app.send_rate_per_second,
+                "in_flight": in_flight.get(app.app_id, 0),
+                "in_flight_cap": app_registry.in_flight_cap(
+                    AppProfile(app.app_id, app.max_in_flight, app.send_rate_per_second)
+                ),
+                "report_latency_seconds": app_registry.report_latency(app.app_id)
+            }
+            for app in apps
+        ]
+
+    async def count_in_flight(self, app_ids: List[str]) -> Dict[str, int]:
+        """各APP当前的处理中任务数（使用idx_sms_tasks_processing_app_active）"""
+        if not app_ids:
+            return {}
+        result = await self.db.execute(
+            select(SmsTask.processing_app_id, func.count()).where(
+                SmsTask.status == sql_constant(TaskStatus.PROCESSING),
+                SmsTask.processing_app_id.in_(app_ids)
+            ).group_by(SmsTask.processing_app_id)
+        )
+        return {app_id: count for app_id, count in result.all()}
@@ -0,0 +1,217 @@
+import asyncio
+import gzip
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, and_, cast, null, Integer
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.sms_task import SmsTask
+from app.models.logs import SendLog, ReportLog
+from app.utils.enums import TaskStatus
+from app.services.counter_service import CounterService
+
+logger = logging.getLogger(__name__)
+
+# 归档文件清单，每个归档文件完成后追加一行
+ARCHIVE_MANIFEST = "manifest.jsonl"
+
+TERMINAL_STATUSES = (int(TaskStatus.SUCCESS), int(TaskStatus.FAILED), int(TaskStatus.CANCELLED))
+
+
+class ArchiveResult(NamedTuple):
+    """任务归档结果"""
+    archived_count: int      # 归档并删除的任务数
+    file_path: Optional[str]  # 归档文件（无任务可归档时为None）
+    chunk_counts: List[int]  # 每个批次归档的任务数
+
+
+def model_to_dict(row: Any) -> Dict[str, Any]:
+    """ORM对象转为可写入JSON的字典（时间转为ISO格式）"""
+    data = {}
+    for column in row.__table__.columns:
+        value = getattr(row, column.key)
+        data[column.key] = value.isoformat() if isinstance(value, datetime) else value
+    return data
+
+
+def iter_archive_records(path: Path) -> Iterator[Dict[str, Any]]:
+    """逐行读取归档文件（多个gzip成员依次解压，内存占用与文件大小无关）"""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_manifest(archive_dir: Path) -> List[Dict[str, Any]]:
+    """读取归档文件清单"""
+    manifest = archive_dir / ARCHIVE_MANIFEST
+    if not manifest.exists():
+        return []
+    with open(manifest, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class ArchiveService:
+    """
+    终态任务归档服务
+
+    把created_at早于ARCHIVE_AFTER_DAYS天的终态任务（SUCCESS/FAILED/CANCELLED）连同其发送、汇报日志
+    写入本地gzip压缩的JSONL文件（每行一个任务及其日志），写入并fsync后再从数据库分批删除。
+    任务通过服务端游标流式读取，内存占用只与批次大小有关；压缩和fsync在线程中执行，不阻塞事件循环。
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.archive_dir = Path(settings.archive_dir)
+        self.after_days = settings.archive_after_days
+        self.chunk_size = settings.archive_chunk_size
+        self.counter_service = CounterService(db)
+
+    async def archive_terminal_tasks(self, now: Optional[datetime] = None) -> ArchiveResult:
+        """
+        归档终态任务（SUCCESS/FAILED/CANCELLED）
+
+        每个批次作为一个独立的gzip成员追加到归档文件并fsync，随后在一个事务中删除这些任务和日志，
+        中途失败时已删除的任务都已落盘，未删除的任务会在下次归档时重新写入（恢复时按唯一键去重）。
+
+        Returns:
+            ArchiveResult: 归档结果
+        """
+        if self.after_days <= 0:
+            return ArchiveResult(archived_count=0, file_path=None, chunk_counts=[])
+
+        now = now or datetime.now(timezone.utc)
+        cutoff = now - timedelta(days=self.after_days)
+
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        path = self.archive_dir / f"sms_tasks_{now.strftime('%Y%m%d_%H%M%S')}.jsonl.gz"
+
+        query = select(SmsTask).where(
+            and_(
+                SmsTask.created_at < cutoff,
+                SmsTask.status.in_(TERMINAL_STATUSES)
+            )
+        ).order_by(SmsTask.created_at, SmsTask.id).execution_options(yield_per=self.chunk_size)
+
+        chunk_counts: List[int] = []
+        created_from = None
+        created_to = None
+
+        # 读取使用独立会话的服务端游标，删除在self.db中按批次提交
+        async with AsyncSessionLocal() as read_db:
+            result = await read_db.stream(query)
+            async for partition in result.scalars().partitions():
+                tasks = list(partition)
+                records = await self._build_records(tasks)
+                await asyncio.to_thread(self._append_chunk, path, records)
+
+                deleted = await self._delete_chunk(tasks)
+                chunk_counts.append(deleted)
+
+                created_from = created_from or tasks[0].created_at
+                created_to = tasks[-1].created_at
+                logger.info(f"任务归档第 {len(chunk_counts)} 批: {deleted} 个 -> {path}")
+
+        if not chunk_counts:
+            return ArchiveResult(archived_count=0, file_path=None, chunk_counts=[])
+
+        await asyncio.to_thread(self._append_manifest, {
+            "file": path.name,
+            "created_from": created_from.isoformat(),
+            "created_to": created_to.isoformat(),
+            "count": sum(chunk_counts),
+            "archived_at": now.isoformat()
+        })
+
+        return ArchiveResult(
+            archived_count=sum(chunk_counts),
+            file_path=str(path),
+            chunk_counts=chunk_counts
+        )
+
+    async def _build_records(self, tasks: List[SmsTask]) -> List[Dict[str, Any]]:
+        """组装归档记录：任务及其发送、汇报日志"""
+        task_ids = [task.task_id for task in tasks]
+        send_logs = await self._load_logs(SendLog, task_ids)
+        report_logs = await self._load_logs(ReportLog, task_ids)
+
+        return [
+            {
+                "task": model_to_dict(task),
+                "send_logs": send_logs.get(task.task_id, []),
+                "report_logs": report_logs.get(task.task_id, [])
+            }
+            for task in tasks
+        ]
+
+    async def _load_logs(self, model, task_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """按任务ID批量读取日志"""
+        result = await self.db.execute(
+            select(model).where(model.task_id.in_(task_ids)).order_by(model.created_at, model.id)
+        )
+        logs: Dict[str, List[Dict[str, Any]]] = {}
+        for log in result.scalars():
+            logs.setdefault(log.task_id, []).append(model_to_dict(log))
+        return logs
+
+    @staticmethod
+    def _append_chunk(path: Path, records: List[Dict[str, Any]]) -> None:
+        """把一个批次作为独立gzip成员追加到归档文件，并fsync确保落盘"""
+        data = "".join(
+            json.dumps(record, ensure_ascii=False, default=str) + "\n"
+            for record in records
+        ).encode("utf-8")
+
+        with open(path, "ab") as f:
+            f.write(gzip.compress(data))
+            f.flush()
+            os.fsync(f.fileno())
+
+    async def _delete_chunk(self, tasks: List[SmsTask]) -> int:
+        """
+        删除一个批次的任务和日志，同时扣减任务计数
+
+        读取后状态发生变化、不再是终态的任务不删除，其日志也保留。
+
+        Returns:
+            int: 实际删除的任务数
+        """
+        # 按id删除，并用created_at范围限定分区；只删除仍为终态的任务
+        removal = delete(SmsTask).where(
+            and_(
+                SmsTask.id.in_([task.id for task in tasks]),
+                SmsTask.created_at.between(tasks[0].created_at, tasks[-1].created_at),
+                SmsTask.status.in_(TERMINAL_STATUSES)
+            )
+        ).returning(
+            SmsTask.task_id,
+            SmsTask.status.label("old_status"),
+            SmsTask.retry_count.label("old_retry_count"),
+            SmsTask.priority,
+            cast(null(), Integer).label("new_status"),
+            cast(null(), Integer).label("new_retry_count")
+        )
+        result = await self.db.execute(
+            self.counter_service.track_transitions(removal, name="archived_tasks")
+        )
+        task_ids = [row.task_id for row in result]
+
+        if task_ids:
+            await self.db.execute(delete(SendLog).where(SendLog.task_id.in_(task_ids)))
+            await self.db.execute(delete(ReportLog).where(ReportLog.task_id.in_(task_ids)))
+        await self.db.commit()
+
+        return len(task_ids)
+
+    def _append_manifest(self, entry: Dict[str, Any]) -> None:
+        """归档文件完成后追加清单记录（查询工具据此按时间范围定位文件）"""
+        with open(self.archive_dir / ARCHIVE_MANIFEST, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
@@ -0,0 +1,240 @@
+import random
+from typing import Dict, List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_, func, case, literal, union_all, Integer
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.models.sms_task import SmsTask
+from app.models.task_counter import SmsTaskCounter
+from app.utils.enums import TaskStatus, TaskPriority
+from app.config import settings
+from app.utils.helpers import sql_constant
+
+# 计数键
+COUNTER_PENDING_NEW = "pending_new"      # 待处理的新任务
+COUNTER_PENDING_RETRY = "pending_retry"  # 待重试任务
+COUNTER_PROCESSING = "processing"        # 处理中
+COUNTER_SUCCESS = "success"              # 发送成功
+COUNTER_FAILED = "failed"                # 最终失败
+COUNTER_SCHEDULED = "scheduled"          # 定时待释放
+COUNTER_CANCELLED = "cancelled"          # 已取消
+COUNTER_RETRIED = "retried"              # 发生过重试的任务（retry_count > 0，与状态无关）
+
+
+def lane_counter_key(priority: int) -> str:
+    """优先级通道的待处理任务计数键（新任务和重试任务），如 pending_high"""
+    return f"pending_{TaskPriority(priority).lane}"
+
+
+COUNTER_KEYS = (
+    COUNTER_PENDING_NEW,
+    COUNTER_PENDING_RETRY,
+    COUNTER_PROCESSING,
+    COUNTER_SUCCESS,
+    COUNTER_FAILED,
+    COUNTER_SCHEDULED,
+    COUNTER_CANCELLED,
+    COUNTER_RETRIED,
+    *(lane_counter_key(priority) for priority in TaskPriority),
+)
+
+
+def task_counter_keys(status: int, retry_count: int, priority: Optional[int] = None) -> List[str]:
+    """任务在某一状态下计入的计数键（不指定priority时不含通道计数键）"""
+    if status == TaskStatus.PENDING:
+        keys = [COUNTER_PENDING_NEW if retry_count == 0 else COUNTER_PENDING_RETRY]
+        if priority is not None:
+            keys.append(lane_counter_key(priority))
+    elif status == TaskStatus.PROCESSING:
+        keys = [COUNTER_PROCESSING]
+    elif status == TaskStatus.SUCCESS:
+        keys = [COUNTER_SUCCESS]
+    elif status == TaskStatus.SCHEDULED:
+        keys = [COUNTER_SCHEDULED]
+    elif status == TaskStatus.CANCELLED:
+        keys = [COUNTER_CANCELLED]
+    else:
+        keys = [COUNTER_FAILED]
+
+    if retry_count > 0:
+        keys.append(COUNTER_RETRIED)
+    return keys
+
+
+def _status_key_expression(status, retry_count):
+    """task_counter_keys中状态计数键的SQL表达式"""
+    return case(
+        (and_(status == int(TaskStatus.PENDING), retry_count == 0), COUNTER_PENDING_NEW),
+        (status == int(TaskStatus.PENDING), COUNTER_PENDING_RETRY),
+        (status == int(TaskStatus.PROCESSING), COUNTER_PROCESSING),
+        (status == int(TaskStatus.SUCCESS), COUNTER_SUCCESS),
+        (status == int(TaskStatus.SCHEDULED), COUNTER_SCHEDULED),
+        (status == int(TaskStatus.CANCELLED), COUNTER_CANCELLED),
+        else_=COUNTER_FAILED
+    )
+
+
+def _lane_key_expression(priority):
+    """lane_counter_key的SQL表达式"""
+    return case(
+        *((priority == int(lane), lane_counter_key(lane)) for lane in TaskPriority),
+        else_=lane_counter_key(TaskPriority.NORMAL)
+    )
+
+
+class CounterService:
+    """
+    任务计数服务
+
+    每次任务状态变化时，在同一事务中把计数增量累加到sms_task_counters，
+    统计接口只需对少量计数行求和。每个计数键分为多个分片，每次写入随机选择一个分片，
+    避免所有事务争抢同一行锁。
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.shards = max(settings.task_counter_shards, 1)
+
+    async def add(self, deltas: Dict[str, int]) -> None:
+        """
+        累加计数增量（只写入当前事务，不提交）
+
+        Args:
+            deltas: 计数键 -> 增量
+        """
+        shard = random.randrange(self.shards)
+        # 按计数键排序写入，多个事务落在同一分片时加锁顺序一致，不会互相死锁
+        rows = [
+            {"counter_key": key, "shard": shard, "count": delta}
+            for key, delta in sorted(deltas.items())
+            if delta
+        ]
+        if not rows:
+            return
+
+        await self.db.execute(self._upsert(pg_insert(SmsTaskCounter).values(rows)))
+
+    def track_transitions(self, statement, name: str = "changes"):
+        """
+        为状态变更语句附加计数更新
+
+        statement为带RETURNING的UPDATE语句，RETURNING中需包含old_status、old_retry_count、
+        new_status、new_retry_count和priority五列（优先级在状态变更中不变，用于维护通道计数）。返回的SELECT语句以数据修改CTE执行原语句，
+        并在同一条语句中把按计数键汇总后的增量写入计数表，一次往返完成状态变更和计数维护。
+
+        Returns:
+            SELECT语句，返回原语句RETURNING的全部列
+        """
+        changes = statement.cte(name)
+
+        deltas = union_all(
+            select(
+                _status_key_expression(changes.c.old_status, changes.c.old_retry_count).label("counter_key"),
+                literal(-1, Integer).label("delta")
+            ).where(changes.c.old_status.isnot(None)),
+            select(
+                literal(COUNTER_RETRIED).label("counter_key"),
+                literal(-1, Integer).label("delta")
+            ).where(changes.c.old_retry_count > 0),
+            select(
+                _lane_key_expression(changes.c.priority).label("counter_key"),
+                literal(-1, Integer).label("delta")
+            ).where(changes.c.old_status == int(TaskStatus.PENDING)),
+            select(
+                _status_key_expression(changes.c.new_status, changes.c.new_retry_count).label("counter_key"),
+                literal(1, Integer).label("delta")
+            ).where(changes.c.new_status.isnot(None)),
+            select(
+                _lane_key_expression(changes.c.priority).label("counter_key"),
+                literal(1, Integer).label("delta")
+            ).where(changes.c.new_status == int(TaskStatus.PENDING)),
+            select(
+                literal(COUNTER_RETRIED).label("counter_key"),
+                literal(1, Integer).label("delta")
+            ).where(changes.c.new_retry_count > 0),
+        ).subquery("deltas")
+
+        total = func.sum(deltas.c.delta)
+        summary = select(
+            deltas.c.counter_key,
+            literal(random.randrange(self.shards), Integer).label("shard"),
+            total
+        ).group_by(deltas.c.counter_key).having(total != 0).order_by(deltas.c.counter_key)
+
+        counter_upsert = self._upsert(
+            pg_insert(SmsTaskCounter).from_select(["counter_key", "shard", "count"], summary)
+        ).cte(f"{name}_counters")
+
+        return select(*changes.c).add_cte(counter_upsert)
+
+    async def get_counts(self) -> Dict[str, int]:
+        """读取各计数键的当前值（各分片求和）"""
+        query = select(
+            SmsTaskCounter.counter_key,
+            func.sum(SmsTaskCounter.count)
+        ).group_by(SmsTaskCounter.counter_key)
+        result = await self.db.execute(query)
+
+        counts = {key: 0 for key in COUNTER_KEYS}
+        for key, count in result.all():
+            counts[key] = int(count or 0)
+        return counts
+
+    async def reconcile(self) -> Dict[str, int]:
+        """
+        按实际任务数校准计数
+
+        在同一个REPEATABLE READ快照中读取实际数量和计数值，再把差值作为增量写入。
+        快照之后提交的状态变更已各自维护了计数，按增量修正不会覆盖它们。
+
+        Returns:
+            Dict[str, int]: 各计数键被修正的差值（无偏差时为空）
+        """
+        await self.db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        result = await self.db.execute(self.build_actual_count_query())
+        actual = {key: 0 for key in COUNTER_KEYS}
+        for status, retry_count, count in result.all():
+            for key in task_counter_keys(status, retry_count):
+                actual[key] += count
+        result = await self.db.execute(self.build_lane_count_query())
+        for priority, count in result.all():
+            actual[lane_counter_key(priority)] += count
+        current = await self.get_counts()
+        await self.db.commit()
+
+        drift = {
+            key: actual[key] - current[key]
+            for key in COUNTER_KEYS
+            if actual[key] != current[key]
+        }
+        if drift:
+            await self.add(drift)
+            await self.db.commit()
+
+        return drift
+
+    def build_actual_count_query(self):
+        """构建实际任务数查询（按status和retry_count分组，可使用仅索引扫描）"""
+        return select(
+            SmsTask.status,
+            SmsTask.retry_count,
+            func.count()
+        ).group_by(SmsTask.status, SmsTask.retry_count)
+
+    def build_lane_count_query(self):
+        """构建各优先级通道实际待处理任务数查询（只读取PENDING的少量行）"""
+        return select(
+            SmsTask.priority,
+            func.count()
+        ).where(SmsTask.status == sql_constant(TaskStatus.PENDING)).group_by(SmsTask.priority)
+
+    @staticmethod
+    def _upsert(statement):
+        """计数行不存在时插入，存在时累加"""
+        return statement.on_conflict_do_update(
+            index_elements=[SmsTaskCounter.counter_key, SmsTaskCounter.shard],
+            set_={
+                "count": SmsTaskCounter.count + statement.excluded["count"],
+                "updated_at": func.now()
+            }
+        )
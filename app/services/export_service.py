@@ -0,0 +1,146 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, List, Optional, Sequence
+from sqlalchemy import select
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.sms_task import SmsTask
+from app.models.logs import ReceiveLog, SendLog, ReportLog
+from app.utils.enums import ExportFormat, ExportLogType, TaskStatus
+
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.CSV: "text/csv",
+    ExportFormat.JSONL: "application/x-ndjson",
+}
+
+EXPORT_LOG_MODELS = {
+    ExportLogType.RECEIVE: ReceiveLog,
+    ExportLogType.SEND: SendLog,
+    ExportLogType.REPORT: ReportLog,
+}
+
+
+def _json_value(value: Any) -> Any:
+    """JSONL字段值（时间转为ISO格式）"""
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _csv_value(value: Any) -> Any:
+    """CSV字段值（时间转为ISO格式，JSON字段序列化为字符串）"""
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+class ExportService:
+    """
+    任务和日志导出服务
+
+    通过服务端游标每次读取EXPORT_BATCH_SIZE行，逐批编码为CSV/JSONL后输出，
+    内存占用只与批次大小有关，与导出总行数无关。
+    导出查询使用独立会话，生成器结束（包括客户端断开）时释放游标和连接。
+    """
+
+    def __init__(self, export_format: ExportFormat):
+        self.export_format = export_format
+        self.batch_size = max(settings.export_batch_size, 1)
+
+    def build_task_query(
+        self,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        source: Optional[str] = None,
+        status: Optional[TaskStatus] = None,
+        processing_app_id: Optional[str] = None
+    ):
+        """构建任务导出查询（按created_at排序，时间范围条件可让查询只访问对应分区）"""
+        conditions = self._created_conditions(SmsTask, created_from, created_to)
+        if source is not None:
+            conditions.append(SmsTask.source == source)
+        if status is not None:
+            conditions.append(SmsTask.status == int(status))
+        if processing_app_id is not None:
+            conditions.append(SmsTask.processing_app_id == processing_app_id)
+
+        return select(*SmsTask.__table__.columns).where(*conditions).order_by(
+            SmsTask.created_at, SmsTask.id
+        )
+
+    def build_log_query(
+        self,
+        log_type: ExportLogType,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        app_id: Optional[str] = None,
+        status: Optional[TaskStatus] = None
+    ):
+        """
+        构建日志导出查询
+
+        app_id只对发送、汇报日志有效，status只对汇报日志有效。
+        日志表没有created_at以外的排序索引，按分区存储顺序输出，避免对整个结果集排序。
+        """
+        model = EXPORT_LOG_MODELS[log_type]
+        conditions = self._created_conditions(model, created_from, created_to)
+        if app_id is not None:
+            if not hasattr(model, "app_id"):
+                raise ValueError("接收日志不支持按app_id筛选")
+            conditions.append(model.app_id == app_id)
+        if status is not None:
+            if not hasattr(model, "status"):
+                raise ValueError("只有汇报日志支持按状态筛选")
+            conditions.append(model.status == int(status))
+
+        return select(*model.__table__.columns).where(*conditions)
+
+    async def stream(self, query) -> AsyncIterator[bytes]:
+        """
+        流式执行导出查询，逐批生成编码后的内容
+
+        CSV格式在执行查询前先输出列名，客户端可以立即收到首字节。
+        """
+        columns = [column.key for column in query.selected_columns]
+        if self.export_format == ExportFormat.CSV:
+            yield self._encode_csv([columns])
+
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(query.execution_options(yield_per=self.batch_size))
+            async for rows in result.partitions():
+                yield self._encode(columns, rows)
+
+    def _encode(self, columns: List[str], rows: Sequence[Sequence[Any]]) -> bytes:
+        """编码一批数据行"""
+        if self.export_format == ExportFormat.CSV:
+            return self._encode_csv([[_csv_value(value) for value in row] for row in rows])
+
+        return "".join(
+            json.dumps(
+                {column: _json_value(value) for column, value in zip(columns, row)},
+                ensure_ascii=False
+            ) + "\n"
+            for row in rows
+        ).encode("utf-8")
+
+    @staticmethod
+    def _encode_csv(rows: List[List[Any]]) -> bytes:
+        """编码CSV行"""
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue().encode("utf-8")
+
+    @staticmethod
+    def _created_conditions(model, created_from: Optional[datetime], created_to: Optional[datetime]) -> list:
+        """创建时间范围条件 [created_from, created_to)"""
+        conditions = []
+        if created_from is not None:
+            conditions.append(model.created_at >= created_from)
+        if created_to is not None:
+            conditions.append(model.created_at < created_to)
+        return conditions
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from sqlalchemy import insert
+
+from app.config import settings
+from app.database import AsyncSessionLocal, Base
+from app.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# 溢出策略
+OVERFLOW_DROP_OLDEST = "drop_oldest"  # 丢弃最早的日志
+OVERFLOW_DROP_NEWEST = "drop_newest"  # 丢弃新写入的日志
+OVERFLOW_BLOCK = "block"              # 等待缓冲区有空位（请求会被阻塞）
+
+
+class LogBuffer:
+    """日志写缓冲（内存队列 + 后台批量写入）"""
+
+    def __init__(self):
+        self.max_size = settings.log_buffer_max_size
+        self.flush_size = settings.log_buffer_flush_size
+        self.flush_interval = settings.log_buffer_flush_interval_seconds
+        self.overflow_policy = settings.log_buffer_overflow_policy
+        self.lag_warning_seconds = settings.log_buffer_lag_warning_seconds
+
+        self.is_running = False
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_size)
+        self._wakeup = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+
+        # 统计计数
+        self.enqueued_count = 0
+        self.flushed_count = 0
+        self.dropped_count = 0
+        self.failed_count = 0
+        self.lagging_count = 0
+        self.last_flush_lag_seconds = 0.0
+
+    async def start(self):
+        """启动后台写入（未启用时日志仍同步写入）"""
+        if self.is_running or not settings.log_buffer_enabled:
+            return
+
+        self.is_running = True
+        self._flusher = asyncio.create_task(self._run())
+        logger.info("启动日志写缓冲")
+
+    async def stop(self):
+        """停止后台写入，并写入缓冲区中剩余的日志"""
+        if not self.is_running:
+            return
+
+        self.is_running = False
+        self._wakeup.set()
+        if self._flusher:
+            await self._flusher
+            self._flusher = None
+        logger.info(f"停止日志写缓冲，累计写入 {self.flushed_count} 条，丢弃 {self.dropped_count} 条")
+
+    async def put(self, model: Type[Base], fields: Dict[str, Any]) -> None:
+        """
+        写入一条日志到缓冲区
+
+        Args:
+            model: 日志模型类（ReceiveLog/SendLog/ReportLog）
+            fields: 日志字段
+        """
+        # 在入队时记录时间，避免写入延迟影响日志时间
+        fields.setdefault("created_at", datetime.now(timezone.utc))
+        entry = (model, fields, time.monotonic())
+
+        if self._queue.full():
+            if self.overflow_policy == OVERFLOW_BLOCK:
+                await self._queue.put(entry)
+                self._on_enqueued()
+                return
+            if self.overflow_policy == OVERFLOW_DROP_NEWEST:
+                self.dropped_count += 1
+                return
+            # 丢弃最早的一条，为新日志腾出空间
+            self._queue.get_nowait()
+            self.dropped_count += 1
+
+        self._queue.put_nowait(entry)
+        self._on_enqueued()
+
+    async def put_many(self, model: Type[Base], rows: List[Dict[str, Any]]) -> None:
+        """批量写入日志到缓冲区"""
+        for fields in rows:
+            await self.put(model, fields)
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓冲区统计信息"""
+        return {
+            "enabled": self.is_running,
+            "depth": self._queue.qsize(),
+            "max_size": self.max_size,
+            "overflow_policy": self.overflow_policy,
+            "enqueued_count": self.enqueued_count,
+            "flushed_count": self.flushed_count,
+            "dropped_count": self.dropped_count,
+            "failed_count": self.failed_count,
+            "lagging_count": self.lagging_count,
+            "last_flush_lag_seconds": round(self.last_flush_lag_seconds, 3)
+        }
+
+    def _on_enqueued(self) -> None:
+        """入队计数，达到批量阈值时提前唤醒写入"""
+        self.enqueued_count += 1
+        if self._queue.qsize() >= self.flush_size:
+            self._wakeup.set()
+
+    async def _run(self):
+        """后台写入循环：达到批量大小或时间间隔时写入"""
+        while self.is_running:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self._drain()
+
+        # 停止时写入剩余日志
+        await self._drain()
+
+    async def _drain(self):
+        """按批次写入队列中的全部日志"""
+        while not self._queue.empty():
+            batch = []
+            while len(batch) < self.flush_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Tuple[Type[Base], Dict[str, Any], float]]):
+        """将一批日志按表分组，多行INSERT后提交"""
+        rows_by_model: Dict[Type[Base], List[Dict[str, Any]]] = {}
+        for model, fields, _ in batch:
+            rows_by_model.setdefault(model, []).append(fields)
+
+        now = time.monotonic()
+        lag = now - min(enqueued_at for _, _, enqueued_at in batch)
+        self.last_flush_lag_seconds = lag
+        lagging = sum(1 for _, _, enqueued_at in batch if now - enqueued_at > self.lag_warning_seconds)
+        if lagging:
+            self.lagging_count += lagging
+            logger.warning(f"日志写入延迟 {lag:.1f} 秒，本批 {lagging} 条超过 {self.lag_warning_seconds} 秒")
+
+        try:
+            async with AsyncSessionLocal() as db:
+                for model, rows in rows_by_model.items():
+                    await db.execute(insert(model), rows)
+                await db.commit()
+            self.flushed_count += len(batch)
+        except Exception as e:
+            self.failed_count += len(batch)
+            logger.error(f"批量写入日志失败，丢弃 {len(batch)} 条: {e}")
+
+
+# 全局日志写缓冲实例
+log_buffer = LogBuffer()
+
+metrics.gauge("lksms_log_buffer_depth", "日志写缓冲中待写入的日志条数", callback=lambda: log_buffer.stats()["depth"])
@@ -1,10 +1,17 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Type
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import insert
+from app.database import Base
 from app.models.logs import ReceiveLog, SendLog, ReportLog
+from app.services.log_buffer import log_buffer
 
 
 class LogService:
-    """日志服务"""
+    """日志服务
+
+    日志写缓冲运行时，日志进入内存队列由后台批量写入，不占用请求事务；
+    否则在当前会话中同步写入并提交。批量提交、批量汇报的日志始终与业务数据在同一事务中写入。
+    """
     
     def __init__(self, db: AsyncSession):
         self.db = db
@@ -20,23 +27,30 @@ class LogService:
         request_data: Dict[str, Any],
         response_data: Dict[str, Any],
         status_code: int
-    ) -> ReceiveLog:
+    ) -> None:
         """记录接收日志"""
-        log = ReceiveLog(
-            request_id=request_id,
-            phone_number=phone_number,
-            content=content,
-            use_template=use_template,
-            source_ip=source_ip,
-            user_agent=user_agent,
-            request_data=request_data,
-            response_data=response_data,
-            status_code=status_code
-        )
-        
-        self.db.add(log)
-        await self.db.commit()
-        return log
+        await self._write(ReceiveLog, {
+            "request_id": request_id,
+            "phone_number": phone_number,
+            "content": content,
+            "use_template": use_template,
+            "source_ip": source_ip,
+            "user_agent": user_agent,
+            "request_data": request_data,
+            "response_data": response_data,
+            "status_code": status_code
+        })
+
+    async def log_receive_batch(self, logs: List[Dict[str, Any]]) -> None:
+        """
+        批量记录接收日志（多行INSERT）
+
+        不经过写缓冲，与当前事务中尚未提交的数据（如批量创建的任务）在同一事务中写入并提交。
+
+        Args:
+            logs: 接收日志字段字典列表，字段同log_receive参数
+        """
+        await self._write_batch(ReceiveLog, logs, in_transaction=True)
     
     async def log_send(
         self,
@@ -46,21 +60,28 @@ class LogService:
         content: str,
         request_data: Dict[str, Any],
         response_data: Dict[str, Any]
-    ) -> SendLog:
+    ) -> None:
         """记录发送日志"""
-        log = SendLog(
-            task_id=task_id,
-            app_id=app_id,
-            phone_number=phone_number,
-            content=content,
-            request_data=request_data,
-            response_data=response_data
-        )
-        
-        self.db.add(log)
-        await self.db.commit()
-        return log
+        await self._write(SendLog, {
+            "task_id": task_id,
+            "app_id": app_id,
+            "phone_number": phone_number,
+            "content": content,
+            "request_data": request_data,
+            "response_data": response_data
+        })
     
+    async def log_send_batch(self, logs: List[Dict[str, Any]]) -> None:
+        """
+        批量记录发送日志（多行INSERT）
+
+        同时提交当前事务中尚未提交的数据。
+
+        Args:
+            logs: 发送日志字段字典列表，字段同log_send参数
+        """
+        await self._write_batch(SendLog, logs)
+
     async def log_report(
         self,
         task_id: str,
@@ -68,16 +89,53 @@ class LogService:
         status: int,
         error_message: Optional[str],
         request_data: Dict[str, Any]
-    ) -> ReportLog:
+    ) -> None:
         """记录汇报日志"""
-        log = ReportLog(
-            task_id=task_id,
-            app_id=app_id,
-            status=status,
-            error_message=error_message,
-            request_data=request_data
-        )
-        
-        self.db.add(log)
+        await self._write(ReportLog, {
+            "task_id": task_id,
+            "app_id": app_id,
+            "status": status,
+            "error_message": error_message,
+            "request_data": request_data
+        })
+
+    async def log_report_batch(self, logs: List[Dict[str, Any]]) -> None:
+        """
+        批量记录汇报日志（多行INSERT）
+
+        不经过写缓冲，与当前事务中尚未提交的任务状态更新在同一事务中写入并提交。
+
+        Args:
+            logs: 汇报日志字段字典列表，字段同log_report参数
+        """
+        await self._write_batch(ReportLog, logs, in_transaction=True)
+
+    async def _write(self, model: Type[Base], fields: Dict[str, Any]) -> None:
+        """写入单条日志"""
+        if log_buffer.is_running:
+            await log_buffer.put(model, fields)
+            return
+
+        self.db.add(model(**fields))
+        await self.db.commit()
+
+    async def _write_batch(
+        self,
+        model: Type[Base],
+        rows: List[Dict[str, Any]],
+        in_transaction: bool = False
+    ) -> None:
+        """
+        写入多条日志并提交当前事务
+
+        in_transaction为True时日志在当前事务中直接插入，与业务数据一起提交，不会被写缓冲丢弃。
+        """
+        if log_buffer.is_running and not in_transaction:
+            # 先提交业务数据，再写入缓冲区，避免日志指向未提交的任务
+            await self.db.commit()
+            await log_buffer.put_many(model, rows)
+            return
+
+        if rows:
+            await self.db.execute(insert(model), rows)
         await self.db.commit()
-        return log
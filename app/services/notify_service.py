@@ -0,0 +1,140 @@
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional
+
+import asyncpg
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 新任务通知频道（create_task提交时发送）
+TASK_CREATED_CHANNEL = "sms_task_created"
+
+# 模板变更通知频道（模板创建或修改时发送）
+TEMPLATE_CHANGED_CHANNEL = "sms_template_changed"
+
+# APP登记变更通知频道（APP登记或修改处理能力时发送）
+APP_CHANGED_CHANNEL = "sms_app_changed"
+
+
+class NotifyService:
+    """数据库通知监听服务（每个进程共享一个LISTEN连接）"""
+
+    def __init__(self):
+        self.is_running = False
+        self.reconnect_interval = 5  # 连接断开后5秒重连
+        self.fallback_poll_interval = 1  # 监听不可用时的轮询间隔（秒）
+        self.connection: Optional[asyncpg.Connection] = None
+        self._closed: Optional[asyncio.Event] = None
+        self._new_task_event = asyncio.Event()
+        self._handlers: Dict[str, List[Callable[[str], None]]] = {
+            TASK_CREATED_CHANNEL: [lambda payload: self._wake_task_waiters()]
+        }
+
+    @property
+    def is_listening(self) -> bool:
+        """监听连接是否可用"""
+        return self.connection is not None and not self.connection.is_closed()
+
+    def add_handler(self, channel: str, handler: Callable[[str], None]) -> None:
+        """
+        注册通知处理函数（需在start之前注册）
+
+        Args:
+            channel: 通知频道
+            handler: 处理函数，参数为通知的payload
+        """
+        self._handlers.setdefault(channel, []).append(handler)
+
+    async def start(self):
+        """启动通知监听，连接断开时自动重连"""
+        if self.is_running:
+            return
+
+        self.is_running = True
+        logger.info("启动数据库通知监听")
+
+        while self.is_running:
+            self._closed = asyncio.Event()
+            try:
+                self.connection = await asyncpg.connect(settings.asyncpg_dsn)
+                self.connection.add_termination_listener(lambda connection: self._closed.set())
+                for channel in self._handlers:
+                    await self.connection.add_listener(channel, self._on_notification)
+
+                # 断线期间可能错过通知，唤醒所有等待者重新获取一次
+                self._wake_task_waiters()
+                await self._closed.wait()
+            except Exception as e:
+                logger.error(f"数据库通知监听出错: {e}")
+            finally:
+                await self._close_connection()
+
+            if self.is_running:
+                await asyncio.sleep(self.reconnect_interval)
+
+    async def stop(self):
+        """停止通知监听"""
+        self.is_running = False
+        if self._closed:
+            self._closed.set()
+        await self._close_connection()
+        self._wake_task_waiters()
+        logger.info("停止数据库通知监听")
+
+    def new_task_event(self) -> asyncio.Event:
+        """
+        获取当前的新任务事件
+
+        应在查询任务之前获取，这样查询与等待之间到达的通知也不会丢失。
+        """
+        return self._new_task_event
+
+    async def wait_for_new_tasks(self, event: asyncio.Event, timeout: float) -> bool:
+        """
+        等待新任务通知
+
+        Args:
+            event: 查询前通过new_task_event获取的事件
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            bool: 是否收到新任务通知（监听不可用时按轮询间隔返回False）
+        """
+        if not self.is_listening:
+            timeout = min(timeout, self.fallback_poll_interval)
+
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def _on_notification(self, connection, pid: int, channel: str, payload: str) -> None:
+        """分发收到的通知"""
+        for handler in self._handlers.get(channel, []):
+            try:
+                handler(payload)
+            except Exception as e:
+                logger.error(f"处理数据库通知出错: channel={channel}, error={e}")
+
+    def _wake_task_waiters(self) -> None:
+        """唤醒所有等待新任务的请求"""
+        event = self._new_task_event
+        self._new_task_event = asyncio.Event()
+        event.set()
+
+    async def _close_connection(self) -> None:
+        """关闭监听连接"""
+        connection = self.connection
+        self.connection = None
+        if connection is not None and not connection.is_closed():
+            try:
+                await connection.close()
+            except Exception as e:
+                logger.warning(f"关闭数据库通知连接出错: {e}")
+
+
+# 全局通知服务实例
+notify_service = NotifyService()
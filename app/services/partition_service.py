@@ -0,0 +1,213 @@
+import logging
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, NamedTuple, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 分区维护使用的事务级咨询锁，多个服务实例同时执行时串行化DDL
+PARTITION_MAINTENANCE_LOCK_ID = 7320011
+
+
+# pg_get_expr(relpartbound)输出中的范围上下界
+PARTITION_BOUND_PATTERN = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+class PartitionSpec(NamedTuple):
+    """按created_at范围分区的表"""
+    table: str               # 分区父表
+    interval: str            # 分区粒度: day/week/month
+    premake: int             # 当前分区之后提前创建的分区数
+    retention_days: int = 0  # 数据保留天数，整个分区过期后删除；0表示不删除
+
+
+class PartitionInfo(NamedTuple):
+    """已存在的范围分区"""
+    name: str
+    lower: datetime
+    upper: datetime
+
+
+class PartitionMaintenanceResult(NamedTuple):
+    """单个表的分区维护结果"""
+    created: List[str]  # 新创建的分区
+    dropped: List[str]  # 删除的过期分区
+
+
+def partition_specs() -> List[PartitionSpec]:
+    """需要自动维护分区的表"""
+    log_spec = dict(
+        interval=settings.log_partition_interval,
+        premake=settings.log_partition_premake,
+        retention_days=settings.log_retention_days
+    )
+    return [
+        PartitionSpec("sms_tasks", "month", settings.task_partition_premake_months),
+        PartitionSpec("receive_logs", **log_spec),
+        PartitionSpec("send_logs", **log_spec),
+        PartitionSpec("report_logs", **log_spec),
+    ]
+
+
+def period_start(moment: datetime, interval: str) -> datetime:
+    """moment所在分区的起始时间（UTC）"""
+    moment = moment.astimezone(timezone.utc)
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if interval == "day":
+        return day
+    if interval == "week":
+        return day - timedelta(days=day.weekday())
+    if interval == "month":
+        return day.replace(day=1)
+    raise ValueError(f"不支持的分区粒度: {interval}")
+
+
+def next_period(start: datetime, interval: str) -> datetime:
+    """下一个分区的起始时间"""
+    if interval == "day":
+        return start + timedelta(days=1)
+    if interval == "week":
+        return start + timedelta(weeks=1)
+    if interval == "month":
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    raise ValueError(f"不支持的分区粒度: {interval}")
+
+
+def partition_name(table: str, start: datetime, interval: str) -> str:
+    """分区表名，如 sms_tasks_p202610、receive_logs_p20261017"""
+    suffix = start.strftime("%Y%m") if interval == "month" else start.strftime("%Y%m%d")
+    return f"{table}_p{suffix}"
+
+
+class PartitionService:
+    """
+    表分区维护服务
+
+    分区按UTC时间划分，每个分区表另有一个DEFAULT分区兜底，
+    定时任务提前创建后续分区，正常情况下DEFAULT分区始终为空。
+    过期数据通过删除整个分区清理，耗时与过期行数无关，也不会产生需要VACUUM的死元组。
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def is_partitioned(self, table: str) -> bool:
+        """表是否为分区表（未执行分区迁移的旧库返回False）"""
+        result = await self.db.execute(
+            text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"),
+            {"table": table}
+        )
+        return result.scalar() is not None
+
+    async def ensure_partitions(self, spec: PartitionSpec, now: Optional[datetime] = None) -> List[str]:
+        """
+        创建当前分区、后续premake个分区和DEFAULT分区（已存在的跳过）
+
+        Returns:
+            List[str]: 新创建的分区表名
+        """
+        start = period_start(now or datetime.now(timezone.utc), spec.interval)
+
+        await self._lock()
+        existing = await self.list_partitions(spec.table)
+        created = []
+        for _ in range(spec.premake + 1):
+            end = next_period(start, spec.interval)
+
+            # 已被现有分区覆盖的部分跳过；调整分区粒度后，新分区从旧分区的上界开始补齐
+            lower = start
+            covered = [p.upper for p in existing if p.lower < end and start < p.upper]
+            if covered:
+                lower = max(covered)
+
+            if lower < end and not any(p.lower < end and lower < p.upper for p in existing):
+                name = partition_name(spec.table, lower, spec.interval if lower == start else "day")
+                await self.db.execute(text(
+                    f'CREATE TABLE "{name}" PARTITION OF "{spec.table}" '
+                    f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{end.isoformat()}')"
+                ))
+                existing.append(PartitionInfo(name, lower, end))
+                created.append(name)
+            start = end
+
+        default_name = f"{spec.table}_default"
+        if not await self._exists(default_name):
+            await self.db.execute(text(f'CREATE TABLE "{default_name}" PARTITION OF "{spec.table}" DEFAULT'))
+            created.append(default_name)
+
+        await self.db.commit()
+        return created
+
+    async def drop_expired_partitions(self, spec: PartitionSpec, now: Optional[datetime] = None) -> List[str]:
+        """
+        删除数据全部超过保留期的分区（上界不晚于 当前时间 - retention_days）
+
+        Returns:
+            List[str]: 删除的分区表名
+        """
+        if spec.retention_days <= 0:
+            return []
+
+        cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=spec.retention_days)
+
+        await self._lock()
+        dropped = []
+        for partition in await self.list_partitions(spec.table):
+            if partition.upper <= cutoff:
+                await self.db.execute(text(f'DROP TABLE "{partition.name}"'))
+                dropped.append(partition.name)
+
+        await self.db.commit()
+        return dropped
+
+    async def list_partitions(self, table: str) -> List[PartitionInfo]:
+        """列出表的范围分区（不含DEFAULT分区），按下界排序"""
+        result = await self.db.execute(text("""
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass(:table)
+        """), {"table": table})
+
+        partitions = []
+        for name, bound in result.all():
+            match = PARTITION_BOUND_PATTERN.search(bound or "")
+            if match:
+                partitions.append(PartitionInfo(
+                    name=name,
+                    lower=datetime.fromisoformat(match.group(1)),
+                    upper=datetime.fromisoformat(match.group(2))
+                ))
+        return sorted(partitions, key=lambda p: p.lower)
+
+    async def maintain(self) -> Dict[str, PartitionMaintenanceResult]:
+        """
+        维护所有分区表：创建后续分区，删除过期分区
+
+        Returns:
+            Dict[str, PartitionMaintenanceResult]: 表名 -> 维护结果
+        """
+        results = {}
+        for spec in partition_specs():
+            if not await self.is_partitioned(spec.table):
+                logger.warning(f"表 {spec.table} 不是分区表，跳过分区维护（请执行分区迁移脚本）")
+                continue
+            results[spec.table] = PartitionMaintenanceResult(
+                created=await self.ensure_partitions(spec),
+                dropped=await self.drop_expired_partitions(spec)
+            )
+        return results
+
+    async def _lock(self) -> None:
+        """获取分区维护锁，并限制DDL等待父表锁的时间，避免长时间阻塞线上读写"""
+        await self.db.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": PARTITION_MAINTENANCE_LOCK_ID})
+        await self.db.execute(text("SET LOCAL lock_timeout = '5s'"))
+
+    async def _exists(self, name: str) -> bool:
+        """表是否存在"""
+        result = await self.db.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name})
+        return bool(result.scalar())
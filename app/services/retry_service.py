@@ -1,11 +1,16 @@
-from typing import Optional, List
+from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, and_
-from datetime import datetime, timedelta
+from sqlalchemy import select, func
 
 from app.models.sms_task import SmsTask
 from app.utils.enums import TaskStatus
 from app.config import settings
+from app.services.zombie_task_service import ZombieTaskService
+from app.services.sms_service import SmsService
+from app.services.counter_service import (
+    CounterService, COUNTER_PENDING_NEW, COUNTER_PENDING_RETRY,
+    COUNTER_PROCESSING, COUNTER_RETRIED
+)
 
 
 class RetryService:
@@ -17,49 +22,26 @@ class RetryService:
         self.retry_delay_minutes = settings.retry_delay_minutes
         self.processing_timeout_minutes = settings.processing_timeout_minutes
     
-    async def mark_task_for_retry(self, task_id: str, error_message: str) -> bool:
+    async def mark_task_for_retry(self, task_id: str, error_message: str, error_class: Optional[str] = None) -> bool:
         """
         标记任务需要重试
         
         Args:
             task_id: 任务ID
             error_message: 错误信息
+            error_class: 错误类别（用于选择重试延迟）
             
         Returns:
             bool: 是否成功标记为重试
         """
-        # 获取当前任务
-        query = select(SmsTask).where(SmsTask.task_id == task_id)
-        result = await self.db.execute(query)
-        task = result.scalar_one_or_none()
-        
-        if not task:
-            return False
-        
-        # 检查是否超过最大重试次数
-        if task.retry_count >= self.max_retry_count:
-            # 超过最大重试次数，标记为最终失败
-            await self._mark_final_failure(task_id, error_message)
-            return False
-        
-        # 增加重试次数并重置状态为PENDING
-        update_query = update(SmsTask).where(
-            SmsTask.task_id == task_id
-        ).values(
-            status=TaskStatus.PENDING,
-            retry_count=task.retry_count + 1,
-            processing_app_id=None,  # 清除处理APP ID
-            updated_at=datetime.now()
+        # 与APP汇报失败并要求重试的处理一致（含超过最大重试次数时标记最终失败和计数维护）
+        return await SmsService(self.db).update_task_status(
+            task_id, TaskStatus.FAILED, error_message, should_retry=True, error_class=error_class
         )
-        
-        await self.db.execute(update_query)
-        await self.db.commit()
-        
-        return True
     
     async def get_retry_tasks(self, limit: int = 10) -> list:
         """
-        获取需要重试的任务（延迟后的）
+        获取需要重试的任务（已到下次可重试时间的）
         
         Args:
             limit: 获取数量限制
@@ -67,91 +49,39 @@ class RetryService:
         Returns:
             list: 可以重试的任务列表
         """
-        # 计算重试时间阈值
-        retry_threshold = datetime.now() - timedelta(minutes=self.retry_delay_minutes)
-        
         query = select(SmsTask).where(
             SmsTask.status == TaskStatus.PENDING,
             SmsTask.retry_count > 0,
-            SmsTask.updated_at <= retry_threshold
-        ).order_by(SmsTask.retry_count, SmsTask.created_at).limit(limit)
+            SmsTask.next_attempt_at <= func.now()
+        ).order_by(SmsTask.next_attempt_at).limit(limit)
         
         result = await self.db.execute(query)
         return result.scalars().all()
     
-    async def _mark_final_failure(self, task_id: str, error_message: str) -> None:
-        """标记任务为最终失败"""
-        update_query = update(SmsTask).where(
-            SmsTask.task_id == task_id
-        ).values(
-            status=TaskStatus.FAILED,
-            updated_at=datetime.now(),
-            reported_at=datetime.now()
-        )
-        
-        await self.db.execute(update_query)
-        await self.db.commit()
-    
-    async def recover_zombie_tasks(self) -> List[SmsTask]:
+    async def recover_zombie_tasks(self) -> int:
         """
         恢复僵尸任务（PROCESSING状态但超时未汇报的任务）
 
+        与定时任务使用同一套按批次的集合更新逻辑。
+
         Returns:
-            List[SmsTask]: 恢复的僵尸任务列表
+            int: 恢复的任务数量
         """
-        # 计算超时阈值
-        timeout_threshold = datetime.now() - timedelta(minutes=self.processing_timeout_minutes)
-
-        # 查找僵尸任务
-        query = select(SmsTask).where(
-            and_(
-                SmsTask.status == TaskStatus.PROCESSING,
-                SmsTask.updated_at <= timeout_threshold
-            )
-        )
-
-        result = await self.db.execute(query)
-        zombie_tasks = result.scalars().all()
-
-        if not zombie_tasks:
-            return []
-
-        # 根据重试次数决定处理方式
-        for task in zombie_tasks:
-            if task.retry_count >= self.max_retry_count:
-                # 超过最大重试次数，标记为最终失败
-                await self._mark_final_failure(task.task_id, "处理超时，超过最大重试次数")
-            else:
-                # 重置为PENDING状态，增加重试次数
-                update_query = update(SmsTask).where(
-                    SmsTask.id == task.id
-                ).values(
-                    status=TaskStatus.PENDING,
-                    retry_count=task.retry_count + 1,
-                    processing_app_id=None,  # 清除处理APP ID
-                    updated_at=datetime.now()
-                )
-                await self.db.execute(update_query)
-
-        await self.db.commit()
-        return list(zombie_tasks)
+        result = await ZombieTaskService(self.db).recover_zombie_tasks()
+        return result.recovered_count
 
     async def get_retry_statistics(self) -> dict:
-        """获取重试统计信息"""
-        # 统计各种状态的任务数量
-        pending_count_query = select(SmsTask).where(SmsTask.status == TaskStatus.PENDING)
-        processing_count_query = select(SmsTask).where(SmsTask.status == TaskStatus.PROCESSING)
-        retry_count_query = select(SmsTask).where(SmsTask.retry_count > 0)
-
-        pending_result = await self.db.execute(pending_count_query)
-        processing_result = await self.db.execute(processing_count_query)
-        retry_result = await self.db.execute(retry_count_query)
+        """获取重试统计信息（读取增量维护的任务计数）"""
+        counts = await CounterService(self.db).get_counts()
 
         return {
-            "pending_tasks": len(pending_result.scalars().all()),
-            "processing_tasks": len(processing_result.scalars().all()),
-            "retry_tasks": len(retry_result.scalars().all()),
+            "pending_tasks": counts[COUNTER_PENDING_NEW] + counts[COUNTER_PENDING_RETRY],
+            "processing_tasks": counts[COUNTER_PROCESSING],
+            "retry_tasks": counts[COUNTER_RETRIED],
             "max_retry_count": self.max_retry_count,
             "retry_delay_minutes": self.retry_delay_minutes,
+            "retry_backoff_max_minutes": settings.retry_backoff_max_minutes,
+            "retry_backoff_jitter": settings.retry_backoff_jitter,
+            "retry_delay_minutes_by_error_class": settings.retry_delay_minutes_by_error_class,
             "processing_timeout_minutes": self.processing_timeout_minutes
         }
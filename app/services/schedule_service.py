@@ -0,0 +1,130 @@
+import logging
+import math
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, and_, func, literal_column, Integer, Row
+
+from app.models.sms_task import SmsTask
+from app.utils.enums import TaskStatus
+from app.config import settings
+from app.utils.helpers import sql_constant, created_after, task_id_created_range
+from app.utils.metrics import SCHEDULED_RELEASE_LAG
+from app.services.counter_service import CounterService
+from app.services.notify_service import TASK_CREATED_CHANNEL
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduleService:
+    """
+    定时发送服务
+
+    指定了未来send_at的任务以SCHEDULED状态写入，不在领取任务的索引中。
+    定时任务释放每次按send_at顺序把最多一批到期任务改为PENDING，批大小由释放速率和间隔决定，
+    大量任务定在同一时刻时按固定速率逐批进入队列，而不是同时涌入。
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.release_limit = max(
+            math.ceil(settings.scheduled_release_rate_per_second * settings.scheduled_release_interval_seconds), 1
+        )
+        self.counter_service = CounterService(db)
+
+    async def release_due_tasks(self) -> int:
+        """
+        释放一批到期的定时任务（SCHEDULED -> PENDING）并通知等待中的长轮询
+
+        Returns:
+            int: 本次释放的任务数
+        """
+        result = await self.db.execute(self._build_release_statement())
+        lags = [float(row.lag_seconds) for row in result]
+        if lags:
+            await self.db.execute(select(func.pg_notify(TASK_CREATED_CHANNEL, "")))
+        await self.db.commit()
+
+        for lag in lags:
+            SCHEDULED_RELEASE_LAG.observe(lag)
+        return len(lags)
+
+    def _build_release_statement(self):
+        """
+        构建单批定时任务释放语句
+
+        从idx_sms_tasks_scheduled按send_at读取最多release_limit个到期任务（SKIP LOCKED，多实例不重复释放），
+        状态改为PENDING，任务计数在同一条语句中维护。与领取任务使用相同的created_at时间范围。
+        """
+        window = []
+        created_threshold = created_after(settings.task_queue_lookback_days)
+        if created_threshold is not None:
+            window.append(SmsTask.created_at >= created_threshold)
+
+        due_tasks = select(SmsTask.id, SmsTask.created_at).where(
+            and_(
+                SmsTask.status == sql_constant(TaskStatus.SCHEDULED),
+                SmsTask.send_at <= func.now(),
+                *window
+            )
+        ).order_by(SmsTask.send_at).limit(self.release_limit).with_for_update(skip_locked=True).cte("due_tasks")
+
+        release = update(SmsTask).where(
+            and_(
+                SmsTask.id == due_tasks.c.id,
+                SmsTask.created_at == due_tasks.c.created_at,
+                *window
+            )
+        ).values(
+            status=TaskStatus.PENDING,
+            updated_at=func.now()
+        ).returning(
+            func.extract("epoch", func.now() - SmsTask.send_at).label("lag_seconds"),
+            literal_column(str(int(TaskStatus.SCHEDULED)), Integer).label("old_status"),
+            SmsTask.retry_count.label("old_retry_count"),
+            SmsTask.priority,
+            SmsTask.status.label("new_status"),
+            SmsTask.retry_count.label("new_retry_count")
+        )
+        return self.counter_service.track_transitions(release, name="released_tasks")
+
+    async def cancel_task(self, task_id: str) -> Optional[Row]:
+        """
+        取消尚未释放的定时任务（SCHEDULED -> CANCELLED）
+
+        Args:
+            task_id: 任务ID
+
+        Returns:
+            Optional[Row]: 取消后的任务，任务不存在或不是待释放的定时任务时为None
+        """
+        created_range = task_id_created_range([task_id])
+        window = [SmsTask.created_at.between(*created_range)] if created_range else []
+
+        cancel = update(SmsTask).where(
+            and_(
+                SmsTask.task_id == task_id,
+                SmsTask.status == sql_constant(TaskStatus.SCHEDULED),
+                *window
+            )
+        ).values(
+            status=TaskStatus.CANCELLED,
+            result="定时发送已取消",
+            updated_at=func.now()
+        ).returning(
+            SmsTask.task_id,
+            SmsTask.phone_number,
+            SmsTask.content,
+            SmsTask.status,
+            SmsTask.created_at,
+            SmsTask.send_at,
+            SmsTask.sent_at,
+            literal_column(str(int(TaskStatus.SCHEDULED)), Integer).label("old_status"),
+            SmsTask.retry_count.label("old_retry_count"),
+            SmsTask.priority,
+            SmsTask.status.label("new_status"),
+            SmsTask.retry_count.label("new_retry_count")
+        )
+        result = await self.db.execute(self.counter_service.track_transitions(cancel, name="cancelled_tasks"))
+        row = result.first()
+        await self.db.commit()
+        return row
@@ -1,10 +1,16 @@
 import asyncio
 import logging
 from datetime import datetime
+from typing import Awaitable, Callable
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.database import AsyncSessionLocal
 from app.services.zombie_task_service import ZombieTaskService
+from app.services.counter_service import CounterService
+from app.services.partition_service import PartitionService
+from app.services.archive_service import ArchiveService
+from app.services.schedule_service import ScheduleService
 
 logger = logging.getLogger(__name__)
 
@@ -15,50 +21,125 @@ class SchedulerService:
     def __init__(self):
         self.is_running = False
         self.check_interval = 300  # 5分钟检查一次
+        self.counter_reconcile_interval = settings.task_counter_reconcile_interval_seconds
+        self.partition_check_interval = 3600  # 1小时检查一次分区
+        self.archive_interval = settings.archive_interval_seconds
+        self.scheduled_release_interval = settings.scheduled_release_interval_seconds
     
-    async def start_zombie_task_recovery(self):
-        """启动僵尸任务恢复定时器"""
+    async def start(self):
+        """启动所有定时任务"""
         if self.is_running:
             return
         
         self.is_running = True
-        logger.info("启动僵尸任务恢复定时器")
-        
+        logger.info("启动定时任务")
+
+        await asyncio.gather(
+            self._run_periodically("僵尸任务恢复", self.check_interval, self._recover_zombie_tasks),
+            self._run_periodically("任务计数校准", self.counter_reconcile_interval, self._reconcile_task_counters),
+            self._run_periodically("表分区维护", self.partition_check_interval, self.maintain_partitions),
+            self._run_periodically("任务归档", self.archive_interval, self._archive_terminal_tasks),
+            self._run_periodically("定时任务释放", self.scheduled_release_interval, self._release_scheduled_tasks),
+        )
+    
+    async def stop(self):
+        """停止所有定时任务"""
+        self.is_running = False
+        logger.info("停止定时任务")
+
+    async def _run_periodically(
+        self,
+        name: str,
+        interval: float,
+        job: Callable[[], Awaitable[None]]
+    ):
+        """按固定间隔循环执行任务，出错后等待1分钟再重试"""
+        logger.info(f"启动{name}定时器，间隔 {interval} 秒")
+
         while self.is_running:
             try:
-                await self._recover_zombie_tasks()
-                await asyncio.sleep(self.check_interval)
+                await job()
+                await asyncio.sleep(interval)
             except Exception as e:
-                logger.error(f"僵尸任务恢复出错: {e}")
+                logger.error(f"{name}出错: {e}")
                 await asyncio.sleep(60)  # 出错后等待1分钟再重试
     
-    async def stop_zombie_task_recovery(self):
-        """停止僵尸任务恢复定时器"""
-        self.is_running = False
-        logger.info("停止僵尸任务恢复定时器")
-    
     async def _recover_zombie_tasks(self):
         """恢复僵尸任务"""
         async with AsyncSessionLocal() as db:
             zombie_service = ZombieTaskService(db)
 
             # 恢复僵尸任务
-            recovered_count = await zombie_service.recover_zombie_tasks()
+            result = await zombie_service.recover_zombie_tasks()
 
-            if recovered_count > 0:
-                logger.info(f"恢复了 {recovered_count} 个僵尸任务")
+            if result.recovered_count > 0:
+                logger.info(
+                    f"恢复了 {result.recovered_count} 个僵尸任务，"
+                    f"共 {len(result.chunk_counts)} 批: {result.chunk_counts}"
+                )
             else:
                 logger.debug("没有发现僵尸任务")
 
+    async def _reconcile_task_counters(self):
+        """按实际任务数校准任务计数"""
+        async with AsyncSessionLocal() as db:
+            drift = await CounterService(db).reconcile()
+
+            if drift:
+                logger.warning(f"任务计数存在偏差，已修正: {drift}")
+            else:
+                logger.debug("任务计数无偏差")
+
+    async def maintain_partitions(self):
+        """创建当前及后续的表分区，删除过期的日志分区"""
+        async with AsyncSessionLocal() as db:
+            results = await PartitionService(db).maintain()
+
+            for table, result in results.items():
+                if result.created:
+                    logger.info(f"表 {table} 新建分区: {result.created}")
+                if result.dropped:
+                    logger.info(f"表 {table} 删除过期分区: {result.dropped}")
+
+    async def _archive_terminal_tasks(self):
+        """归档终态任务（未配置ARCHIVE_AFTER_DAYS时不执行）"""
+        if settings.archive_after_days <= 0:
+            return
+
+        async with AsyncSessionLocal() as db:
+            result = await ArchiveService(db).archive_terminal_tasks()
+
+            if result.archived_count > 0:
+                logger.info(
+                    f"归档了 {result.archived_count} 个终态任务到 {result.file_path}，"
+                    f"共 {len(result.chunk_counts)} 批"
+                )
+            else:
+                logger.debug("没有需要归档的任务")
+
+    async def _release_scheduled_tasks(self):
+        """释放一批到期的定时任务（每次最多释放速率 × 间隔个）"""
+        async with AsyncSessionLocal() as db:
+            schedule_service = ScheduleService(db)
+            released = await schedule_service.release_due_tasks()
+
+            if released >= schedule_service.release_limit:
+                logger.info(f"释放了 {released} 个到期定时任务，已达单次上限，剩余任务下次继续释放")
+            elif released > 0:
+                logger.debug(f"释放了 {released} 个到期定时任务")
+
     async def manual_recover_zombie_tasks(self) -> dict:
         """手动恢复僵尸任务"""
         async with AsyncSessionLocal() as db:
             zombie_service = ZombieTaskService(db)
-            recovered_count = await zombie_service.recover_zombie_tasks()
+            result = await zombie_service.recover_zombie_tasks()
 
             return {
-                "recovered_count": recovered_count,
-                "message": f"成功恢复 {recovered_count} 个僵尸任务"
+                "recovered_count": result.recovered_count,
+                "retried_count": result.retried_count,
+                "failed_count": result.failed_count,
+                "chunk_counts": result.chunk_counts,
+                "message": f"成功恢复 {result.recovered_count} 个僵尸任务"
             }
 
 
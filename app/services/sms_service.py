@@ -1,15 +1,31 @@
-from typing import List, Optional, Tuple
+import random
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, and_, func, case
-from datetime import datetime, timedelta
+from sqlalchemy import (
+    select, update, insert, and_, or_, func, case, values, column, union_all,
+    literal_column, cast, true, String, Integer, Float, Boolean, Row
+)
+from datetime import datetime, timedelta, timezone
 
 from app.models.sms_task import SmsTask
 from app.models.default_sms import DefaultSmsData
-from app.utils.enums import TaskStatus
-from app.utils.helpers import generate_task_id
+from app.utils.enums import TaskStatus, TaskPriority, ReportOutcome
+from app.utils.helpers import generate_task_id, sql_constant, created_after, task_id_created_range
+from app.utils.metrics import TASK_CLAIM_BATCH_SIZE, TASK_QUEUE_WAIT
+from app.utils.retry_backoff import base_delay_seconds, next_attempt_at
 from app.services.template_service import TemplateService
+from app.services.notify_service import TASK_CREATED_CHANNEL
+from app.services.app_service import app_registry
+from app.services.counter_service import (
+    CounterService, COUNTER_PENDING_NEW, COUNTER_PENDING_RETRY,
+    COUNTER_PROCESSING, COUNTER_SUCCESS, COUNTER_FAILED,
+    COUNTER_SCHEDULED, COUNTER_CANCELLED,
+    task_counter_keys, lane_counter_key
+)
 from sqlalchemy import func, case
 from app.schemas.admin import TaskStatisticsResponse
+from app.schemas.sms import SmsRequest
 
 class SmsService:
     """短信服务"""
@@ -17,13 +33,16 @@ class SmsService:
     def __init__(self, db: AsyncSession):
         self.db = db
         self.template_service = TemplateService(db)
+        self.counter_service = CounterService(db)
     
     async def create_task(
         self,
         phone_number: str,
         content: Optional[str],
         use_template: bool = False,
-        source: Optional[str] = None
+        source: Optional[str] = None,
+        priority: TaskPriority = TaskPriority.NORMAL,
+        send_at: Optional[datetime] = None
     ) -> SmsTask:
         """
         创建发送任务
@@ -33,13 +52,16 @@ class SmsService:
             content: 发送内容（可为空）
             use_template: 是否使用模板
             source: 来源标识
+            priority: 优先级通道
+            send_at: 定时发送时间（在未来时任务以SCHEDULED写入，到期后释放）
             
         Returns:
             Tuple[SmsTask, str]: (任务对象, 最终内容)
             
         Raises:
-            ValueError: 当默认内容已发送或其他业务错误时
+            ValueError: 当默认内容已发送、定时发送时间超出范围或其他业务错误时
         """
+        status = self._initial_status(send_at)
         final_content = content
         
         # 如果内容为空，获取默认内容
@@ -69,87 +91,403 @@ class SmsService:
             task_id=task_id,
             phone_number=phone_number,
             content=final_content,
-            status=TaskStatus.PENDING,
-            source=source
+            status=status,
+            source=source,
+            priority=priority,
+            send_at=send_at if status == TaskStatus.SCHEDULED else None
         )
         
         self.db.add(task)
+        await self.counter_service.add({key: 1 for key in task_counter_keys(status, 0, priority)})
+        if status == TaskStatus.PENDING:
+            await self._notify_new_tasks()
         await self.db.commit()
         await self.db.refresh(task)
         
         return task
+
+    async def create_tasks_batch(
+        self,
+        items: List[SmsRequest]
+    ) -> List[Tuple[Optional[str], Optional[TaskStatus], Optional[str], Optional[str]]]:
+        """
+        批量创建发送任务
+
+        处理规则与create_task一致（内容为空时使用默认内容，use_template时渲染模板，send_at在未来时为定时任务），
+        但默认内容领取、模板查询和任务写入都按批执行。领取了默认内容但渲染或校验失败的请求会归还默认内容，
+        不消耗该号码的发送机会。任务只写入当前事务，不提交，由调用方与接收日志一起提交。
+
+        Args:
+            items: 短信发送请求列表
+
+        Returns:
+            List[Tuple[Optional[str], Optional[TaskStatus], Optional[str], Optional[str]]]:
+            与请求顺序一致的 (任务ID, 任务状态, 错误信息, 提示信息)，提示信息如未使用的模板参数
+        """
+        contents: List[Optional[str]] = [item.content for item in items]
+        use_templates: List[bool] = [item.use_template for item in items]
+        statuses: List[Optional[TaskStatus]] = [None] * len(items)
+        errors: List[Optional[str]] = [None] * len(items)
+        warnings: List[Optional[str]] = [None] * len(items)
+        default_claimed: Set[int] = set()
+
+        # 0. 校验定时发送时间（在领取默认内容之前，无效的请求不消耗默认内容）
+        for i, item in enumerate(items):
+            try:
+                statuses[i] = self._initial_status(item.send_at)
+            except ValueError as e:
+                errors[i] = str(e)
+
+        # 1. 内容为空的请求批量领取默认内容
+        default_indexes = [i for i, item in enumerate(items) if errors[i] is None and not item.content]
+        if default_indexes:
+            phone_numbers = {items[i].phone_number for i in default_indexes}
+            claimed = await self._claim_default_contents(phone_numbers)
+            missing = phone_numbers - set(claimed)
+            existing = await self._get_existing_default_phones(missing) if missing else set()
+
+            for i in default_indexes:
+                phone_number = items[i].phone_number
+                # pop保证同一批次中同一号码的默认内容只被使用一次
+                default_data = claimed.pop(phone_number, None)
+                if default_data is None:
+                    if phone_number not in missing or phone_number in existing:
+                        errors[i] = "该手机号的默认内容已发送过"
+                    else:
+                        errors[i] = "未找到该手机号的默认内容"
+                    continue
+                contents[i] = default_data.content
+                use_templates[i] = default_data.use_template
+                default_claimed.add(i)
+
+        # 2. 需要模板的内容使用预编译模板批量渲染
+        template_indexes = [
+            i for i in range(len(items))
+            if errors[i] is None and use_templates[i] and contents[i]
+        ]
+        if template_indexes:
+            rendered = await self.template_service.render_template_batch(
+                [contents[i] for i in template_indexes]
+            )
+            for i, (processed_content, error, warning) in zip(template_indexes, rendered):
+                warnings[i] = warning
+                if error:
+                    errors[i] = error
+                elif processed_content:
+                    contents[i] = processed_content
+
+        for i in range(len(items)):
+            if errors[i] is None and len(contents[i]) > 200:
+                errors[i] = "发送内容超过200个字符"
+
+        # 3. 领取了默认内容但未通过校验的请求归还默认内容（行锁在本事务中，不会被其他请求领取）
+        released = {items[i].phone_number for i in default_claimed if errors[i] is not None}
+        if released:
+            await self._release_default_contents(released)
+
+        # 4. 组装任务行，多行INSERT写入
+        results: List[Tuple[Optional[str], Optional[TaskStatus], Optional[str], Optional[str]]] = []
+        task_rows = []
+        task_ids = set()
+        for i, item in enumerate(items):
+            if errors[i] is not None:
+                results.append((None, None, errors[i], warnings[i]))
+                continue
+
+            task_id = generate_task_id()
+            while task_id in task_ids:
+                task_id = generate_task_id()
+            task_ids.add(task_id)
+
+            task_rows.append({
+                "task_id": task_id,
+                "phone_number": item.phone_number,
+                "content": contents[i],
+                "status": statuses[i],
+                "source": item.source,
+                "priority": item.priority,
+                "send_at": item.send_at if statuses[i] == TaskStatus.SCHEDULED else None
+            })
+            results.append((task_id, statuses[i], None, warnings[i]))
+
+        if task_rows:
+            await self.db.execute(insert(SmsTask), task_rows)
+            deltas = Counter()
+            for row in task_rows:
+                deltas.update(task_counter_keys(row["status"], 0, row["priority"]))
+            await self.counter_service.add(dict(deltas))
+            if any(row["status"] == TaskStatus.PENDING for row in task_rows):
+                await self._notify_new_tasks()
+
+        return results
+
+    @staticmethod
+    def _initial_status(send_at: Optional[datetime]) -> TaskStatus:
+        """
+        新任务的初始状态：send_at在未来时为SCHEDULED（由定时任务释放），否则直接进入PENDING
+
+        Raises:
+            ValueError: send_at超过SCHEDULED_SEND_MAX_DAYS时
+        """
+        from app.config import settings
+
+        if send_at is None:
+            return TaskStatus.PENDING
+
+        now = datetime.now(timezone.utc)
+        if send_at > now + timedelta(days=settings.scheduled_send_max_days):
+            raise ValueError(f"定时发送时间最多为{settings.scheduled_send_max_days}天后")
+        return TaskStatus.SCHEDULED if send_at > now else TaskStatus.PENDING
     
     async def get_task_by_id(self, task_id: str) -> Optional[SmsTask]:
         """根据任务ID获取任务"""
         query = select(SmsTask).where(SmsTask.task_id == task_id)
+        created_range = task_id_created_range([task_id])
+        if created_range:
+            # 按任务ID中的时间戳限定created_at，只访问对应分区
+            query = query.where(SmsTask.created_at.between(*created_range))
         result = await self.db.execute(query)
         return result.scalar_one_or_none()
     
-    async def get_pending_tasks_safely(self, app_id: str, limit: int = 10) -> List[SmsTask]:
+    async def get_pending_tasks_safely(self, app_id: str, limit: int = 10) -> List[Row]:
         """
         安全地获取待处理任务（并发控制）
-        优先获取新任务（retry_count=0），无新任务时获取重试任务
+        按优先级通道获取新任务（retry_count=0），无新任务时获取已到重试时间的重试任务。
+        未到send_at的定时任务处于SCHEDULED状态，不在领取范围内，到期后由ScheduleService释放为PENDING。
+        领取数量按APP最近的汇报延迟调整；APP登记了处理能力时，处理中的任务数不超过其上限。
+
+        选取、加锁、更新为PROCESSING和维护任务计数在一条 WITH ... UPDATE ... RETURNING 语句中完成，
+        一次往返即可领取任务，行锁只在这条语句执行期间持有。
 
         Args:
             app_id: APP标识
             limit: 获取数量限制
 
         Returns:
-            List[SmsTask]: 获取到的任务列表
+            List[Row]: 领取到的任务（task_id, phone_number, content）
         """
-        async with self.db.begin():
-            # 1. 优先获取新任务（retry_count=0）
-            new_task_query = select(SmsTask).where(
-                and_(
-                    SmsTask.status == TaskStatus.PENDING,
-                    SmsTask.retry_count == 0
+        profile = await app_registry.get(self.db, app_id)
+        query = self._build_claim_statement(
+            app_id,
+            app_registry.claim_limit(app_id, limit, registered=profile is not None),
+            max_in_flight=app_registry.in_flight_cap(profile) if profile else None
+        )
+        result = await self.db.execute(query)
+        # RETURNING不保证顺序，高优先级的任务排在前面，APP按顺序发送
+        tasks = sorted(result.all(), key=lambda task: task.priority)
+        await self.db.commit()
+
+        TASK_CLAIM_BATCH_SIZE.observe(len(tasks))
+        for task in tasks:
+            if task.old_retry_count == 0:
+                TASK_QUEUE_WAIT.observe(
+                    float(task.queue_seconds),
+                    priority=TaskPriority(task.priority).lane,
+                    source=self._queue_wait_source_label(task.source)
                 )
-            ).order_by(SmsTask.created_at).limit(limit).with_for_update(skip_locked=True)
+        return tasks
 
-            result = await self.db.execute(new_task_query)
-            tasks = list(result.scalars().all())
+    @staticmethod
+    def _queue_wait_source_label(source: Optional[str]) -> str:
+        """排队时间指标的source标签：只保留TASK_SOURCE_WEIGHTS中配置的来源，其余归为other，避免标签基数无限增长"""
+        from app.config import settings
 
-            # 2. 如果新任务不足，获取重试任务（考虑重试间隔）
-            if len(tasks) < limit:
-                from app.config import settings
+        source = source or ""
+        return source if source in settings.task_source_weights else "other"
 
-                # 计算重试延迟时间阈值
-                retry_delay_minutes = settings.retry_delay_minutes
-                retry_threshold = datetime.now() - timedelta(minutes=retry_delay_minutes)
+    def _build_claim_statement(self, app_id: str, limit: int, max_in_flight: Optional[int] = None):
+        """
+        构建领取任务语句
+
+        各优先级通道的新任务和重试任务分别在各自的CTE中加锁选取（FOR UPDATE不能用于UNION分支），
+        每个CTE的LIMIT为前面的CTE不足的部分，前面的通道足够时不会读取或锁定后面的任务。
+        通道的先后顺序见_lane_order，每个通道由各自的部分索引按创建时间读取；
+        TASK_SOURCE_SCHEDULING=fair时通道内在各来源之间按权重轮询，见_build_fair_lane_tasks。
+        重试任务按next_attempt_at（数据库时间）判断是否到期，按到期先后领取。
+        领取的任务由PENDING变为PROCESSING，计数增量在同一条语句中写入。
+        配置了TASK_QUEUE_LOOKBACK_DAYS时只领取该时间范围内创建的任务，只访问最近的分区。
+        指定max_in_flight时，领取数量不超过 max_in_flight - 该APP当前处理中的任务数
+        （在idx_sms_tasks_processing_app_active上计数，同一APP并发领取时可能短暂超出）。
+        """
+        from app.config import settings
 
-                remaining_limit = limit - len(tasks)
-                retry_task_query = select(SmsTask).where(
+        if max_in_flight is not None:
+            in_flight = select(func.count()).where(
+                and_(
+                    SmsTask.status == sql_constant(TaskStatus.PROCESSING),
+                    SmsTask.processing_app_id == app_id
+                )
+            ).scalar_subquery()
+            capacity = select(
+                func.greatest(func.least(limit, max_in_flight - in_flight), 0).label("claim_limit")
+            ).cte("app_capacity")
+            limit = select(capacity.c.claim_limit).scalar_subquery()
+
+        window = []
+        created_threshold = created_after(settings.task_queue_lookback_days)
+        if created_threshold is not None:
+            window.append(SmsTask.created_at >= created_threshold)
+
+        # 1. 按通道顺序选取新任务（retry_count=0），每个通道内按创建时间排序，fair模式下在来源之间轮询
+        fair = settings.task_source_scheduling == "fair"
+        lanes = []
+        taken = None  # 前面的CTE已选取的任务数
+        for priority in self._lane_order():
+            lane_limit = limit if taken is None else func.greatest(limit - taken, 0)
+            if fair:
+                lane_tasks = self._build_fair_lane_tasks(priority, lane_limit, window)
+            else:
+                lane_tasks = select(SmsTask.id, SmsTask.created_at).where(
                     and_(
-                        SmsTask.status == TaskStatus.PENDING,
-                        SmsTask.retry_count > 0,
-                        # 只获取已经等待足够时间的重试任务
-                        SmsTask.updated_at <= retry_threshold
+                        SmsTask.status == sql_constant(TaskStatus.PENDING),
+                        SmsTask.retry_count == sql_constant(0),
+                        SmsTask.priority == sql_constant(priority),
+                        *window
                     )
-                ).order_by(SmsTask.retry_count, SmsTask.created_at).limit(remaining_limit).with_for_update(skip_locked=True)
-
-                retry_result = await self.db.execute(retry_task_query)
-                tasks.extend(list(retry_result.scalars().all()))
-
-            # 3. 原子性更新状态
-            if tasks:
-                task_ids = [task.id for task in tasks]
-                update_query = update(SmsTask).where(
-                    SmsTask.id.in_(task_ids)
-                ).values(
-                    status=TaskStatus.PROCESSING,
-                    processing_app_id=app_id,
-                    updated_at=datetime.now()
-                )
-                await self.db.execute(update_query)
+                ).order_by(SmsTask.created_at).limit(lane_limit).with_for_update(
+                    skip_locked=True
+                ).cte(f"new_tasks_{priority.lane}")
+            lanes.append(lane_tasks)
+
+            lane_count = select(func.count()).select_from(lane_tasks).scalar_subquery()
+            taken = lane_count if taken is None else taken + lane_count
+
+        # 2. 已到重试时间的重试任务，按到期时间排序
+        remaining_limit = func.greatest(limit - taken, 0)
+        retry_tasks = select(SmsTask.id, SmsTask.created_at).where(
+            and_(
+                SmsTask.status == sql_constant(TaskStatus.PENDING),
+                SmsTask.retry_count > sql_constant(0),
+                SmsTask.next_attempt_at <= func.now(),
+                *window
+            )
+        ).order_by(SmsTask.next_attempt_at).limit(remaining_limit).with_for_update(skip_locked=True).cte("retry_tasks")
+
+        claimed = union_all(
+            *(select(lane_tasks.c.id, lane_tasks.c.created_at) for lane_tasks in lanes),
+            select(retry_tasks.c.id, retry_tasks.c.created_at)
+        ).cte("claimed")
+
+        # 3. 原子性更新状态并返回任务内容（按主键(id, created_at)关联，只访问任务所在分区）
+        claim = update(SmsTask).where(
+            and_(
+                SmsTask.id == claimed.c.id,
+                SmsTask.created_at == claimed.c.created_at,
+                *window
+            )
+        ).values(
+            status=TaskStatus.PROCESSING,
+            processing_app_id=app_id,
+            updated_at=func.now()
+        ).returning(
+            SmsTask.task_id,
+            SmsTask.phone_number,
+            SmsTask.content,
+            SmsTask.priority,
+            SmsTask.source,
+            # 定时任务的排队时间从send_at开始计算
+            func.extract("epoch", func.now() - func.coalesce(SmsTask.send_at, SmsTask.created_at)).label("queue_seconds"),
+            literal_column(str(int(TaskStatus.PENDING)), Integer).label("old_status"),
+            SmsTask.retry_count.label("old_retry_count"),
+            SmsTask.status.label("new_status"),
+            SmsTask.retry_count.label("new_retry_count")
+        )
+        return self.counter_service.track_transitions(claim, name="claimed_tasks")
 
-        return tasks
+    @staticmethod
+    def _build_fair_lane_tasks(priority: TaskPriority, lane_limit, window: list):
+        """
+        构建fair模式下一个优先级通道的新任务CTE（按来源加权轮询）
+
+        1. 在idx_sms_tasks_pending_new_source上跳跃扫描（递归CTE，每个来源一次索引探测）得到通道中有任务的来源；
+        2. 每个来源按权重分得 ceil(通道限额 × 权重 / 权重和) 个名额，在LATERAL子查询中按创建时间加锁选取；
+        3. 来源内第k个任务的虚拟时间为 (k - 1 + 相位) / 权重，按虚拟时间取通道限额个任务。
+
+        每次领取相当于加权轮询（DRR）的一轮，不需要在请求之间保存各来源的亏欠值；
+        相位为每个来源随机的指数分布值，每次只领取少量任务时各来源排在最前的概率也与权重成正比。
+        名额向上取整，多锁定的任务（最多每个来源一个）在领取事务提交时释放。
+        """
+        from app.config import settings
+
+        lane = priority.lane
+        source_key = func.coalesce(SmsTask.source, literal_column("''"))
+        lane_filter = [
+            SmsTask.status == sql_constant(TaskStatus.PENDING),
+            SmsTask.retry_count == sql_constant(0),
+            SmsTask.priority == sql_constant(priority),
+            *window
+        ]
+
+        # 1. 有待处理任务的来源（无来源的任务归为""）
+        sources = select(source_key.label("source")).where(*lane_filter).order_by(source_key).limit(1).cte(
+            f"sources_{lane}", recursive=True
+        )
+        next_source = select(source_key).where(
+            and_(*lane_filter, source_key > sources.c.source)
+        ).order_by(source_key).limit(1).scalar_subquery()
+        sources = sources.union_all(select(next_source).where(sources.c.source.isnot(None)))
+
+        weights = {key: max(float(weight), 0.001) for key, weight in settings.task_source_weights.items()}
+        weight = case(weights, value=sources.c.source, else_=1.0) if weights else literal_column("1.0")
+        source_weights = select(
+            sources.c.source,
+            weight.label("weight"),
+            (-func.ln(1 - func.random())).label("phase")
+        ).where(sources.c.source.isnot(None)).cte(f"source_weights_{lane}")
+
+        # 2. 各来源按名额加锁选取最早的任务
+        total_weight = select(func.sum(source_weights.c.weight)).scalar_subquery()
+        quota = cast(func.ceil(lane_limit * source_weights.c.weight / total_weight), Integer)
+        source_tasks = select(SmsTask.id, SmsTask.created_at).where(
+            and_(*lane_filter, source_key == source_weights.c.source)
+        ).order_by(SmsTask.created_at).limit(quota).with_for_update(skip_locked=True).lateral(f"source_tasks_{lane}")
+
+        rank = func.row_number().over(partition_by=source_weights.c.source, order_by=source_tasks.c.created_at)
+        candidates = select(
+            source_tasks.c.id,
+            source_tasks.c.created_at,
+            ((rank - 1 + source_weights.c.phase) / source_weights.c.weight).label("virtual_time")
+        ).select_from(source_weights.join(source_tasks, true())).cte(f"candidates_{lane}")
+
+        # 3. 按虚拟时间交错各来源的任务
+        return select(candidates.c.id, candidates.c.created_at).order_by(
+            candidates.c.virtual_time
+        ).limit(lane_limit).cte(f"new_tasks_{lane}")
+
+    @staticmethod
+    def _lane_order() -> List[TaskPriority]:
+        """
+        本次领取各优先级通道的先后顺序
+
+        strict模式固定按高、普通、低的顺序，高优先级通道有任务时总是先领取；
+        weighted模式按TASK_PRIORITY_WEIGHTS加权随机排列，每个通道排在第一位的概率与权重成正比，
+        高优先级通道积压时低优先级通道也能按比例被领取。
+        """
+        from app.config import settings
+
+        lanes = sorted(TaskPriority)
+        if settings.task_priority_mode != "weighted":
+            return lanes
+
+        order = []
+        while lanes:
+            weights = [max(settings.task_priority_weights.get(lane.lane, 1.0), 0.0) for lane in lanes]
+            if sum(weights) <= 0:
+                order.extend(lanes)
+                break
+            lane = random.choices(lanes, weights)[0]
+            order.append(lane)
+            lanes.remove(lane)
+        return order
     
     async def update_task_status(
         self,
         task_id: str,
         status: TaskStatus,
         result_message: Optional[str] = None,
-        should_retry: bool = False
+        should_retry: bool = False,
+        error_class: Optional[str] = None,
+        app_id: Optional[str] = None
     ) -> bool:
         """
         更新任务状态
@@ -159,90 +497,196 @@ class SmsService:
             status: 新状态
             result_message: 结果信息（成功或失败原因）
             should_retry: 是否应该重试（由APP判断）
+            error_class: 错误类别（失败时，用于选择重试延迟）
+            app_id: 汇报的APP标识，指定时只更新由该APP处理中的任务
 
         Returns:
-            bool: 是否更新成功
+            bool: 是否更新成功（要求重试但已超过最大重试次数时为False）
         """
-        # 如果是失败状态且APP判断需要重试
-        if status == TaskStatus.FAILED and should_retry:
-            return await self._mark_task_for_retry(task_id, result_message or "")
+        rows = await self.update_task_status_batch(
+            [(task_id, status, result_message, should_retry, error_class, app_id)]
+        )
+        await self.db.commit()
+
+        row = rows.get(task_id)
+        if row is None:
+            return False
 
-        update_data = {
-            "status": status,
-            "result": result_message,
-            "updated_at": datetime.now(),
-            "reported_at": datetime.now()
-        }
+        # APP要求重试但已超过最大重试次数（已标记为最终失败）
+        if status == TaskStatus.FAILED and should_retry:
+            return row.status == TaskStatus.PENDING
 
-        if status == TaskStatus.SUCCESS:
-            update_data["sent_at"] = datetime.now()
-        elif status == TaskStatus.FAILED:
-            # 最终失败，清除处理APP ID
-            update_data["processing_app_id"] = None
+        return True
 
-        query = update(SmsTask).where(
-            SmsTask.task_id == task_id
-        ).values(**update_data)
+    async def report_task(
+        self,
+        task_id: str,
+        app_id: str,
+        status: TaskStatus,
+        result_message: Optional[str] = None,
+        should_retry: bool = False,
+        error_class: Optional[str] = None
+    ) -> ReportOutcome:
+        """
+        处理APP的单条汇报并提交
 
-        result = await self.db.execute(query)
+        Returns:
+            ReportOutcome: 处理结果（任务不在该APP处理中时为STALE，不存在时为NOT_FOUND）
+        """
+        rows = await self.update_task_status_batch(
+            [(task_id, status, result_message, should_retry, error_class, app_id)]
+        )
         await self.db.commit()
 
-        return result.rowcount > 0
+        row = rows.get(task_id)
+        if row is not None:
+            return self.report_outcome(row)
+        existing = await self.get_existing_task_ids([task_id])
+        return ReportOutcome.STALE if task_id in existing else ReportOutcome.NOT_FOUND
+
+    @staticmethod
+    def report_outcome(row: Any) -> ReportOutcome:
+        """已应用的汇报按更新后的状态给出处理结果"""
+        if row.status == TaskStatus.SUCCESS:
+            return ReportOutcome.SUCCESS
+        if row.status == TaskStatus.PENDING:
+            return ReportOutcome.RETRY
+        return ReportOutcome.FAILED
+
+    async def get_existing_task_ids(self, task_ids: List[str]) -> Set[str]:
+        """查询存在的任务ID（按任务ID中的时间戳只访问对应分区）"""
+        if not task_ids:
+            return set()
+        query = select(SmsTask.task_id).where(SmsTask.task_id.in_(task_ids))
+        created_range = task_id_created_range(task_ids)
+        if created_range:
+            query = query.where(SmsTask.created_at.between(*created_range))
+        result = await self.db.execute(query)
+        return set(result.scalars().all())
 
-    async def _mark_task_for_retry(self, task_id: str, result_message: str) -> bool:
+    async def update_task_status_batch(
+        self,
+        reports: List[Tuple[str, TaskStatus, Optional[str], bool, Optional[str], Optional[str]]]
+    ) -> Dict[str, Any]:
         """
-        标记任务为重试
+        批量更新任务状态（单条UPDATE ... FROM (VALUES ...)）
+
+        成功、最终失败、重试以及超过最大重试次数四种转换在同一条语句中通过CASE完成，
+        任务计数在同一条语句中按变更前后的状态维护。重试的任务按错误类别的基础延迟指数退避，
+        写入next_attempt_at，重置后立即可领取（重试延迟为0）时通知等待中的长轮询。领取到汇报的耗时计入APP的汇报延迟。
+        只更新处理中（PROCESSING）且由汇报APP领取的任务：尚未释放的定时任务、已取消或已完成的任务，
+        以及超时恢复后被其他APP领取的任务不受汇报影响，重复汇报不会再次增加重试次数。
+        只写入当前事务，不提交，由调用方与汇报日志一起提交。
 
         Args:
-            task_id: 任务ID
-            result_message: 失败原因
+            reports: (任务ID, 新状态, 结果信息, 是否重试, 错误类别, APP标识) 列表，任务ID不能重复；
+                APP标识为None时不校验领取的APP（内部调用）
 
         Returns:
-            bool: 是否成功标记为重试
+            Dict[str, Any]: 任务ID -> 更新后的行（status, retry_count），未更新的任务不在其中
         """
         from app.config import settings
 
-        # 获取当前任务
-        query = select(SmsTask).where(SmsTask.task_id == task_id)
-        result = await self.db.execute(query)
-        task = result.scalar_one_or_none()
-
-        if not task:
-            return False
-
-        # 检查是否超过最大重试次数
-        if task.retry_count >= settings.max_retry_count:
-            # 超过最大重试次数，标记为最终失败
-            update_query = update(SmsTask).where(
-                SmsTask.task_id == task_id
-            ).values(
-                status=TaskStatus.FAILED,
-                result=f"超过最大重试次数({settings.max_retry_count})：{result_message}",
-                processing_app_id=None,
-                updated_at=datetime.now(),
-                reported_at=datetime.now()
+        if not reports:
+            return {}
+
+        max_retry_count = settings.max_retry_count
+        now = func.now()
+
+        report_values = values(
+            column("task_id", String),
+            column("status", Integer),
+            column("result", String),
+            column("should_retry", Boolean),
+            column("error_class", String),
+            column("retry_delay", Float),
+            column("app_id", String),
+            name="reports"
+        ).data([
+            (task_id, int(status), result_message, should_retry, error_class, base_delay_seconds(error_class), app_id)
+            for task_id, status, result_message, should_retry, error_class, app_id in reports
+        ])
+
+        # 按id顺序锁定待更新的任务，并带出变更前的状态用于计算计数增量；
+        # 任务ID中的时间戳用于限定created_at，只访问这些任务所在的分区
+        created_range = task_id_created_range([report[0] for report in reports])
+        window = [SmsTask.created_at.between(*created_range)] if created_range else []
+        old_tasks = select(
+            SmsTask.id,
+            SmsTask.created_at,
+            SmsTask.status,
+            SmsTask.retry_count,
+            SmsTask.processing_app_id,
+            SmsTask.updated_at,
+            report_values.c.status.label("report_status"),
+            report_values.c.result.label("report_result"),
+            report_values.c.should_retry,
+            report_values.c.error_class.label("report_error_class"),
+            report_values.c.retry_delay
+        ).where(
+            and_(
+                SmsTask.task_id == report_values.c.task_id,
+                SmsTask.status == sql_constant(TaskStatus.PROCESSING),
+                or_(report_values.c.app_id.is_(None), SmsTask.processing_app_id == report_values.c.app_id),
+                *window
+            )
+        ).order_by(SmsTask.id).with_for_update(of=SmsTask).cte("old_tasks")
+
+        wants_retry = and_(old_tasks.c.report_status == TaskStatus.FAILED, old_tasks.c.should_retry)
+        retry = and_(wants_retry, SmsTask.retry_count < max_retry_count)
+        exhausted = and_(wants_retry, SmsTask.retry_count >= max_retry_count)
+        succeeded = old_tasks.c.report_status == TaskStatus.SUCCESS
+
+        report = update(SmsTask).where(
+            and_(
+                SmsTask.id == old_tasks.c.id,
+                SmsTask.created_at == old_tasks.c.created_at,
+                *window
             )
-            await self.db.execute(update_query)
-            await self.db.commit()
-            return False
-
-        # 增加重试次数并重置状态为PENDING
-        update_query = update(SmsTask).where(
-            SmsTask.task_id == task_id
         ).values(
-            status=TaskStatus.PENDING,
-            retry_count=task.retry_count + 1,
-            result=result_message,
-            processing_app_id=None,  # 清除处理APP ID
-            updated_at=datetime.now(),
-            reported_at=datetime.now()
+            status=case((retry, TaskStatus.PENDING), else_=old_tasks.c.report_status),
+            retry_count=case((retry, SmsTask.retry_count + 1), else_=SmsTask.retry_count),
+            result=case(
+                (exhausted, func.concat(f"超过最大重试次数({max_retry_count})：", old_tasks.c.report_result)),
+                else_=old_tasks.c.report_result
+            ),
+            # 成功时保留处理APP ID，失败或重试时清除
+            processing_app_id=case((succeeded, SmsTask.processing_app_id), else_=None),
+            sent_at=case((succeeded, now), else_=SmsTask.sent_at),
+            next_attempt_at=case(
+                (retry, next_attempt_at(SmsTask.retry_count + 1, old_tasks.c.retry_delay)),
+                else_=None
+            ),
+            error_class=case((succeeded, None), else_=old_tasks.c.report_error_class),
+            updated_at=now,
+            reported_at=now
+        ).returning(
+            SmsTask.task_id,
+            SmsTask.status,
+            SmsTask.retry_count,
+            old_tasks.c.status.label("old_status"),
+            old_tasks.c.retry_count.label("old_retry_count"),
+            SmsTask.priority,
+            SmsTask.status.label("new_status"),
+            SmsTask.retry_count.label("new_retry_count"),
+            old_tasks.c.processing_app_id.label("claimed_app_id"),
+            # 处理中任务的updated_at为领取时间
+            func.extract("epoch", now - old_tasks.c.updated_at).label("report_seconds"),
+            (SmsTask.next_attempt_at <= now).label("retry_due")
         )
 
-        await self.db.execute(update_query)
-        await self.db.commit()
+        query = self.counter_service.track_transitions(report, name="reported_tasks")
+        result = await self.db.execute(query)
+        rows = {row.task_id: row for row in result}
+
+        for row in rows.values():
+            if row.claimed_app_id:
+                app_registry.observe_report_latency(row.claimed_app_id, float(row.report_seconds))
+        # 延迟重试的任务到期前不可领取，不唤醒长轮询
+        if any(row.status == TaskStatus.PENDING and row.retry_due for row in rows.values()):
+            await self._notify_new_tasks()
+        return rows
 
-        return True
-    
     async def _get_default_content(self, phone_number: str) -> Optional[DefaultSmsData]:
         """获取默认内容"""
         query = select(DefaultSmsData).where(
@@ -261,6 +705,46 @@ class SmsService:
         )
         await self.db.execute(query)
     
+    async def _notify_new_tasks(self) -> None:
+        """发送新任务通知（事务提交时才会送达，同一事务内的多次通知会被合并）"""
+        await self.db.execute(select(func.pg_notify(TASK_CREATED_CHANNEL, "")))
+
+    async def _claim_default_contents(self, phone_numbers: Set[str]) -> Dict[str, Any]:
+        """批量领取未发送的默认内容（同时标记为已发送）"""
+        query = update(DefaultSmsData).where(
+            and_(
+                DefaultSmsData.phone_number.in_(phone_numbers),
+                DefaultSmsData.is_sent == False
+            )
+        ).values(
+            is_sent=True,
+            updated_at=datetime.now()
+        ).returning(
+            DefaultSmsData.phone_number,
+            DefaultSmsData.content,
+            DefaultSmsData.use_template
+        )
+        result = await self.db.execute(query)
+        return {row.phone_number: row for row in result}
+
+    async def _release_default_contents(self, phone_numbers: Set[str]) -> None:
+        """归还本事务中领取但未使用的默认内容（标记为未发送）"""
+        query = update(DefaultSmsData).where(
+            DefaultSmsData.phone_number.in_(phone_numbers)
+        ).values(
+            is_sent=False,
+            updated_at=datetime.now()
+        )
+        await self.db.execute(query)
+
+    async def _get_existing_default_phones(self, phone_numbers: Set[str]) -> Set[str]:
+        """查询已存在默认内容记录的手机号"""
+        query = select(DefaultSmsData.phone_number).where(
+            DefaultSmsData.phone_number.in_(phone_numbers)
+        )
+        result = await self.db.execute(query)
+        return set(result.scalars().all())
+
     async def create_default_sms(
         self,
         phone_number: str,
@@ -282,29 +766,22 @@ class SmsService:
 
     async def get_task_statistics(self) -> TaskStatisticsResponse:
         """
-        获取任务统计信息（使用高效的GROUP BY查询）
+        获取任务统计信息（读取增量维护的任务计数，与任务总量无关）
 
         Returns:
             TaskStatisticsResponse: 统计信息模型
         """
-
-
-        # 使用单个查询获取所有统计信息
-        query = select(
-            func.count(case((and_(SmsTask.status == TaskStatus.PENDING, SmsTask.retry_count == 0), 1))).label('pending_new'),
-            func.count(case((and_(SmsTask.status == TaskStatus.PENDING, SmsTask.retry_count > 0), 1))).label('pending_retry'),
-            func.count(case((SmsTask.status == TaskStatus.PROCESSING, 1))).label('processing'),
-            func.count(case((SmsTask.status == TaskStatus.SUCCESS, 1))).label('success'),
-            func.count(case((SmsTask.status == TaskStatus.FAILED, 1))).label('failed')
-        )
-
-        result = await self.db.execute(query)
-        stats = result.first()
+        counts = await self.counter_service.get_counts()
 
         return TaskStatisticsResponse(
-            pending_new_tasks=stats.pending_new or 0,
-            pending_retry_tasks=stats.pending_retry or 0,
-            processing_tasks=stats.processing or 0,
-            success_tasks=stats.success or 0,
-            failed_tasks=stats.failed or 0
+            pending_new_tasks=counts[COUNTER_PENDING_NEW],
+            pending_retry_tasks=counts[COUNTER_PENDING_RETRY],
+            processing_tasks=counts[COUNTER_PROCESSING],
+            success_tasks=counts[COUNTER_SUCCESS],
+            failed_tasks=counts[COUNTER_FAILED],
+            scheduled_tasks=counts[COUNTER_SCHEDULED],
+            cancelled_tasks=counts[COUNTER_CANCELLED],
+            pending_tasks_by_priority={
+                priority.lane: counts[lane_counter_key(priority)] for priority in TaskPriority
+            }
         )
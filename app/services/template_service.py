@@ -1,8 +1,121 @@
-from typing import Optional
+import asyncio
+import time
+from typing import List, NamedTuple, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func
+from app.config import settings
 from app.models.sms_template import SmsTemplate
-from app.utils.helpers import parse_template_params, apply_template
+from app.services.notify_service import notify_service, TEMPLATE_CHANGED_CHANNEL
+from app.utils.helpers import parse_template_params
+from app.utils.template_engine import CompiledTemplate, compile_template
+
+
+class CachedTemplate(NamedTuple):
+    """缓存中的模板"""
+    id: int
+    template_name: str
+    template_content: str
+    compiled: CompiledTemplate
+
+
+class TemplateCache:
+    """进程内模板缓存（TTL过期 + 显式失效）"""
+
+    def __init__(self):
+        self.ttl_seconds = settings.template_cache_ttl_seconds
+        self._templates: Optional[List[CachedTemplate]] = None
+        self._loaded_at = 0.0
+        self._version = 0
+        self._lock = asyncio.Lock()
+
+        # 统计计数
+        self.hit_count = 0
+        self.miss_count = 0
+        self.invalidation_count = 0
+
+    async def get_active_templates(self, db: AsyncSession) -> List[CachedTemplate]:
+        """
+        获取全部可用模板（按ID排序）
+
+        Args:
+            db: 缓存未命中时用于加载的数据库会话
+
+        Returns:
+            List[CachedTemplate]: 可用模板列表
+        """
+        if self._is_fresh():
+            self.hit_count += 1
+            return self._templates
+
+        async with self._lock:
+            # 等锁期间其他请求可能已经加载完成
+            if self._is_fresh():
+                self.hit_count += 1
+                return self._templates
+
+            self.miss_count += 1
+            version = self._version
+            templates = await self._load(db)
+            # 加载期间发生失效时不写入缓存，下次重新加载
+            if version == self._version:
+                self._templates = templates
+                self._loaded_at = time.monotonic()
+            return templates
+
+    def invalidate(self) -> None:
+        """使缓存失效"""
+        self._version += 1
+        self._templates = None
+        self.invalidation_count += 1
+
+    def stats(self) -> dict:
+        """获取缓存统计信息"""
+        total = self.hit_count + self.miss_count
+        return {
+            "cached": self._is_fresh(),
+            "template_count": len(self._templates) if self._templates is not None else 0,
+            "ttl_seconds": self.ttl_seconds,
+            "hit_count": self.hit_count,
+            "miss_count": self.miss_count,
+            "invalidation_count": self.invalidation_count,
+            "hit_rate": round(self.hit_count / total, 4) if total else 0.0
+        }
+
+    def _is_fresh(self) -> bool:
+        """缓存是否有效"""
+        return (
+            self._templates is not None
+            and self.ttl_seconds > 0
+            and time.monotonic() - self._loaded_at < self.ttl_seconds
+        )
+
+    async def _load(self, db: AsyncSession) -> List[CachedTemplate]:
+        """从数据库加载全部可用模板"""
+        query = select(
+            SmsTemplate.id,
+            SmsTemplate.template_name,
+            SmsTemplate.template_content
+        ).where(
+            SmsTemplate.is_active == True
+        ).order_by(SmsTemplate.id)
+
+        result = await db.execute(query)
+        return [
+            CachedTemplate(
+                id=row.id,
+                template_name=row.template_name,
+                template_content=row.template_content,
+                compiled=compile_template(row.template_content)
+            )
+            for row in result
+        ]
+
+
+# 全局模板缓存实例
+template_cache = TemplateCache()
+
+# 其他进程修改模板时通过数据库通知使本进程缓存失效
+notify_service.add_handler(TEMPLATE_CHANGED_CHANNEL, lambda payload: template_cache.invalidate())
 
 
 class TemplateService:
@@ -11,19 +124,15 @@ class TemplateService:
     def __init__(self, db: AsyncSession):
         self.db = db
     
-    async def get_active_template(self) -> Optional[SmsTemplate]:
+    async def get_active_template(self) -> Optional[CachedTemplate]:
         """
-        获取第一个可用的模板
+        获取第一个可用的模板（从进程内缓存读取）
         
         Returns:
-            Optional[SmsTemplate]: 可用的模板，如果没有则返回None
+            Optional[CachedTemplate]: 可用的模板，如果没有则返回None
         """
-        query = select(SmsTemplate).where(
-            SmsTemplate.is_active == True
-        ).order_by(SmsTemplate.id).limit(1)
-        
-        result = await self.db.execute(query)
-        return result.scalar_one_or_none()
+        templates = await template_cache.get_active_templates(self.db)
+        return templates[0] if templates else None
     
     async def process_template_content(self, content: str) -> Optional[str]:
         """
@@ -34,18 +143,60 @@ class TemplateService:
             
         Returns:
             Optional[str]: 处理后的内容，如果没有可用模板则返回None
+
+        Raises:
+            ValueError: 缺少模板参数时（与批量提交的规则一致）
         """
         # 获取可用模板
         template = await self.get_active_template()
         if not template:
             return None
         
-        # 解析参数
+        # 解析参数，校验后渲染预编译模板
         params = parse_template_params(content)
-        
-        # 应用模板
-        final_content = apply_template(template.template_content, params)
-        return final_content
+        validation = template.compiled.validate(params)
+        if not validation.is_valid:
+            raise ValueError(f"缺少模板参数: {', '.join(validation.missing)}")
+        return template.compiled.render(params)
+
+    async def render_template_batch(
+        self,
+        contents: List[str]
+    ) -> List[Tuple[Optional[str], Optional[str], Optional[str]]]:
+        """
+        使用同一模板批量渲染多条内容
+
+        先逐条校验参数，缺少模板参数的内容返回错误；其余内容用render_many一次渲染。
+        提供了但模板中没有的参数不影响渲染，作为提示返回。
+
+        Args:
+            contents: URL编码的参数字符串列表
+
+        Returns:
+            List[Tuple[Optional[str], Optional[str], Optional[str]]]: 与输入顺序一致的 (渲染结果, 错误信息, 提示信息)，
+            没有可用模板时均为None
+        """
+        template = await self.get_active_template()
+        if not template:
+            return [(None, None, None)] * len(contents)
+
+        compiled = template.compiled
+        parsed = []
+        for content in contents:
+            params = parse_template_params(content)
+            parsed.append((params, compiled.validate(params)))
+
+        rendered = iter(compiled.render_many(
+            params for params, validation in parsed if validation.is_valid
+        ))
+        results: List[Tuple[Optional[str], Optional[str], Optional[str]]] = []
+        for params, validation in parsed:
+            warning = f"未使用的模板参数: {', '.join(validation.extra)}" if validation.extra else None
+            if validation.is_valid:
+                results.append((next(rendered), None, warning))
+            else:
+                results.append((None, f"缺少模板参数: {', '.join(validation.missing)}", warning))
+        return results
     
     async def create_template(self, template_name: str, template_content: str) -> SmsTemplate:
         """
@@ -65,7 +216,15 @@ class TemplateService:
         )
         
         self.db.add(template)
+        await self._notify_template_changed()
         await self.db.commit()
         await self.db.refresh(template)
+
+        # 本进程立即失效，其他进程通过数据库通知失效
+        template_cache.invalidate()
         
         return template
+
+    async def _notify_template_changed(self) -> None:
+        """发送模板变更通知（事务提交时送达所有进程）"""
+        await self.db.execute(select(func.pg_notify(TEMPLATE_CHANGED_CHANNEL, "")))
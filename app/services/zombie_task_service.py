@@ -1,11 +1,27 @@
-from typing import List
+import logging
+from typing import List, NamedTuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, and_
-from datetime import datetime, timedelta
+from sqlalchemy import select, update, and_, case, func, literal, literal_column, Integer
+from datetime import timedelta
 
 from app.models.sms_task import SmsTask
 from app.utils.enums import TaskStatus
 from app.config import settings
+from app.utils.helpers import sql_constant, created_after
+from app.services.counter_service import CounterService
+from app.services.notify_service import TASK_CREATED_CHANNEL
+from app.utils.metrics import ZOMBIE_TASKS_RECOVERED
+from app.utils.retry_backoff import ERROR_CLASS_PROCESSING_TIMEOUT, base_delay_seconds, next_attempt_at
+
+logger = logging.getLogger(__name__)
+
+
+class ZombieRecoveryResult(NamedTuple):
+    """僵尸任务恢复结果"""
+    recovered_count: int     # 恢复的任务总数
+    retried_count: int       # 重置为待重试的任务数
+    failed_count: int        # 标记为最终失败的任务数
+    chunk_counts: List[int]  # 每个批次处理的任务数
 
 
 class ZombieTaskService:
@@ -15,80 +31,111 @@ class ZombieTaskService:
         self.db = db
         self.processing_timeout_minutes = settings.processing_timeout_minutes
         self.max_retry_count = settings.max_retry_count
+        self.chunk_size = settings.zombie_recovery_chunk_size
+        self.counter_service = CounterService(db)
     
-    async def recover_zombie_tasks(self) -> int:
+    async def recover_zombie_tasks(self) -> ZombieRecoveryResult:
         """
         恢复僵尸任务（PROCESSING状态但超时未汇报的任务）
+
+        按批次执行 UPDATE ... RETURNING，每批最多chunk_size条并单独提交，
+        根据retry_count在同一条语句中选择重试或最终失败，行锁只在单个批次内持有。
+        超时按数据库时间判断（now() - PROCESSING_TIMEOUT_MINUTES），与updated_at、next_attempt_at使用同一时钟。
+        批次中有任务重置为待重试时通知等待中的长轮询。
         
         Returns:
-            int: 恢复的任务数量
+            ZombieRecoveryResult: 恢复结果（含每批处理数量）
         """
-        # 计算超时阈值
-        timeout_threshold = datetime.now() - timedelta(minutes=self.processing_timeout_minutes)
-        
-        # 查找僵尸任务
-        query = select(SmsTask).where(
-            and_(
-                SmsTask.status == TaskStatus.PROCESSING,
-                SmsTask.updated_at <= timeout_threshold
+        retried_count = 0
+        failed_count = 0
+        chunk_counts: List[int] = []
+
+        while True:
+            query = self._build_recovery_statement()
+            result = await self.db.execute(query)
+            statuses = result.scalars().all()
+            chunk_failed = sum(1 for status in statuses if status == TaskStatus.FAILED)
+            if len(statuses) > chunk_failed:
+                await self.db.execute(select(func.pg_notify(TASK_CREATED_CHANNEL, "")))
+            await self.db.commit()
+
+            if not statuses:
+                break
+
+            failed_count += chunk_failed
+            retried_count += len(statuses) - chunk_failed
+            chunk_counts.append(len(statuses))
+            logger.info(
+                f"僵尸任务恢复第 {len(chunk_counts)} 批: {len(statuses)} 个"
+                f"（重试 {len(statuses) - chunk_failed}，最终失败 {chunk_failed}）"
             )
+
+            if len(statuses) < self.chunk_size:
+                break
+
+        ZOMBIE_TASKS_RECOVERED.inc(retried_count, outcome="retried")
+        ZOMBIE_TASKS_RECOVERED.inc(failed_count, outcome="failed")
+
+        return ZombieRecoveryResult(
+            recovered_count=retried_count + failed_count,
+            retried_count=retried_count,
+            failed_count=failed_count,
+            chunk_counts=chunk_counts
         )
-        
-        result = await self.db.execute(query)
-        zombie_tasks = result.scalars().all()
-        
-        if not zombie_tasks:
-            return 0
-        
-        recovered_count = 0
-        
-        # 处理每个僵尸任务
-        for task in zombie_tasks:
-            if task.retry_count >= self.max_retry_count:
-                # 超过最大重试次数，标记为最终失败
-                await self._mark_final_failure(
-                    task.task_id, 
-                    f"处理超时，超过最大重试次数({self.max_retry_count})"
-                )
-            else:
-                # 重置为PENDING状态，增加重试次数
-                await self._reset_to_pending(task.task_id, "处理超时，自动重试")
-            
-            recovered_count += 1
-        
-        await self.db.commit()
-        return recovered_count
-    
-    async def _mark_final_failure(self, task_id: str, result_message: str) -> None:
-        """标记任务为最终失败"""
-        update_query = update(SmsTask).where(
-            SmsTask.task_id == task_id
+
+    def _build_recovery_statement(self):
+        """
+        构建单批僵尸任务恢复语句
+
+        updated_at早于 now() - PROCESSING_TIMEOUT_MINUTES 的PROCESSING任务为僵尸任务；
+        已恢复的任务不再是PROCESSING，每批使用各自事务的now()不会重复处理。
+
+        超过最大重试次数的任务标记为最终失败，其余重置为PENDING并增加重试次数，
+        按处理超时（processing_timeout）错误类别的退避延迟写入下次可重试时间，
+        任务计数在同一条语句中维护。与领取任务使用相同的created_at时间范围，只访问最近的分区。
+        """
+        window = []
+        created_threshold = created_after(settings.task_queue_lookback_days)
+        if created_threshold is not None:
+            window.append(SmsTask.created_at >= created_threshold)
+
+        timeout_threshold = func.now() - literal(timedelta(minutes=self.processing_timeout_minutes))
+        zombies = select(SmsTask.id, SmsTask.created_at, SmsTask.retry_count).where(
+            and_(
+                SmsTask.status == sql_constant(TaskStatus.PROCESSING),
+                SmsTask.updated_at <= timeout_threshold,
+                *window
+            )
+        ).order_by(SmsTask.updated_at).limit(self.chunk_size).with_for_update(skip_locked=True).cte("zombies")
+
+        now = func.now()
+        exhausted = SmsTask.retry_count >= self.max_retry_count
+        retry_delay = base_delay_seconds(ERROR_CLASS_PROCESSING_TIMEOUT)
+
+        recovery = update(SmsTask).where(
+            and_(
+                SmsTask.id == zombies.c.id,
+                SmsTask.created_at == zombies.c.created_at,
+                *window
+            )
         ).values(
-            status=TaskStatus.FAILED,
-            result=result_message,
+            status=case((exhausted, int(TaskStatus.FAILED)), else_=int(TaskStatus.PENDING)),
+            retry_count=case((exhausted, SmsTask.retry_count), else_=SmsTask.retry_count + 1),
+            result=case(
+                (exhausted, f"处理超时，超过最大重试次数({self.max_retry_count})"),
+                else_="处理超时，自动重试"
+            ),
             processing_app_id=None,
-            updated_at=datetime.now(),
-            reported_at=datetime.now()
+            next_attempt_at=case((exhausted, None), else_=next_attempt_at(SmsTask.retry_count + 1, retry_delay)),
+            error_class=ERROR_CLASS_PROCESSING_TIMEOUT,
+            updated_at=now,
+            reported_at=case((exhausted, now), else_=SmsTask.reported_at)
+        ).returning(
+            SmsTask.status,
+            literal_column(str(int(TaskStatus.PROCESSING)), Integer).label("old_status"),
+            zombies.c.retry_count.label("old_retry_count"),
+            SmsTask.priority,
+            SmsTask.status.label("new_status"),
+            SmsTask.retry_count.label("new_retry_count")
         )
-        
-        await self.db.execute(update_query)
-    
-    async def _reset_to_pending(self, task_id: str, result_message: str) -> None:
-        """重置任务为待处理状态"""
-        # 先获取当前任务信息
-        query = select(SmsTask).where(SmsTask.task_id == task_id)
-        result = await self.db.execute(query)
-        task = result.scalar_one_or_none()
-        
-        if task:
-            update_query = update(SmsTask).where(
-                SmsTask.task_id == task_id
-            ).values(
-                status=TaskStatus.PENDING,
-                retry_count=task.retry_count + 1,
-                result=result_message,
-                processing_app_id=None,
-                updated_at=datetime.now()
-            )
-            
-            await self.db.execute(update_query)
+        return self.counter_service.track_transitions(recovery, name="recovered_tasks")
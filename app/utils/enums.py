@@ -1,4 +1,4 @@
-from enum import IntEnum
+from enum import Enum, IntEnum
 
 
 class TaskStatus(IntEnum):
@@ -7,6 +7,8 @@ class TaskStatus(IntEnum):
     PROCESSING = 1   # 处理中
     SUCCESS = 2      # 成功
     FAILED = 3       # 失败
+    SCHEDULED = 4    # 定时待释放（send_at未到，释放后变为PENDING）
+    CANCELLED = 5    # 已取消（定时任务释放前取消）
     
     @classmethod
     def get_description(cls, status: int) -> str:
@@ -15,6 +17,44 @@ class TaskStatus(IntEnum):
             cls.PENDING: "待处理",
             cls.PROCESSING: "处理中", 
             cls.SUCCESS: "成功",
-            cls.FAILED: "失败"
+            cls.FAILED: "失败",
+            cls.SCHEDULED: "定时待释放",
+            cls.CANCELLED: "已取消"
         }
         return descriptions.get(status, "未知状态")
+
+
+class TaskPriority(IntEnum):
+    """任务优先级通道（数值越小越优先）"""
+    HIGH = 0     # 高：验证码等实时短信
+    NORMAL = 1   # 普通：通知类短信
+    LOW = 2      # 低：营销等批量短信
+
+    @property
+    def lane(self) -> str:
+        """通道名称（high/normal/low），用于配置和统计"""
+        return self.name.lower()
+
+
+class ReportOutcome(str, Enum):
+    """批量汇报单条处理结果"""
+    SUCCESS = "success"        # 已标记为成功
+    RETRY = "retry"            # 已重置为待重试
+    FAILED = "failed"          # 已标记为最终失败
+    NOT_FOUND = "not_found"    # 任务不存在
+    STALE = "stale"            # 任务不在该APP处理中（已汇报、超时恢复、被其他APP领取，或是未释放的定时任务、已取消的任务）
+    INVALID = "invalid"        # 状态值无效
+    DUPLICATE = "duplicate"    # 同一批次中重复的任务ID（以最后一条为准）
+
+
+class ExportFormat(str, Enum):
+    """导出文件格式"""
+    CSV = "csv"        # 首行为列名
+    JSONL = "jsonl"    # 每行一个JSON对象
+
+
+class ExportLogType(str, Enum):
+    """可导出的日志类型"""
+    RECEIVE = "receive"  # 接收日志
+    SEND = "send"        # 发送日志
+    REPORT = "report"    # 汇报日志
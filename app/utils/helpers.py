@@ -1,7 +1,12 @@
 import uuid
 import urllib.parse
-from datetime import datetime
-from typing import Dict, Optional
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import Integer, func, literal
+from sqlalchemy.sql.elements import BindParameter, ColumnElement
+
+from app.utils.template_engine import compile_template
 
 
 def generate_task_id() -> str:
@@ -11,6 +16,43 @@ def generate_task_id() -> str:
     return f"task_{timestamp}_{unique_id}"
 
 
+def task_id_created_range(task_ids: Iterable[str]) -> Optional[Tuple[datetime, datetime]]:
+    """
+    根据任务ID中的时间戳推算任务创建时间范围
+
+    任务ID中的时间戳与created_at来自不同时钟和时区，前后各放宽一天，
+    用作created_at条件时可让查询只访问对应的表分区。
+
+    Returns:
+        Optional[Tuple[datetime, datetime]]: (起始时间, 结束时间)，存在无法解析的任务ID时为None
+    """
+    timestamps = []
+    for task_id in task_ids:
+        if not task_id.startswith("task_"):
+            return None
+        try:
+            timestamps.append(datetime.strptime(task_id[5:20], "%Y%m%d_%H%M%S"))
+        except ValueError:
+            return None
+
+    if not timestamps:
+        return None
+
+    return min(timestamps) - timedelta(days=1), max(timestamps) + timedelta(days=1)
+
+
+def created_after(days: int) -> Optional[ColumnElement]:
+    """
+    days天前的时间，用作created_at下限；days不大于0时返回None（不限制）
+
+    在数据库中用 now() - interval 计算，与带时区的created_at使用同一时钟，
+    不受应用进程时区影响。
+    """
+    if days <= 0:
+        return None
+    return func.now() - literal(timedelta(days=days))
+
+
 def generate_request_id() -> str:
     """生成请求ID"""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -18,6 +60,16 @@ def generate_request_id() -> str:
     return f"req_{timestamp}_{unique_id}"
 
 
+def sql_constant(value: int) -> BindParameter:
+    """
+    生成直接渲染到SQL语句中的整数常量
+
+    部分索引的条件（如 status = 0）只有在查询条件是常量时才能匹配，
+    普通绑定参数在预编译语句使用通用执行计划时会导致部分索引失效。
+    """
+    return literal(int(value), Integer, literal_execute=True)
+
+
 def parse_template_params(content: str) -> Dict[str, str]:
     """
     解析模板参数
@@ -49,8 +101,4 @@ def apply_template(template_content: str, params: Dict[str, str]) -> str:
     Returns:
         str: 替换后的内容
     """
-    final_content = template_content
-    for key, value in params.items():
-        placeholder = f"{{{key}}}"
-        final_content = final_content.replace(placeholder, str(value))
-    return final_content
+    return compile_template(template_content).render(params)
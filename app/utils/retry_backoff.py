@@ -0,0 +1,36 @@
+from datetime import timedelta
+from typing import Optional
+
+from sqlalchemy import func, literal
+
+from app.config import settings
+
+# 僵尸任务恢复（处理超时）使用的错误类别
+ERROR_CLASS_PROCESSING_TIMEOUT = "processing_timeout"
+
+
+def base_delay_seconds(error_class: Optional[str] = None) -> float:
+    """
+    第一次重试的基础延迟（秒）
+
+    按错误类别在RETRY_DELAY_MINUTES_BY_ERROR_CLASS中配置，未配置的类别使用RETRY_DELAY_MINUTES。
+    """
+    minutes = settings.retry_delay_minutes_by_error_class.get(error_class or "", settings.retry_delay_minutes)
+    return max(float(minutes), 0.0) * 60
+
+
+def next_attempt_at(retry_count, base_seconds):
+    """
+    下次可重试时间的SQL表达式：now() + 基础延迟 * 2^(retry_count-1)，不超过RETRY_BACKOFF_MAX_MINUTES，
+    再按RETRY_BACKOFF_JITTER上下随机浮动
+
+    retry_count为重试后的重试次数（从1开始），base_seconds可以是常量或列。
+    随机数在数据库中逐行生成，同一批失败的任务（如运营商故障恢复后）分散到不同时间重试。
+    """
+    max_seconds = settings.retry_backoff_max_minutes * 60
+    jitter = min(max(settings.retry_backoff_jitter, 0.0), 1.0)
+
+    delay = func.least(base_seconds * func.power(2, retry_count - 1), max_seconds)
+    if jitter:
+        delay = delay * (1 - jitter + 2 * jitter * func.random())
+    return func.now() + literal(timedelta(seconds=1)) * delay
@@ -0,0 +1,230 @@
+import logging
+import re
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+
+from app.config import settings
+
+slow_query_logger = logging.getLogger("app.sql.slow")
+
+# 最多统计的语句指纹数，超出后新指纹不再单独统计（避免指纹归一化遗漏导致内存增长）
+MAX_FINGERPRINTS = 1000
+
+# 指纹归一化规则：常量和绑定参数替换为?，IN列表和多行VALUES合并为一项
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_BIND_PARAMETER = re.compile(r"\$\d+(?:::[A-Za-z_ ]+(?:\[\])?)?")
+_NUMBER_LITERAL = re.compile(r"(?<![\w$.])-?\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_REPEATED_ROWS = re.compile(r"(\([^()]*\))(?:\s*,\s*\1)+")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(statement: str) -> str:
+    """
+    语句指纹：去掉常量和参数后的语句文本
+
+    同一条语句只有参数值或IN列表长度不同时指纹相同。结果按语句文本缓存，
+    重复执行的语句不会重复做正则替换。
+    """
+    text = _STRING_LITERAL.sub("?", statement)
+    text = _BIND_PARAMETER.sub("?", text)
+    text = _NUMBER_LITERAL.sub("?", text)
+    text = _WHITESPACE.sub(" ", text).strip()
+    text = _PLACEHOLDER_LIST.sub("(?, ...)", text)
+    return _REPEATED_ROWS.sub(r"\1, ...", text)
+
+
+def redact_parameters(parameters: Any) -> str:
+    """隐藏绑定参数的值，只保留参数个数和类型（慢查询日志不输出手机号、短信内容等数据）"""
+    if parameters is None:
+        return "[]"
+    if isinstance(parameters, list):
+        if parameters and isinstance(parameters[0], (tuple, list, dict)):
+            return f"<{len(parameters)}组参数: {redact_parameters(parameters[0])}>"
+    if isinstance(parameters, dict):
+        parameters = list(parameters.values())
+    return "[" + ", ".join(f"<{type(value).__name__}>" for value in parameters) + "]"
+
+
+class RequestQueryStats:
+    """单个请求执行的SQL统计"""
+
+    def __init__(self):
+        self.query_count = 0
+        self.total_seconds = 0.0
+
+
+class FingerprintStats:
+    """单个语句指纹的累计统计"""
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.calls = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.rows = 0
+        self.errors = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "fingerprint": self.fingerprint,
+            "calls": self.calls,
+            "total_time_ms": round(self.total_seconds * 1000, 3),
+            "avg_time_ms": round(self.total_seconds * 1000 / self.calls, 3) if self.calls else 0.0,
+            "max_time_ms": round(self.max_seconds * 1000, 3),
+            "rows": self.rows,
+            "errors": self.errors
+        }
+
+
+# 当前请求的SQL统计（请求之外执行的语句为None）
+_request_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("request_query_stats", default=None)
+
+
+class SqlStatsCollector:
+    """
+    SQL语句统计
+
+    通过引擎的before/after_cursor_execute事件记录每条语句的耗时和行数，
+    按指纹累计自启动以来的调用次数和总耗时，同时累加到当前请求的统计中；
+    耗时超过SLOW_QUERY_THRESHOLD_MS的语句写入慢查询日志（参数值已隐藏）。
+    开始时间记录在语句的执行上下文上，执行失败的语句由handle_error事件按指纹计入失败次数。
+    """
+
+    def __init__(self):
+        self.slow_query_threshold = settings.slow_query_threshold_ms / 1000
+        self.started_at = time.time()
+        self.slow_query_count = 0
+        self.untracked_count = 0
+        self.failed_count = 0
+        self._fingerprints: Dict[str, FingerprintStats] = {}
+
+    def install(self, engine) -> None:
+        """在引擎上注册语句执行事件（异步引擎注册到其sync_engine）"""
+        sync_engine = getattr(engine, "sync_engine", engine)
+        event.listen(sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(sync_engine, "handle_error", self._handle_error)
+
+    def begin_request(self) -> RequestQueryStats:
+        """开始统计当前请求的SQL"""
+        stats = RequestQueryStats()
+        _request_stats.set(stats)
+        return stats
+
+    def top(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """按总耗时排序的前limit个语句指纹"""
+        ranked = sorted(self._fingerprints.values(), key=lambda s: s.total_seconds, reverse=True)
+        return [stats.to_dict() for stats in ranked[:limit]]
+
+    def reset(self) -> None:
+        """清空累计统计"""
+        self.started_at = time.time()
+        self.slow_query_count = 0
+        self.untracked_count = 0
+        self.failed_count = 0
+        self._fingerprints.clear()
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context.sql_stats_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "sql_stats_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+
+        # 查询语句的rowcount为-1，asyncpg适配游标在执行时已取回全部结果（服务端游标除外）
+        rows = cursor.rowcount
+        if rows < 0:
+            rows = len(getattr(cursor, "_rows", None) or ())
+
+        self._record(fingerprint(statement), elapsed, rows)
+
+        request_stats = _request_stats.get()
+        if request_stats is not None:
+            request_stats.query_count += 1
+            request_stats.total_seconds += elapsed
+
+        if self.slow_query_threshold > 0 and elapsed >= self.slow_query_threshold:
+            self.slow_query_count += 1
+            slow_query_logger.warning(
+                f"慢查询 {elapsed * 1000:.1f}ms 行数={rows} 语句: {_WHITESPACE.sub(' ', statement).strip()} "
+                f"参数: {redact_parameters(parameters)}"
+            )
+
+    def _handle_error(self, exception_context):
+        """执行失败的语句：计入失败次数，耗时计入当前请求"""
+        context = exception_context.execution_context
+        started = getattr(context, "sql_stats_started", None)
+        if started is None or exception_context.statement is None:
+            return
+
+        self.failed_count += 1
+        stats = self._get_stats(fingerprint(exception_context.statement))
+        if stats is not None:
+            stats.errors += 1
+
+        request_stats = _request_stats.get()
+        if request_stats is not None:
+            request_stats.query_count += 1
+            request_stats.total_seconds += time.perf_counter() - started
+
+    def _get_stats(self, key: str) -> Optional[FingerprintStats]:
+        """获取指纹的统计，超出指纹数量上限时为None"""
+        stats = self._fingerprints.get(key)
+        if stats is None:
+            if len(self._fingerprints) >= MAX_FINGERPRINTS:
+                self.untracked_count += 1
+                return None
+            stats = self._fingerprints[key] = FingerprintStats(key)
+        return stats
+
+    def _record(self, key: str, elapsed: float, rows: int) -> None:
+        stats = self._get_stats(key)
+        if stats is None:
+            return
+        stats.calls += 1
+        stats.total_seconds += elapsed
+        stats.max_seconds = max(stats.max_seconds, elapsed)
+        stats.rows += rows
+
+
+class QueryStatsMiddleware:
+    """
+    请求级SQL统计的ASGI中间件
+
+    在响应头中返回本次请求执行的语句数（X-DB-Query-Count）和数据库耗时（X-DB-Time-Ms），
+    统计截止到响应头发送时；流式响应在发送响应头之后执行的查询不计入。
+    """
+
+    def __init__(self, app, collector: SqlStatsCollector):
+        self.app = app
+        self.collector = collector
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = self.collector.begin_request()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-query-count", str(stats.query_count).encode()))
+                headers.append((b"x-db-time-ms", f"{stats.total_seconds * 1000:.1f}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+# 全局SQL统计实例
+sql_stats = SqlStatsCollector()
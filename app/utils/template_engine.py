@@ -0,0 +1,96 @@
+import re
+from functools import lru_cache
+from typing import Iterable, List, Mapping, NamedTuple
+
+# 模板占位符：{param}
+_PLACEHOLDER_PATTERN = re.compile(r"\{([^{}]+)\}")
+
+
+class TemplateValidation(NamedTuple):
+    """模板参数校验结果"""
+    missing: List[str]  # 模板需要但未提供的参数
+    extra: List[str]    # 提供了但模板中没有的参数
+
+    @property
+    def is_valid(self) -> bool:
+        """参数是否齐全"""
+        return not self.missing
+
+
+class CompiledTemplate:
+    """
+    预编译模板
+
+    模板内容只在编译时解析一次，拆分为固定文本和占位符交替的片段列表，
+    渲染时只需按片段拼接一次。未提供的占位符保留原样（与逐个替换的旧行为一致）。
+    """
+
+    __slots__ = ("content", "placeholders", "_literals", "_names")
+
+    def __init__(self, content: str):
+        parts = _PLACEHOLDER_PATTERN.split(content)
+        self.content = content
+        # split结果为 [文本, 参数名, 文本, 参数名, ..., 文本]
+        self._literals = parts[0::2]
+        self._names = parts[1::2]
+        # 按首次出现顺序去重
+        self.placeholders = list(dict.fromkeys(self._names))
+
+    def render(self, params: Mapping[str, str]) -> str:
+        """
+        渲染模板
+
+        Args:
+            params: 参数字典
+
+        Returns:
+            str: 渲染后的内容
+        """
+        literals = self._literals
+        segments = [literals[0]]
+        for name, literal in zip(self._names, literals[1:]):
+            value = params.get(name)
+            segments.append("{" + name + "}" if value is None else str(value))
+            segments.append(literal)
+        return "".join(segments)
+
+    def render_many(self, params_list: Iterable[Mapping[str, str]]) -> List[str]:
+        """
+        使用多组参数批量渲染同一模板
+
+        Args:
+            params_list: 参数字典列表
+
+        Returns:
+            List[str]: 与输入顺序一致的渲染结果
+        """
+        return [self.render(params) for params in params_list]
+
+    def validate(self, params: Mapping[str, str]) -> TemplateValidation:
+        """
+        校验参数是否与模板占位符匹配
+
+        Args:
+            params: 参数字典
+
+        Returns:
+            TemplateValidation: 缺少和多余的参数
+        """
+        placeholders = self.placeholders
+        missing = [name for name in placeholders if name not in params]
+        extra = [name for name in params if name not in placeholders]
+        return TemplateValidation(missing=missing, extra=extra)
+
+
+@lru_cache(maxsize=256)
+def compile_template(content: str) -> CompiledTemplate:
+    """
+    编译模板（相同内容只编译一次）
+
+    Args:
+        content: 模板内容，如 "您的验证码是{code}，用户{name}"
+
+    Returns:
+        CompiledTemplate: 预编译模板
+    """
+    return CompiledTemplate(content)
@@ -0,0 +1,26 @@
+-- LKSMS Service 任务队列索引
+-- 为领取任务、僵尸任务恢复和统计查询建立部分索引/组合索引，
+-- 使这些查询只扫描PENDING/PROCESSING的少量行，不再扫描被SUCCESS行占满的status索引。
+-- 使用CONCURRENTLY创建，不阻塞线上写入（不能放在事务中执行）。
+
+-- 1. 领取新任务：status = 0 AND retry_count = 0 ORDER BY created_at
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_sms_tasks_pending_new
+    ON sms_tasks(created_at)
+    WHERE status = 0 AND retry_count = 0;
+
+-- 2. 领取重试任务：status = 0 AND retry_count > 0 AND updated_at <= ? ORDER BY retry_count, created_at
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_sms_tasks_pending_retry
+    ON sms_tasks(retry_count, created_at, updated_at)
+    WHERE status = 0 AND retry_count > 0;
+
+-- 3. 僵尸任务恢复：status = 1 AND updated_at <= ?
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_sms_tasks_processing_updated
+    ON sms_tasks(updated_at)
+    WHERE status = 1;
+
+-- 4. 任务统计：按status和retry_count计数（支持仅索引扫描）
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_sms_tasks_status_retry
+    ON sms_tasks(status, retry_count);
+
+-- status单列索引已被idx_sms_tasks_status_retry覆盖
+DROP INDEX CONCURRENTLY IF EXISTS idx_sms_tasks_status;
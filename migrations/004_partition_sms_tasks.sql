@@ -0,0 +1,97 @@
+-- LKSMS Service 发送任务表按月分区
+-- 把sms_tasks转换为按created_at的RANGE分区表（按UTC自然月划分）。终态的历史任务留在旧月份分区，
+-- 领取任务和僵尸任务恢复只访问最近的分区，索引大小和VACUUM开销不随历史数据增长。
+-- 分区表的主键和唯一约束必须包含分区键，因此主键改为(id, created_at)，任务ID唯一约束改为(task_id, created_at)。
+-- 迁移会复制全部任务数据并持有表锁，请在停机窗口执行。之后的分区由服务定时提前创建。
+
+BEGIN;
+
+SET LOCAL TIME ZONE 'UTC';
+
+-- 1. 保留旧表数据和id序列
+ALTER TABLE sms_tasks RENAME TO sms_tasks_unpartitioned;
+ALTER SEQUENCE sms_tasks_id_seq OWNED BY NONE;
+
+-- 2. 创建分区表
+CREATE TABLE sms_tasks (
+    id INTEGER NOT NULL DEFAULT nextval('sms_tasks_id_seq'),
+    task_id VARCHAR(50) NOT NULL,
+    phone_number VARCHAR(20) NOT NULL,
+    content VARCHAR(200) NOT NULL,
+    status INTEGER DEFAULT 0,
+    source VARCHAR(50),
+    retry_count INTEGER DEFAULT 0,
+    processing_app_id VARCHAR(50),
+    result VARCHAR(500),
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    sent_at TIMESTAMP WITH TIME ZONE,
+    reported_at TIMESTAMP WITH TIME ZONE
+) PARTITION BY RANGE (created_at);
+
+COMMENT ON TABLE sms_tasks IS '发送任务表（按created_at按月分区）';
+COMMENT ON COLUMN sms_tasks.task_id IS '任务ID';
+COMMENT ON COLUMN sms_tasks.phone_number IS '手机号码';
+COMMENT ON COLUMN sms_tasks.content IS '发送内容';
+COMMENT ON COLUMN sms_tasks.status IS '任务状态: 0=PENDING, 1=PROCESSING, 2=SUCCESS, 3=FAILED';
+COMMENT ON COLUMN sms_tasks.source IS '来源标识';
+COMMENT ON COLUMN sms_tasks.retry_count IS '重试次数';
+COMMENT ON COLUMN sms_tasks.processing_app_id IS '处理中的APP ID';
+COMMENT ON COLUMN sms_tasks.result IS '最后一次发送汇报结果，失败时记录失败原因';
+COMMENT ON COLUMN sms_tasks.created_at IS '创建时间（分区键）';
+COMMENT ON COLUMN sms_tasks.sent_at IS '发送时间';
+COMMENT ON COLUMN sms_tasks.reported_at IS '汇报时间';
+
+-- 3. 按月创建覆盖已有数据和未来3个月的分区，以及兜底的DEFAULT分区
+DO $$
+DECLARE
+    month_start TIMESTAMPTZ;
+    last_month TIMESTAMPTZ := date_trunc('month', now()) + interval '3 months';
+BEGIN
+    SELECT date_trunc('month', coalesce(min(created_at), now())) INTO month_start FROM sms_tasks_unpartitioned;
+    WHILE month_start <= last_month LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF sms_tasks FOR VALUES FROM (%L) TO (%L)',
+            'sms_tasks_p' || to_char(month_start, 'YYYYMM'),
+            month_start,
+            month_start + interval '1 month'
+        );
+        month_start := month_start + interval '1 month';
+    END LOOP;
+END $$;
+
+CREATE TABLE sms_tasks_default PARTITION OF sms_tasks DEFAULT;
+
+-- 4. 复制数据（先复制再建索引）
+INSERT INTO sms_tasks (
+    id, task_id, phone_number, content, status, source, retry_count,
+    processing_app_id, result, created_at, updated_at, sent_at, reported_at
+)
+SELECT
+    id, task_id, phone_number, content, status, source, retry_count,
+    processing_app_id, result, coalesce(created_at, updated_at, now()), updated_at, sent_at, reported_at
+FROM sms_tasks_unpartitioned;
+
+DROP TABLE sms_tasks_unpartitioned;
+ALTER SEQUENCE sms_tasks_id_seq OWNED BY sms_tasks.id;
+
+-- 5. 约束和索引（在分区表上创建，自动应用到所有分区）
+ALTER TABLE sms_tasks ADD CONSTRAINT sms_tasks_pkey PRIMARY KEY (id, created_at);
+ALTER TABLE sms_tasks ADD CONSTRAINT sms_tasks_task_id_created_at_key UNIQUE (task_id, created_at);
+
+CREATE INDEX idx_sms_tasks_phone ON sms_tasks(phone_number);
+CREATE INDEX idx_sms_tasks_created_at ON sms_tasks(created_at);
+CREATE INDEX idx_sms_tasks_processing_app ON sms_tasks(processing_app_id);
+
+-- 队列索引（与 002_queue_indexes.sql 相同）
+CREATE INDEX idx_sms_tasks_pending_new ON sms_tasks(created_at)
+    WHERE status = 0 AND retry_count = 0;
+CREATE INDEX idx_sms_tasks_pending_retry ON sms_tasks(retry_count, created_at, updated_at)
+    WHERE status = 0 AND retry_count > 0;
+CREATE INDEX idx_sms_tasks_processing_updated ON sms_tasks(updated_at)
+    WHERE status = 1;
+CREATE INDEX idx_sms_tasks_status_retry ON sms_tasks(status, retry_count);
+
+COMMIT;
+
+ANALYZE sms_tasks;
@@ -0,0 +1,161 @@
+-- LKSMS Service 日志表按天分区
+-- 把receive_logs、send_logs、report_logs转换为按created_at的RANGE分区表（按UTC自然日划分），
+-- 超过保留期的日志由服务定时删除整个分区（LOG_RETENTION_DAYS），清理耗时与过期行数无关。
+-- 主键改为(id, created_at)，created_at改为NOT NULL。
+-- 只迁移保留期内的日志（默认30天，可通过 psql -v retention_days=N 指定），更早的日志随旧表删除。
+-- 迁移会复制日志数据并持有表锁，请在停机窗口执行。之后的分区由服务定时提前创建。
+
+\if :{?retention_days}
+\else
+\set retention_days 30
+\endif
+
+BEGIN;
+
+SET LOCAL TIME ZONE 'UTC';
+SET LOCAL lksms.log_retention_days = :'retention_days';
+
+-- 1. 保留旧表数据和id序列
+ALTER TABLE receive_logs RENAME TO receive_logs_unpartitioned;
+ALTER TABLE send_logs RENAME TO send_logs_unpartitioned;
+ALTER TABLE report_logs RENAME TO report_logs_unpartitioned;
+ALTER SEQUENCE receive_logs_id_seq OWNED BY NONE;
+ALTER SEQUENCE send_logs_id_seq OWNED BY NONE;
+ALTER SEQUENCE report_logs_id_seq OWNED BY NONE;
+
+-- 2. 创建分区表
+CREATE TABLE receive_logs (
+    id INTEGER NOT NULL DEFAULT nextval('receive_logs_id_seq'),
+    request_id VARCHAR(50),
+    phone_number VARCHAR(20),
+    content VARCHAR(200),
+    use_template BOOLEAN,
+    source_ip VARCHAR(45),
+    user_agent VARCHAR(500),
+    request_data JSONB,
+    response_data JSONB,
+    status_code INTEGER,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+) PARTITION BY RANGE (created_at);
+
+COMMENT ON TABLE receive_logs IS '接收日志表（按created_at按天分区）';
+COMMENT ON COLUMN receive_logs.request_id IS '请求ID';
+COMMENT ON COLUMN receive_logs.phone_number IS '手机号码';
+COMMENT ON COLUMN receive_logs.content IS '发送内容';
+COMMENT ON COLUMN receive_logs.use_template IS '是否使用模板';
+COMMENT ON COLUMN receive_logs.source_ip IS '来源IP';
+COMMENT ON COLUMN receive_logs.user_agent IS '用户代理';
+COMMENT ON COLUMN receive_logs.request_data IS '完整请求数据';
+COMMENT ON COLUMN receive_logs.response_data IS '响应数据';
+COMMENT ON COLUMN receive_logs.status_code IS '响应状态码';
+COMMENT ON COLUMN receive_logs.created_at IS '创建时间（分区键）';
+
+CREATE TABLE send_logs (
+    id INTEGER NOT NULL DEFAULT nextval('send_logs_id_seq'),
+    task_id VARCHAR(50),
+    app_id VARCHAR(50),
+    phone_number VARCHAR(20),
+    content VARCHAR(200),
+    request_data JSONB,
+    response_data JSONB,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+) PARTITION BY RANGE (created_at);
+
+COMMENT ON TABLE send_logs IS '发送日志表（按created_at按天分区）';
+COMMENT ON COLUMN send_logs.task_id IS '任务ID';
+COMMENT ON COLUMN send_logs.app_id IS 'APP标识';
+COMMENT ON COLUMN send_logs.phone_number IS '手机号码';
+COMMENT ON COLUMN send_logs.content IS '发送内容';
+COMMENT ON COLUMN send_logs.request_data IS '请求数据';
+COMMENT ON COLUMN send_logs.response_data IS '响应数据';
+COMMENT ON COLUMN send_logs.created_at IS '创建时间（分区键）';
+
+CREATE TABLE report_logs (
+    id INTEGER NOT NULL DEFAULT nextval('report_logs_id_seq'),
+    task_id VARCHAR(50),
+    app_id VARCHAR(50),
+    status INTEGER,
+    error_message VARCHAR(500),
+    request_data JSONB,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+) PARTITION BY RANGE (created_at);
+
+COMMENT ON TABLE report_logs IS '汇报日志表（按created_at按天分区）';
+COMMENT ON COLUMN report_logs.task_id IS '任务ID';
+COMMENT ON COLUMN report_logs.app_id IS 'APP标识';
+COMMENT ON COLUMN report_logs.status IS '发送状态: 2=SUCCESS, 3=FAILED';
+COMMENT ON COLUMN report_logs.error_message IS '错误信息';
+COMMENT ON COLUMN report_logs.request_data IS '汇报数据';
+COMMENT ON COLUMN report_logs.created_at IS '创建时间（分区键）';
+
+-- 3. 按天创建覆盖保留期和未来7天的分区，以及兜底的DEFAULT分区
+DO $$
+DECLARE
+    log_table TEXT;
+    day_start TIMESTAMPTZ;
+    last_day TIMESTAMPTZ := date_trunc('day', now()) + interval '7 days';
+BEGIN
+    FOREACH log_table IN ARRAY ARRAY['receive_logs', 'send_logs', 'report_logs'] LOOP
+        day_start := date_trunc('day', now()) - current_setting('lksms.log_retention_days')::int * interval '1 day';
+        WHILE day_start <= last_day LOOP
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                log_table || '_p' || to_char(day_start, 'YYYYMMDD'),
+                log_table,
+                day_start,
+                day_start + interval '1 day'
+            );
+            day_start := day_start + interval '1 day';
+        END LOOP;
+        EXECUTE format('CREATE TABLE %I PARTITION OF %I DEFAULT', log_table || '_default', log_table);
+    END LOOP;
+END $$;
+
+-- 4. 复制保留期内的日志（先复制再建索引）
+INSERT INTO receive_logs (
+    id, request_id, phone_number, content, use_template, source_ip, user_agent,
+    request_data, response_data, status_code, created_at
+)
+SELECT
+    id, request_id, phone_number, content, use_template, source_ip, user_agent,
+    request_data, response_data, status_code, created_at
+FROM receive_logs_unpartitioned
+WHERE created_at >= date_trunc('day', now()) - :'retention_days'::int * interval '1 day';
+
+INSERT INTO send_logs (
+    id, task_id, app_id, phone_number, content, request_data, response_data, created_at
+)
+SELECT
+    id, task_id, app_id, phone_number, content, request_data, response_data, created_at
+FROM send_logs_unpartitioned
+WHERE created_at >= date_trunc('day', now()) - :'retention_days'::int * interval '1 day';
+
+INSERT INTO report_logs (
+    id, task_id, app_id, status, error_message, request_data, created_at
+)
+SELECT
+    id, task_id, app_id, status, error_message, request_data, created_at
+FROM report_logs_unpartitioned
+WHERE created_at >= date_trunc('day', now()) - :'retention_days'::int * interval '1 day';
+
+DROP TABLE receive_logs_unpartitioned;
+DROP TABLE send_logs_unpartitioned;
+DROP TABLE report_logs_unpartitioned;
+ALTER SEQUENCE receive_logs_id_seq OWNED BY receive_logs.id;
+ALTER SEQUENCE send_logs_id_seq OWNED BY send_logs.id;
+ALTER SEQUENCE report_logs_id_seq OWNED BY report_logs.id;
+
+-- 5. 约束和索引（在分区表上创建，自动应用到所有分区）
+ALTER TABLE receive_logs ADD CONSTRAINT receive_logs_pkey PRIMARY KEY (id, created_at);
+ALTER TABLE send_logs ADD CONSTRAINT send_logs_pkey PRIMARY KEY (id, created_at);
+ALTER TABLE report_logs ADD CONSTRAINT report_logs_pkey PRIMARY KEY (id, created_at);
+
+CREATE INDEX idx_receive_logs_created_at ON receive_logs(created_at);
+CREATE INDEX idx_send_logs_task_id ON send_logs(task_id);
+CREATE INDEX idx_report_logs_task_id ON report_logs(task_id);
+
+COMMIT;
+
+ANALYZE receive_logs;
+ANALYZE send_logs;
+ANALYZE report_logs;
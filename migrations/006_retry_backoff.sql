@@ -0,0 +1,27 @@
+-- LKSMS Service 重试退避
+-- 新增next_attempt_at（下次可重试时间）和error_class（最后一次失败的错误类别）。
+-- 任务被要求重试或僵尸任务恢复时按指数退避（带随机浮动）写入next_attempt_at，
+-- 领取重试任务改为 next_attempt_at <= now() ORDER BY next_attempt_at，由新的部分索引按范围扫描。
+-- 分区表上的索引不能CONCURRENTLY创建，创建期间阻塞任务写入，请在低峰期执行。
+
+BEGIN;
+
+ALTER TABLE sms_tasks ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMP WITH TIME ZONE;
+ALTER TABLE sms_tasks ADD COLUMN IF NOT EXISTS error_class VARCHAR(50);
+
+COMMENT ON COLUMN sms_tasks.next_attempt_at IS '下次可重试时间（待重试任务）';
+COMMENT ON COLUMN sms_tasks.error_class IS '最后一次失败的错误类别';
+
+-- 已有的待重试任务沿用原来的规则：更新时间 + 重试间隔（默认5分钟）
+UPDATE sms_tasks
+SET next_attempt_at = updated_at + interval '5 minutes'
+WHERE status = 0 AND retry_count > 0 AND next_attempt_at IS NULL;
+
+-- 领取重试任务：status = 0 AND retry_count > 0 AND next_attempt_at <= now() ORDER BY next_attempt_at
+DROP INDEX IF EXISTS idx_sms_tasks_pending_retry;
+CREATE INDEX idx_sms_tasks_pending_retry ON sms_tasks(next_attempt_at)
+    WHERE status = 0 AND retry_count > 0;
+
+COMMIT;
+
+ANALYZE sms_tasks;
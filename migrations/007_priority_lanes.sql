@@ -0,0 +1,30 @@
+-- LKSMS Service 任务优先级通道
+-- 新增priority（0=高、1=普通、2=低），验证码等高优先级短信不再排在营销批量短信之后。
+-- 领取新任务按通道分别从各自的部分索引读取，替换原来不区分通道的idx_sms_tasks_pending_new。
+-- 已有任务均为普通通道（带默认值的新增列不重写表）。
+-- 分区表上的索引不能CONCURRENTLY创建，创建期间阻塞任务写入，请在低峰期执行。
+
+BEGIN;
+
+ALTER TABLE sms_tasks ADD COLUMN IF NOT EXISTS priority INTEGER NOT NULL DEFAULT 1;
+
+COMMENT ON COLUMN sms_tasks.priority IS '优先级通道: 0=高, 1=普通, 2=低';
+
+-- 领取新任务：status = 0 AND retry_count = 0 AND priority = ? ORDER BY created_at
+CREATE INDEX IF NOT EXISTS idx_sms_tasks_pending_new_high ON sms_tasks(created_at)
+    WHERE status = 0 AND retry_count = 0 AND priority = 0;
+CREATE INDEX IF NOT EXISTS idx_sms_tasks_pending_new_normal ON sms_tasks(created_at)
+    WHERE status = 0 AND retry_count = 0 AND priority = 1;
+CREATE INDEX IF NOT EXISTS idx_sms_tasks_pending_new_low ON sms_tasks(created_at)
+    WHERE status = 0 AND retry_count = 0 AND priority = 2;
+
+DROP INDEX IF EXISTS idx_sms_tasks_pending_new;
+
+-- 按通道的待处理任务计数（已有的待处理任务全部计入普通通道）
+INSERT INTO sms_task_counters (counter_key, shard, count)
+SELECT 'pending_normal', 0, count(*) FROM sms_tasks WHERE status = 0
+ON CONFLICT (counter_key, shard) DO UPDATE SET count = sms_task_counters.count + excluded.count, updated_at = now();
+
+COMMIT;
+
+ANALYZE sms_tasks;
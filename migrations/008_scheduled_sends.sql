@@ -0,0 +1,20 @@
+-- LKSMS Service 定时发送
+-- 新增send_at（定时发送时间）和两个状态：4=SCHEDULED（定时待释放）、5=CANCELLED（已取消）。
+-- 指定了未来send_at的任务以SCHEDULED写入，不在领取任务的索引中；
+-- 定时任务释放按send_at从新的部分索引读取到期任务，按速率上限分批改为PENDING。
+-- 分区表上的索引不能CONCURRENTLY创建，创建期间阻塞任务写入，请在低峰期执行。
+
+BEGIN;
+
+ALTER TABLE sms_tasks ADD COLUMN IF NOT EXISTS send_at TIMESTAMP WITH TIME ZONE;
+
+COMMENT ON COLUMN sms_tasks.send_at IS '定时发送时间（为空表示立即发送）';
+COMMENT ON COLUMN sms_tasks.status IS '任务状态: 0=PENDING, 1=PROCESSING, 2=SUCCESS, 3=FAILED, 4=SCHEDULED, 5=CANCELLED';
+
+-- 释放到期的定时任务：status = 4 AND send_at <= now() ORDER BY send_at
+CREATE INDEX IF NOT EXISTS idx_sms_tasks_scheduled ON sms_tasks(send_at)
+    WHERE status = 4;
+
+COMMIT;
+
+ANALYZE sms_tasks;
@@ -0,0 +1,15 @@
+-- LKSMS Service 来源公平调度
+-- TASK_SOURCE_SCHEDULING=fair时，领取新任务在同一优先级通道的各来源（source）之间按权重轮询，
+-- 单个来源大量积压时其他来源的任务不再排在它后面。
+-- 新索引用于：跳跃扫描通道中有待处理任务的来源，以及按来源读取最早的任务。
+-- 分区表上的索引不能CONCURRENTLY创建，创建期间阻塞任务写入，请在低峰期执行。
+
+BEGIN;
+
+-- 领取新任务（fair）：status = 0 AND retry_count = 0 AND priority = ? AND coalesce(source, '') = ? ORDER BY created_at
+CREATE INDEX IF NOT EXISTS idx_sms_tasks_pending_new_source ON sms_tasks(priority, coalesce(source, ''), created_at)
+    WHERE status = 0 AND retry_count = 0;
+
+COMMIT;
+
+ANALYZE sms_tasks;
@@ -0,0 +1,29 @@
+-- LKSMS Service APP处理能力登记
+-- APP登记最多同时持有的处理中任务数和发送速率，领取任务时按该APP当前处理中的任务数限制领取数量，
+-- 被限流的APP不会继续领取任务并长时间占住PROCESSING。
+-- 按APP统计处理中任务数使用新的部分索引idx_sms_tasks_processing_app_active；原有的全量索引idx_sms_tasks_processing_app
+-- 包含保留了APP ID的大量历史任务，继续保留供按APP导出任务使用。
+-- 分区表上的索引不能CONCURRENTLY创建，创建期间阻塞任务写入，请在低峰期执行。
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS sms_apps (
+    app_id VARCHAR(50) PRIMARY KEY,
+    max_in_flight INTEGER NOT NULL,
+    send_rate_per_second DOUBLE PRECISION,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMENT ON TABLE sms_apps IS '发送APP表';
+COMMENT ON COLUMN sms_apps.app_id IS 'APP标识';
+COMMENT ON COLUMN sms_apps.max_in_flight IS '最多同时持有的处理中任务数（已领取未汇报）';
+COMMENT ON COLUMN sms_apps.send_rate_per_second IS '每秒最多发送的短信数，为空表示不限制';
+
+-- 领取任务时统计APP的处理中任务数：status = 1 AND processing_app_id = ?
+CREATE INDEX IF NOT EXISTS idx_sms_tasks_processing_app_active ON sms_tasks(processing_app_id)
+    WHERE status = 1;
+
+COMMIT;
+
+ANALYZE sms_tasks;
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+任务归档查询/恢复工具
+
+用法:
+    python scripts/archive_tool.py lookup <任务ID> [--dir 归档目录]
+    python scripts/archive_tool.py restore <归档文件> [--task-id 任务ID ...] [--skip-logs]
+
+lookup  根据任务ID中的时间戳和归档清单定位归档文件，输出任务及其日志
+restore 把归档文件中的任务（可指定任务ID）和日志重新导入数据库，已存在的记录跳过
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import DateTime
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.sms_task import SmsTask
+from app.models.logs import SendLog, ReportLog
+from app.services.archive_service import ARCHIVE_MANIFEST, iter_archive_records, read_manifest
+from app.services.counter_service import CounterService, task_counter_keys
+from app.utils.helpers import task_id_created_range
+
+# 恢复时每批导入的任务数
+RESTORE_BATCH_SIZE = 1000
+
+
+def candidate_files(archive_dir: Path, task_id: str) -> List[Path]:
+    """可能包含该任务的归档文件：清单中时间范围匹配的文件，以及未登记到清单中的文件"""
+    manifest = read_manifest(archive_dir)
+    listed = {entry["file"] for entry in manifest}
+    created_range = task_id_created_range([task_id])
+
+    files = []
+    for entry in manifest:
+        if created_range:
+            created_from = datetime.fromisoformat(entry["created_from"]).replace(tzinfo=None)
+            created_to = datetime.fromisoformat(entry["created_to"]).replace(tzinfo=None)
+            if created_to < created_range[0] or created_from > created_range[1]:
+                continue
+        files.append(archive_dir / entry["file"])
+
+    # 归档中途失败的文件没有清单记录，需要全部检查
+    files.extend(
+        path for path in sorted(archive_dir.glob("*.jsonl.gz"))
+        if path.name not in listed
+    )
+    return files
+
+
+def lookup(archive_dir: Path, task_id: str) -> int:
+    """查找归档任务"""
+    if not (archive_dir / ARCHIVE_MANIFEST).exists() and not any(archive_dir.glob("*.jsonl.gz")):
+        print(f"❌ 归档目录中没有归档文件: {archive_dir}")
+        return 1
+
+    for path in candidate_files(archive_dir, task_id):
+        for record in iter_archive_records(path):
+            if record["task"]["task_id"] == task_id:
+                print(f"📦 归档文件: {path}")
+                print(json.dumps(record, ensure_ascii=False, indent=2))
+                return 0
+
+    print(f"❌ 未找到归档任务: {task_id}")
+    return 1
+
+
+def to_row(model, data: Dict[str, Any]) -> Dict[str, Any]:
+    """归档记录转为插入数据（ISO格式时间转回datetime）"""
+    row = {}
+    for column in model.__table__.columns:
+        value = data.get(column.key)
+        if value is not None and isinstance(column.type, DateTime):
+            value = datetime.fromisoformat(value)
+        row[column.key] = value
+    return row
+
+
+async def restore_batch(records: List[Dict[str, Any]], skip_logs: bool) -> int:
+    """导入一批归档记录，返回新导入的任务数"""
+    async with AsyncSessionLocal() as db:
+        query = pg_insert(SmsTask).values(
+            [to_row(SmsTask, record["task"]) for record in records]
+        ).on_conflict_do_nothing().returning(SmsTask.status, SmsTask.retry_count)
+        result = await db.execute(query)
+
+        # 重新导入的任务计入任务计数
+        deltas: Dict[str, int] = {}
+        restored = 0
+        for status, retry_count in result.all():
+            restored += 1
+            for key in task_counter_keys(status, retry_count):
+                deltas[key] = deltas.get(key, 0) + 1
+        await CounterService(db).add(deltas)
+
+        if not skip_logs:
+            for model, field in ((SendLog, "send_logs"), (ReportLog, "report_logs")):
+                rows = [to_row(model, log) for record in records for log in record[field]]
+                if rows:
+                    await db.execute(pg_insert(model).values(rows).on_conflict_do_nothing())
+
+        await db.commit()
+        return restored
+
+
+async def restore(path: Path, task_ids: List[str], skip_logs: bool) -> int:
+    """从归档文件恢复任务"""
+    if not path.exists():
+        print(f"❌ 归档文件不存在: {path}")
+        return 1
+
+    wanted = set(task_ids)
+    total = 0
+    batch: List[Dict[str, Any]] = []
+    for record in iter_archive_records(path):
+        if wanted and record["task"]["task_id"] not in wanted:
+            continue
+        batch.append(record)
+        if len(batch) >= RESTORE_BATCH_SIZE:
+            total += await restore_batch(batch, skip_logs)
+            batch = []
+    if batch:
+        total += await restore_batch(batch, skip_logs)
+
+    print(f"✅ 恢复了 {total} 个任务（已存在的任务已跳过）")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="任务归档查询/恢复工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    lookup_parser = subparsers.add_parser("lookup", help="查找归档任务")
+    lookup_parser.add_argument("task_id", help="任务ID")
+    lookup_parser.add_argument("--dir", default=settings.archive_dir, help="归档目录")
+
+    restore_parser = subparsers.add_parser("restore", help="从归档文件恢复任务")
+    restore_parser.add_argument("file", help="归档文件")
+    restore_parser.add_argument("--task-id", action="append", default=[], help="只恢复指定任务（可重复）")
+    restore_parser.add_argument("--skip-logs", action="store_true", help="不恢复发送、汇报日志")
+
+    args = parser.parse_args()
+    if args.command == "lookup":
+        return lookup(Path(args.dir), args.task_id)
+    return asyncio.run(restore(Path(args.file), args.task_id, args.skip_logs))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -46,9 +46,33 @@ def main():
     # 验证重试配置
     print(f"\n🔄 重试配置:")
     print(f"   最大重试次数: {settings.max_retry_count}")
-    print(f"   重试延迟: {settings.retry_delay_minutes}分钟")
+    print(f"   重试延迟: {settings.retry_delay_minutes}分钟（每次翻倍，上限{settings.retry_backoff_max_minutes}分钟，"
+          f"随机浮动±{settings.retry_backoff_jitter:.0%}）")
+    if settings.retry_delay_minutes_by_error_class:
+        print(f"   按错误类别的重试延迟: {settings.retry_delay_minutes_by_error_class}")
     print(f"   处理超时: {settings.processing_timeout_minutes}分钟")
-    
+    if settings.task_queue_lookback_days > 0:
+        print(f"   ⚠️  只处理{settings.task_queue_lookback_days}天内创建的任务，"
+              f"更早创建的未完成任务不再派发和恢复")
+
+    # 验证定时发送配置
+    print(f"\n⏰ 定时发送配置:")
+    print(f"   最多提前: {settings.scheduled_send_max_days}天")
+    print(f"   释放速率: 每{settings.scheduled_release_interval_seconds}秒释放，"
+          f"每秒最多{settings.scheduled_release_rate_per_second}个")
+    if 0 < settings.task_queue_lookback_days <= settings.scheduled_send_max_days:
+        print(f"   ⚠️  SCHEDULED_SEND_MAX_DAYS需小于TASK_QUEUE_LOOKBACK_DAYS({settings.task_queue_lookback_days})，"
+              f"否则释放后的任务不在领取范围内")
+
+    # 验证APP处理能力配置
+    print(f"\n📱 APP处理能力配置:")
+    print(f"   目标汇报耗时: {settings.app_target_report_seconds}秒"
+          f"（滑动平均系数{settings.app_report_latency_ewma_alpha}）")
+    print(f"   每次最多领取: {settings.app_claim_limit_max}个（已登记APP汇报耗时低于目标时）")
+    print(f"   登记信息缓存: {settings.app_cache_ttl_seconds}秒")
+    if not 0 < settings.app_report_latency_ewma_alpha <= 1:
+        print(f"   ⚠️  APP_REPORT_LATENCY_EWMA_ALPHA应在(0, 1]之间")
+
     # 检查环境变量文件
     print(f"\n📁 配置文件检查:")
     env_file = project_root / ".env"
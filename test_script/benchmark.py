@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+性能基准测试脚本
+对工具函数、响应序列化和领取/汇报/统计SQL做基准测试，结果保存为JSON，
+可与之前提交的结果对比，中位数耗时变慢超过阈值时以非0状态退出
+
+用法:
+    python test_script/benchmark.py run [--rows 10000,1000000,10000000] [--output 文件] [--baseline 文件]
+    python test_script/benchmark.py compare <基准结果> <当前结果> [--threshold 0.2]
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import engine
+from app.schemas.response import ApiResponse
+from app.schemas.sms import PendingTaskResponse, PendingTasksResponse
+from app.services.sms_service import SmsService
+from app.utils.enums import TaskStatus
+from app.utils.helpers import generate_task_id, parse_template_params, apply_template
+
+# 测试数据来源标识，用于清理
+BENCH_SOURCE = "benchmark"
+
+TEMPLATE = "您的验证码是{code}，用户{name}，请在{time}分钟内使用。"
+TEMPLATE_PARAMS = "code=123456&name=%E5%BC%A0%E4%B8%89&time=5"
+
+
+def summarize(samples_ns: List[float], iterations: int) -> Dict[str, Any]:
+    """单次操作耗时统计（微秒）"""
+    samples_us = sorted(sample / 1000 for sample in samples_ns)
+    return {
+        "median_us": round(statistics.median(samples_us), 3),
+        "mean_us": round(statistics.fmean(samples_us), 3),
+        "min_us": round(samples_us[0], 3),
+        "p95_us": round(samples_us[min(len(samples_us) - 1, int(len(samples_us) * 0.95))], 3),
+        "samples": len(samples_us),
+        "iterations": iterations
+    }
+
+
+def bench_function(func: Callable[[], Any], repeat: int = 7, min_seconds: float = 0.2) -> Dict[str, Any]:
+    """同步函数基准：先确定每轮循环次数（每轮不少于min_seconds），再取repeat轮的单次平均耗时"""
+    loops = 1
+    while True:
+        start = time.perf_counter_ns()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter_ns() - start
+        if elapsed >= min_seconds * 1e9:
+            break
+        loops *= 2
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for _ in range(loops):
+            func()
+        samples.append((time.perf_counter_ns() - start) / loops)
+    return summarize(samples, loops * repeat)
+
+
+class Benchmark:
+    """基准测试类"""
+
+    def __init__(self, row_counts: List[int], sql_iterations: int = 200, keep_data: bool = False):
+        self.row_counts = sorted(row_counts)
+        self.sql_iterations = sql_iterations
+        self.keep_data = keep_data
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    def run_micro(self):
+        """工具函数和序列化基准"""
+        print("\n⏱️  工具函数和序列化")
+        params = parse_template_params(TEMPLATE_PARAMS)
+        pending = PendingTasksResponse(
+            total_count=100,
+            app_id="bench_app",
+            tasks=[
+                PendingTaskResponse(task_id=generate_task_id(), phone_number="13900000000", content="您的验证码是123456")
+                for _ in range(100)
+            ]
+        )
+        response_model = ApiResponse[PendingTasksResponse]
+
+        cases = {
+            "helpers.generate_task_id": generate_task_id,
+            "helpers.parse_template_params": lambda: parse_template_params(TEMPLATE_PARAMS),
+            "helpers.apply_template": lambda: apply_template(TEMPLATE, params),
+            "schemas.pending_tasks_response_100": lambda: response_model(data=pending).model_dump_json(),
+        }
+        for name, func in cases.items():
+            self._record(name, bench_function(func))
+
+    async def seed(self, start: int, end: int):
+        """写入第start+1到第end条测试任务：97%成功、1%失败、1%新任务、0.5%重试任务、0.5%处理中"""
+        print(f"\n🌱 写入测试任务 {start + 1} - {end}...")
+        began = time.perf_counter()
+        async with engine.begin() as conn:
+            await conn.execute(text("""
+                INSERT INTO sms_tasks (
+                    task_id, phone_number, content, status, source,
+                    retry_count, processing_app_id, created_at, updated_at, next_attempt_at
+                )
+                SELECT
+                    'task_' || to_char(ts, 'YYYYMMDD_HH24MISS') || '_' || lpad(to_hex(g), 8, '0'),
+                    '139' || lpad((g % 100000000)::text, 8, '0'),
+                    '基准测试',
+                    CASE
+                        WHEN g % 1000 < 970 THEN 2
+                        WHEN g % 1000 < 980 THEN 3
+                        WHEN g % 1000 < 995 THEN 0
+                        ELSE 1
+                    END,
+                    :source,
+                    CASE WHEN g % 1000 >= 990 AND g % 1000 < 995 THEN 1 + g % 3 ELSE 0 END,
+                    CASE WHEN g % 1000 >= 995 THEN 'bench_app' END,
+                    ts,
+                    ts,
+                    CASE WHEN g % 1000 >= 990 AND g % 1000 < 995 THEN ts + interval '5 minutes' END
+                FROM (
+                    SELECT g, now() - g * interval '10 milliseconds' AS ts
+                    FROM generate_series(CAST(:start AS integer), CAST(:end AS integer)) AS g
+                ) AS s
+            """), {"source": BENCH_SOURCE, "start": start + 1, "end": end})
+
+        # VACUUM不能在事务中执行
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text("VACUUM ANALYZE sms_tasks"))
+        print(f"   耗时 {time.perf_counter() - began:.1f} 秒")
+
+    async def cleanup(self):
+        """清理测试数据"""
+        print(f"\n🧹 清理测试数据...")
+        async with engine.begin() as conn:
+            await conn.execute(text("DELETE FROM sms_tasks WHERE source = :source"), {"source": BENCH_SOURCE})
+
+    async def bench_sql(self, operation: Callable[[SmsService, int], Awaitable[Any]]) -> Dict[str, Any]:
+        """
+        服务方法基准
+
+        每次调用在独立事务中执行后回滚：会话以SAVEPOINT方式加入外层事务，
+        服务方法内部的commit只释放SAVEPOINT，测试数据和任务计数在每次调用后保持不变。
+        """
+        samples = []
+        async with engine.connect() as conn:
+            for i in range(self.sql_iterations):
+                transaction = await conn.begin()
+                db = AsyncSession(bind=conn, join_transaction_mode="create_savepoint", expire_on_commit=False)
+                try:
+                    start = time.perf_counter_ns()
+                    await operation(SmsService(db), i)
+                    samples.append(time.perf_counter_ns() - start)
+                finally:
+                    await db.close()
+                    await transaction.rollback()
+        return summarize(samples, self.sql_iterations)
+
+    async def run_sql(self, rows: int):
+        """领取、汇报、统计SQL基准"""
+        print(f"\n⏱️  SQL（{rows} 行）")
+        async with engine.connect() as conn:
+            result = await conn.execute(text(
+                "SELECT task_id FROM sms_tasks WHERE source = :source AND status = 1 ORDER BY id LIMIT :limit"
+            ), {"source": BENCH_SOURCE, "limit": self.sql_iterations})
+            processing_task_ids = list(result.scalars())
+
+        async def claim(sms_service: SmsService, i: int):
+            await sms_service.get_pending_tasks_safely("bench_app", 10)
+
+        async def report(sms_service: SmsService, i: int):
+            task_id = processing_task_ids[i % len(processing_task_ids)]
+            await sms_service.update_task_status(task_id, TaskStatus.SUCCESS, "发送成功")
+
+        async def task_statistics(sms_service: SmsService, i: int):
+            await sms_service.get_task_statistics()
+
+        cases = {"sql.get_pending_tasks_safely": claim, "sql.get_task_statistics": task_statistics}
+        if processing_task_ids:
+            cases["sql.update_task_status"] = report
+        for name, operation in cases.items():
+            self._record(f"{name}@{rows}", await self.bench_sql(operation))
+
+    async def run(self, skip_sql: bool = False) -> Dict[str, Any]:
+        """运行全部基准测试"""
+        print("🚀 开始基准测试")
+        print("="*60)
+
+        self.run_micro()
+        if not skip_sql:
+            await self.cleanup()
+            seeded = 0
+            try:
+                for rows in self.row_counts:
+                    await self.seed(seeded, rows)
+                    seeded = rows
+                    await self.run_sql(rows)
+            finally:
+                if not self.keep_data:
+                    await self.cleanup()
+
+        return {"meta": self.metadata(skip_sql), "results": self.results}
+
+    def metadata(self, skip_sql: bool) -> Dict[str, Any]:
+        """运行环境信息"""
+        try:
+            commit = subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], cwd=project_root,
+                capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            "commit": commit,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": None if skip_sql else f"{settings.postgres_host}:{settings.postgres_port}/{settings.postgres_db}",
+            "row_counts": [] if skip_sql else self.row_counts,
+            "sql_iterations": self.sql_iterations
+        }
+
+    def _record(self, name: str, result: Dict[str, Any]):
+        self.results[name] = result
+        print(f"   {name:<45} 中位数 {result['median_us']:>12.3f} us  P95 {result['p95_us']:>12.3f} us")
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> bool:
+    """
+    对比两次基准结果的中位数耗时
+
+    Returns:
+        bool: 没有变慢超过阈值的项目时为True
+    """
+    print("\n" + "="*60)
+    print(f"📊 对比 {baseline['meta'].get('commit')} -> {current['meta'].get('commit')}（阈值 {threshold:.0%}）")
+    print("="*60)
+
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<45} {result['median_us']:>12.3f} us   （新增）")
+            continue
+        change = result["median_us"] / base["median_us"] - 1 if base["median_us"] else 0.0
+        flag = "❌" if change > threshold else "✅"
+        if change > threshold:
+            regressions.append(name)
+        print(f"{name:<45} {base['median_us']:>12.3f} -> {result['median_us']:>12.3f} us  {change:>+8.1%} {flag}")
+
+    if regressions:
+        print(f"⚠️  {len(regressions)} 项变慢超过 {threshold:.0%}: {', '.join(regressions)}")
+        return False
+    print("🎉 没有性能回退！")
+    return True
+
+
+def load_result(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="性能基准测试")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="运行基准测试")
+    run_parser.add_argument("--rows", default="10000,1000000,10000000", help="SQL基准的任务表行数，逗号分隔")
+    run_parser.add_argument("--iterations", type=int, default=200, help="每项SQL基准的执行次数")
+    run_parser.add_argument("--output", help="结果文件（默认 benchmark_<提交>_<时间>.json）")
+    run_parser.add_argument("--baseline", help="运行后与该结果文件对比")
+    run_parser.add_argument("--threshold", type=float, default=0.2, help="中位数变慢超过该比例视为回退")
+    run_parser.add_argument("--skip-sql", action="store_true", help="只运行工具函数和序列化基准")
+    run_parser.add_argument("--keep", action="store_true", help="保留测试数据")
+
+    compare_parser = subparsers.add_parser("compare", help="对比两次基准结果")
+    compare_parser.add_argument("baseline", help="基准结果文件")
+    compare_parser.add_argument("current", help="当前结果文件")
+    compare_parser.add_argument("--threshold", type=float, default=0.2, help="中位数变慢超过该比例视为回退")
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        return 0 if compare(load_result(args.baseline), load_result(args.current), args.threshold) else 1
+
+    row_counts = [int(rows) for rows in args.rows.split(",") if rows.strip()]
+    benchmark = Benchmark(row_counts, args.iterations, args.keep)
+    result = asyncio.run(benchmark.run(args.skip_sql))
+
+    output = args.output or (
+        f"benchmark_{result['meta']['commit'] or 'local'}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 结果已保存: {output}")
+
+    if args.baseline:
+        return 0 if compare(load_result(args.baseline), result, args.threshold) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+领取任务并发压力测试脚本
+在本地PostgreSQL中按不同并发数模拟多个APP同时领取和汇报任务：
+- 检查同一任务在处理中（PROCESSING）时是否被重复派发
+- 采样pg_locks中等待中的锁、统计死锁次数
+- 统计每个并发级别的领取延迟和吞吐量
+
+用法:
+    python test_script/test_claim_concurrency.py [--levels 10,50,100] [--tasks 5000] [--batch-size 10] [--pool-size N]
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.database import engine, AsyncSessionLocal
+from app.loadtest import percentiles
+from app.services.counter_service import CounterService, task_counter_keys
+from app.services.sms_service import SmsService
+from app.utils.enums import TaskStatus, TaskPriority
+
+# 测试数据来源标识，用于清理
+TEST_SOURCE = "claim_concurrency_test"
+
+# pg_locks采样间隔（秒）
+LOCK_SAMPLE_INTERVAL = 0.05
+
+
+class ClaimConcurrencyTester:
+    """领取任务并发测试类"""
+
+    def __init__(self, args: argparse.Namespace):
+        self.levels = args.levels
+        self.tasks = args.tasks
+        self.batch_size = args.batch_size
+        self.retry_rate = args.retry_rate
+        self.pool_size = args.pool_size
+        self.keep_data = args.keep
+
+    async def check_queue_empty(self) -> bool:
+        """测试APP会领取队列中的全部待处理任务，存在其他来源的待处理任务时不运行"""
+        async with engine.connect() as conn:
+            result = await conn.execute(text(
+                "SELECT count(*) FROM sms_tasks WHERE status = :status AND source IS DISTINCT FROM :source"
+            ), {"status": int(TaskStatus.PENDING), "source": TEST_SOURCE})
+            count = result.scalar()
+        if count:
+            print(f"❌ 数据库中有 {count} 条其他来源的待处理任务，测试会领取并汇报这些任务，请使用测试数据库")
+            return False
+        return True
+
+    async def seed(self, level: int):
+        """写入待处理测试任务，同时累加任务计数"""
+        async with AsyncSessionLocal() as db:
+            await db.execute(text("""
+                INSERT INTO sms_tasks (task_id, phone_number, content, status, source, retry_count, created_at, updated_at)
+                SELECT
+                    'task_' || to_char(now(), 'YYYYMMDD_HH24MISS') || '_c' || :level || '_' || g,
+                    '139' || lpad(g::text, 8, '0'),
+                    '并发测试',
+                    :status,
+                    :source,
+                    0,
+                    now() - (:tasks - g) * interval '1 millisecond',
+                    now()
+                FROM generate_series(1, CAST(:tasks AS integer)) AS g
+            """), {
+                "level": str(level),
+                "status": int(TaskStatus.PENDING),
+                "source": TEST_SOURCE,
+                "tasks": self.tasks
+            })
+            await CounterService(db).add({
+                key: self.tasks for key in task_counter_keys(TaskStatus.PENDING, 0, TaskPriority.NORMAL)
+            })
+            await db.commit()
+
+    async def cleanup(self):
+        """清理测试数据，并从任务计数中减去测试任务"""
+        print(f"\n🧹 清理测试数据...")
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(text(
+                "DELETE FROM sms_tasks WHERE source = :source RETURNING status, retry_count, priority"
+            ), {"source": TEST_SOURCE})
+            deltas = Counter()
+            for status, retry_count, priority in result:
+                for key in task_counter_keys(status, retry_count, priority):
+                    deltas[key] -= 1
+            await CounterService(db).add(dict(deltas))
+            await db.commit()
+
+    async def available_connections(self) -> int:
+        """数据库还能建立的连接数（留出采样和检查用的连接）"""
+        async with engine.connect() as conn:
+            result = await conn.execute(text("""
+                SELECT current_setting('max_connections')::int
+                     - current_setting('superuser_reserved_connections')::int
+                     - (SELECT count(*) FROM pg_stat_activity)
+            """))
+            return result.scalar() - 2
+
+    async def read_deadlocks(self) -> int:
+        async with engine.connect() as conn:
+            result = await conn.execute(text(
+                "SELECT deadlocks FROM pg_stat_database WHERE datname = current_database()"
+            ))
+            return result.scalar() or 0
+
+    async def sample_locks(self, samples: List[int], stop: asyncio.Event):
+        """定时采样pg_locks中未授予（等待中）的锁数量"""
+        async with engine.connect() as conn:
+            while not stop.is_set():
+                result = await conn.execute(text("SELECT count(*) FROM pg_locks WHERE NOT granted"))
+                samples.append(result.scalar())
+                await conn.rollback()
+                try:
+                    await asyncio.wait_for(stop.wait(), LOCK_SAMPLE_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def run_level(self, level: int) -> Dict[str, Any]:
+        """按指定并发数运行，直到全部测试任务成功或最终失败"""
+        print("\n" + "="*60)
+        print(f"🔀 并发 {level} 个APP，{self.tasks} 条任务")
+        print("="*60)
+
+        # 默认每个模拟APP一个连接；指定--pool-size时模拟服务的连接池，APP之间共享连接
+        pool_size = min(self.pool_size or level, level)
+        available = await self.available_connections()
+        if pool_size > available:
+            print(f"   ⚠️  数据库只能再建立 {available} 个连接，连接池限制为 {available}（可调大max_connections）")
+            pool_size = available
+
+        await self.seed(level)
+        try:
+            return await self.run_claims(level, pool_size)
+        finally:
+            if not self.keep_data:
+                await self.cleanup()
+
+    async def run_claims(self, level: int, pool_size: int) -> Dict[str, Any]:
+        """level个APP循环领取和汇报，每次领取和汇报使用一个会话（与服务处理一次请求相同）"""
+        level_engine = create_async_engine(settings.database_url, pool_size=pool_size, max_overflow=0)
+        session_factory = async_sessionmaker(level_engine, class_=AsyncSession, expire_on_commit=False)
+        # 预先建立连接，领取延迟不包含新建连接的时间
+        connections = await asyncio.gather(*(level_engine.connect() for _ in range(pool_size)))
+        for conn in connections:
+            await conn.close()
+
+        in_flight: Dict[str, str] = {}       # 处理中的任务ID -> 领取的APP
+        double_dispatches: List[str] = []
+        claim_latency: List[float] = []
+        report_latency: List[float] = []
+        errors: Counter = Counter()
+        finished = 0
+        empty_claims = 0
+
+        async def simulate_app(app_id: str):
+            nonlocal finished, empty_claims
+            while finished < self.tasks:
+                try:
+                    start = time.perf_counter()
+                    async with session_factory() as db:
+                        tasks = await SmsService(db).get_pending_tasks_safely(app_id, self.batch_size)
+                    claim_latency.append(time.perf_counter() - start)
+                except DBAPIError as e:
+                    errors[f"claim: {type(e.orig).__name__}"] += 1
+                    continue
+
+                if not tasks:
+                    empty_claims += 1
+                    await asyncio.sleep(0.01)
+                    continue
+
+                reports = []
+                for task in tasks:
+                    owner = in_flight.get(task.task_id)
+                    if owner is not None:
+                        double_dispatches.append(f"{task.task_id}: {owner} -> {app_id}")
+                    in_flight[task.task_id] = app_id
+                    should_retry = random.random() < self.retry_rate
+                    status = TaskStatus.FAILED if should_retry else TaskStatus.SUCCESS
+                    reports.append((task.task_id, status, "并发测试", should_retry, None, app_id))
+
+                # 汇报提交后任务可能立即被重新领取（重试），汇报前先移出处理中集合
+                for task in tasks:
+                    in_flight.pop(task.task_id, None)
+                try:
+                    start = time.perf_counter()
+                    async with session_factory() as db:
+                        rows = await SmsService(db).update_task_status_batch(reports)
+                        await db.commit()
+                    report_latency.append(time.perf_counter() - start)
+                except DBAPIError as e:
+                    errors[f"report: {type(e.orig).__name__}"] += 1
+                    continue
+
+                finished += sum(1 for row in rows.values() if row.status != TaskStatus.PENDING)
+
+        deadlocks_before = await self.read_deadlocks()
+        lock_samples: List[int] = []
+        stop = asyncio.Event()
+        sampler = asyncio.create_task(self.sample_locks(lock_samples, stop))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(simulate_app(f"stress_app_{i}") for i in range(level)))
+        elapsed = time.perf_counter() - started
+
+        stop.set()
+        await sampler
+        # 断开连接后各后端进程才会把死锁统计写入pg_stat_database
+        await level_engine.dispose()
+        await asyncio.sleep(1)
+        deadlocks = await self.read_deadlocks() - deadlocks_before
+
+        async with engine.connect() as conn:
+            result = await conn.execute(text(
+                "SELECT count(*) FROM sms_tasks WHERE source = :source AND status IN (:pending, :processing)"
+            ), {"source": TEST_SOURCE, "pending": int(TaskStatus.PENDING), "processing": int(TaskStatus.PROCESSING)})
+            unfinished = result.scalar()
+
+        result = {
+            "concurrency": level,
+            "pool_size": pool_size,
+            "tasks": self.tasks,
+            "duration_seconds": round(elapsed, 2),
+            "tasks_per_second": round(self.tasks / elapsed, 1) if elapsed else None,
+            "claim_latency": percentiles(claim_latency),
+            "report_latency": percentiles(report_latency),
+            "empty_claims": empty_claims,
+            "lock_waits": {
+                "samples": len(lock_samples),
+                "max": max(lock_samples, default=0),
+                "avg": round(sum(lock_samples) / len(lock_samples), 2) if lock_samples else 0
+            },
+            "deadlocks": deadlocks,
+            "double_dispatches": double_dispatches,
+            "unfinished": unfinished,
+            "errors": dict(errors)
+        }
+        self.print_level(result)
+        return result
+
+    @staticmethod
+    def print_level(result: Dict[str, Any]):
+        claim = result["claim_latency"]
+        locks = result["lock_waits"]
+        print(f"   耗时 {result['duration_seconds']} 秒，{result['tasks_per_second']} 条/秒，空领取 {result['empty_claims']} 次")
+        if claim["count"]:
+            print(f"   领取延迟 p50={claim['p50_ms']}ms p95={claim['p95_ms']}ms "
+                  f"p99={claim['p99_ms']}ms max={claim['max_ms']}ms（{claim['count']} 次）")
+        print(f"   等待中的锁 最大 {locks['max']} 平均 {locks['avg']}（{locks['samples']} 次采样），死锁 {result['deadlocks']} 次")
+        if result["errors"]:
+            print(f"   ⚠️  错误: {result['errors']}")
+        if result["double_dispatches"]:
+            print(f"   ❌ 重复派发 {len(result['double_dispatches'])} 次: {result['double_dispatches'][:5]}")
+        if result["unfinished"]:
+            print(f"   ❌ 未完成任务 {result['unfinished']} 条")
+
+    async def run_test(self) -> bool:
+        """运行完整测试"""
+        print("🚀 开始领取任务并发测试")
+        print("="*60)
+
+        if not await self.check_queue_empty():
+            return False
+
+        results = []
+        try:
+            for level in self.levels:
+                results.append(await self.run_level(level))
+        finally:
+            await engine.dispose()
+
+        print("\n" + "="*60)
+        print("📊 测试结果汇总")
+        print("="*60)
+        print(f"{'并发':>6} {'条/秒':>10} {'领取p50':>10} {'领取p99':>10} {'锁等待max':>10} {'死锁':>6} {'重复派发':>8}")
+        for result in results:
+            claim = result["claim_latency"]
+            print(f"{result['concurrency']:>6} {result['tasks_per_second']:>10} {claim.get('p50_ms', '-'):>10} "
+                  f"{claim.get('p99_ms', '-'):>10} {result['lock_waits']['max']:>10} {result['deadlocks']:>6} "
+                  f"{len(result['double_dispatches']):>8}")
+
+        passed = all(
+            not result["double_dispatches"] and not result["deadlocks"]
+            and not result["unfinished"] and not result["errors"]
+            for result in results
+        )
+        if passed:
+            print("🎉 没有重复派发和死锁！")
+        else:
+            print("⚠️  存在重复派发、死锁、错误或未完成的任务")
+        return passed
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="领取任务并发压力测试")
+    parser.add_argument("--levels", default="10,50,100",
+                        type=lambda value: [int(level) for level in value.split(",")],
+                        help="并发APP数，逗号分隔")
+    parser.add_argument("--tasks", type=int, default=5000, help="每个并发级别的测试任务数")
+    parser.add_argument("--batch-size", type=int, default=10, help="每次领取的任务数")
+    parser.add_argument("--retry-rate", type=float, default=0.1, help="汇报失败并要求重试的比例")
+    parser.add_argument("--pool-size", type=int, default=0,
+                        help="连接池大小，默认每个APP一个连接；设为服务的连接池大小时模拟经由服务领取")
+    parser.add_argument("--keep", action="store_true", help="保留测试数据")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    # 重试任务不等待重试间隔，立即可以被再次领取，覆盖重试任务的重新派发
+    settings.retry_delay_minutes = 0
+
+    print(f"🔧 测试配置:")
+    print(f"   数据库: {settings.postgres_host}:{settings.postgres_port}/{settings.postgres_db}")
+    print(f"   并发级别: {args.levels}，每级 {args.tasks} 条任务，每次领取 {args.batch_size} 条")
+
+    tester = ClaimConcurrencyTester(args)
+    success = asyncio.run(tester.run_test())
+    sys.exit(0 if success else 1)
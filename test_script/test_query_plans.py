@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+查询计划回归测试脚本
+在本地PostgreSQL中写入测试数据，对领取任务、僵尸任务恢复、定时任务释放和统计查询执行EXPLAIN，
+如果执行计划对sms_tasks退化为顺序扫描则测试失败
+"""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+
+from app.config import settings
+from app.database import engine, AsyncSessionLocal
+from app.services.sms_service import SmsService
+from app.services.zombie_task_service import ZombieTaskService
+from app.services.counter_service import CounterService
+from app.services.schedule_service import ScheduleService
+
+# 测试数据来源标识，用于清理
+TEST_SOURCE = "query_plan_test"
+
+
+class QueryPlanTester:
+    """查询计划测试类"""
+
+    def __init__(self, rows: int = 200000, keep_data: bool = False):
+        self.rows = rows
+        self.keep_data = keep_data
+
+    async def seed(self):
+        """写入测试数据：97%成功、1%失败、1%新任务、0.5%重试任务、0.5%处理中，分布在7个来源"""
+        print(f"\n🌱 写入 {self.rows} 条测试任务...")
+        async with engine.begin() as conn:
+            await conn.execute(text("""
+                INSERT INTO sms_tasks (
+                    task_id, phone_number, content, status, source,
+                    retry_count, processing_app_id, created_at, updated_at, next_attempt_at
+                )
+                SELECT
+                    'plan_' || g,
+                    '139' || lpad((g % 100000000)::text, 8, '0'),
+                    '查询计划测试',
+                    CASE
+                        WHEN g % 1000 < 970 THEN 2
+                        WHEN g % 1000 < 980 THEN 3
+                        WHEN g % 1000 < 995 THEN 0
+                        ELSE 1
+                    END,
+                    :source || '_' || (g % 7),
+                    CASE WHEN g % 1000 >= 990 AND g % 1000 < 995 THEN 1 + g % 3 ELSE 0 END,
+                    CASE WHEN g % 1000 >= 995 THEN 'plan_app_' || (g % 10) END,
+                    now() - g * interval '10 milliseconds',
+                    now() - g * interval '10 milliseconds',
+                    CASE WHEN g % 1000 >= 990 AND g % 1000 < 995 THEN now() - g * interval '10 milliseconds' + interval '5 minutes' END
+                FROM generate_series(1, :rows) AS g
+            """), {"source": TEST_SOURCE, "rows": self.rows})
+
+        # VACUUM不能在事务中执行
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text("VACUUM ANALYZE sms_tasks"))
+
+    async def cleanup(self):
+        """清理测试数据"""
+        print(f"\n🧹 清理测试数据...")
+        async with engine.begin() as conn:
+            await conn.execute(text("DELETE FROM sms_tasks WHERE source LIKE :source || '_%'"), {"source": TEST_SOURCE})
+
+    def build_queries(self, db) -> dict:
+        """构建需要检查的查询（与服务代码使用同一构建方法）"""
+        sms_service = SmsService(db)
+        zombie_service = ZombieTaskService(db)
+
+        scheduling = settings.task_source_scheduling
+        try:
+            settings.task_source_scheduling = "fifo"
+            claim = sms_service._build_claim_statement("plan_test_app", 10)
+            capacity_claim = sms_service._build_claim_statement("plan_test_app", 10, max_in_flight=50)
+            settings.task_source_scheduling = "fair"
+            fair_claim = sms_service._build_claim_statement("plan_test_app", 10)
+        finally:
+            settings.task_source_scheduling = scheduling
+
+        return {
+            "领取任务": claim,
+            "领取任务（来源公平调度）": fair_claim,
+            "领取任务（APP容量限制）": capacity_claim,
+            "僵尸任务恢复": zombie_service._build_recovery_statement(),
+            "定时任务释放": ScheduleService(db)._build_release_statement(),
+            "任务计数校准": CounterService(db).build_actual_count_query(),
+            "通道计数校准": CounterService(db).build_lane_count_query(),
+        }
+
+    @staticmethod
+    def find_seq_scans(plan: dict) -> list:
+        """递归查找对sms_tasks（含分区）的顺序扫描节点（忽略开销为0的空分区）"""
+        found = []
+        relation = plan.get("Relation Name", "")
+        if (plan.get("Node Type") == "Seq Scan" and relation.startswith("sms_tasks")
+                and plan.get("Total Cost", 0) > 0):
+            found.append(relation)
+        for child in plan.get("Plans", []):
+            found.extend(QueryPlanTester.find_seq_scans(child))
+        return found
+
+    async def explain(self, db, name: str, query) -> bool:
+        """执行EXPLAIN并检查执行计划"""
+        print("\n" + "="*60)
+        print(f"🔍 {name}")
+        print("="*60)
+
+        sql = str(query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+        result = await db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+        plan = result.scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+
+        result = await db.execute(text(f"EXPLAIN {sql}"))
+        for line in result.scalars():
+            print(f"   {line}")
+
+        seq_scans = self.find_seq_scans(plan[0]["Plan"])
+        if seq_scans:
+            print(f"❌ 执行计划包含顺序扫描: {', '.join(seq_scans)}")
+            return False
+
+        print(f"✅ 执行计划使用索引")
+        return True
+
+    async def run_test(self) -> bool:
+        """运行完整测试"""
+        print("🚀 开始查询计划回归测试")
+        print("="*60)
+
+        await self.seed()
+        results = []
+        try:
+            async with AsyncSessionLocal() as db:
+                for name, query in self.build_queries(db).items():
+                    results.append((name, await self.explain(db, name, query)))
+                await db.rollback()
+        finally:
+            if not self.keep_data:
+                await self.cleanup()
+
+        print("\n" + "="*60)
+        print("📊 测试结果汇总")
+        print("="*60)
+        for name, success in results:
+            status = "✅ 通过" if success else "❌ 失败"
+            print(f"{name:<20} {status}")
+
+        passed = all(success for _, success in results)
+        if passed:
+            print("🎉 所有查询均使用索引！")
+        else:
+            print("⚠️  存在退化为顺序扫描的查询，请检查索引（migrations/002_queue_indexes.sql）")
+        return passed
+
+
+if __name__ == "__main__":
+    # 用法: python test_script/test_query_plans.py [测试数据行数] [--keep]
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 200000
+    keep_data = "--keep" in sys.argv
+
+    print(f"🔧 测试配置:")
+    print(f"   数据库: {settings.postgres_host}:{settings.postgres_port}/{settings.postgres_db}")
+    print(f"   测试数据: {rows} 行")
+
+    tester = QueryPlanTester(rows, keep_data)
+    success = asyncio.run(tester.run_test())
+    sys.exit(0 if success else 1)